@@ -0,0 +1,81 @@
+"""
+测量 map_keys 和结构化解析在不同线程数下的吞吐量。
+
+在自由线程构建（python3.13t，`PYTHON_GIL=0`）上运行时，CPU 密集的解析会随线程数扩展；
+在普通构建上只有等待网络的部分能并行。模型调用被替换为固定延迟的本地函数，不需要 API Key。
+
+    python examples/free_threading_benchmark.py
+    python3.13t -X gil=0 examples/free_threading_benchmark.py
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from pydantic import BaseModel
+
+from uglychain import config, llm
+from uglychain.structured import ResponseModel
+
+ITEMS = 256
+LATENCY = 0.02  # 模拟的模型响应时间（秒）
+
+
+class Record(BaseModel):
+    name: str
+    score: float
+    tags: list[str]
+
+
+CONTENT = "```yaml\nname: benchmark\nscore: 0.5\ntags: [a, b, c, d, e, f, g, h]\n```"
+
+
+def fake_generate(model, messages, **kwargs):
+    time.sleep(LATENCY)
+    message = type("Message", (object,), {"content": CONTENT})
+    return [type("Choice", (object,), {"message": message})]
+
+
+def bench_map_keys(workers: int) -> float:
+    config.use_parallel_processing = True
+    config.max_concurrency = workers
+
+    @llm("openai:gpt-4o-mini", map_keys=["text"], response_format=Record)
+    def extract(text: list[str]) -> str:
+        return f"Extract a record from {text}"
+
+    start = time.perf_counter()
+    extract([str(i) for i in range(ITEMS)])
+    return ITEMS / (time.perf_counter() - start)
+
+
+def bench_parsing(workers: int) -> float:
+    response_model = ResponseModel(lambda: None, Record)
+    message = type("Message", (object,), {"content": CONTENT})
+    choice = type("Choice", (object,), {"message": message})
+
+    def parse_many(_: int) -> None:
+        for _ in range(50):
+            response_model.parse_from_response(choice)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(parse_many, range(ITEMS // 4)))
+    return ITEMS // 4 * 50 / (time.perf_counter() - start)
+
+
+def main() -> None:
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>8} {'map_keys items/s':>18} {'parses/s':>12}")
+    config.session_log = False
+    with patch("uglychain.client.Client.generate", side_effect=fake_generate):
+        for workers in (1, 2, 4, 8, 16):
+            print(f"{workers:>8} {bench_map_keys(workers):>18.1f} {bench_parsing(workers):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,66 @@ UglyChain 是一个用于构建大型语言模型（LLM）应用程序的框架
 
 from __future__ import annotations
 
+import importlib  # 导入importlib模块，用于按需加载子模块
+import sys  # 导入sys模块，用于替换包模块的类型
+from types import ModuleType  # 导入ModuleType，用于拦截子模块绑定
+from typing import TYPE_CHECKING, Any  # 导入TYPE_CHECKING和Any，用于类型提示
+
 from .config import config  # 导入配置模块
-from .console import BaseConsole  # 导入基础控制台模块
-from .llm import llm  # 导入LLM模块
-from .load import load  # 导入加载模块
-from .plan import Plan  # 导入规划模块
-from .react import react  # 导入响应式代理模块
-from .think import think  # 导入思维链模块
-from .tools import Tool, Tools  # 导入工具模块
+
+if TYPE_CHECKING:
+    from .console import BaseConsole  # 导入基础控制台模块
+    from .library import PromptLibrary  # 导入提示模板库
+    from .llm import llm  # 导入LLM模块
+    from .load import load  # 导入加载模块
+    from .plan import Plan  # 导入规划模块
+    from .react import react  # 导入响应式代理模块
+    from .think import think  # 导入思维链模块
+    from .tools import Tool, Tools  # 导入工具模块
+    from .vote import vote  # 导入自洽性投票模块
 
 # 定义对外暴露的模块和类
-__all__ = ["config", "llm", "think", "react", "load", "Tools", "Tool", "BaseConsole", "Plan"]
+__all__ = ["config", "llm", "think", "react", "load", "Tools", "Tool", "BaseConsole", "Plan", "PromptLibrary", "vote"]
+
+# 对外暴露的名称到所在子模块的映射，第一次访问时才导入，`import uglychain` 只加载配置
+_LAZY_IMPORTS = {
+    "BaseConsole": ".console",
+    "PromptLibrary": ".library",
+    "llm": ".llm",
+    "load": ".load",
+    "Plan": ".plan",
+    "react": ".react",
+    "think": ".think",
+    "Tool": ".tools",
+    "Tools": ".tools",
+    "vote": ".vote",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # 缓存到模块中，之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+class _LazyModule(ModuleType):
+    def __setattr__(self, name: str, value: Any) -> None:
+        # 导入子模块时，导入系统会把子模块绑定为包的同名属性（例如 uglychain.llm），覆盖同名的函数；
+        # 这里忽略这种绑定，`uglychain.llm` 始终是 llm 装饰器，与原先导入后重新绑定函数的行为一致
+        if name in _LAZY_IMPORTS and isinstance(value, ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _LazyModule
+
+
 # 定义UglyChain的版本
 __version__ = "v1.6.6"
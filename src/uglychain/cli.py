@@ -0,0 +1,228 @@
+"""
+cli模块提供 `uglychain` 命令行入口。
+
+`uglychain run prompt.md --input data.jsonl --output out.jsonl` 使用 `load` 加载提示文件，
+流式读取 JSONL/CSV 数据集，同时最多运行 `--concurrency` 个请求，每一行完成后立即写入结果。
+输出文件本身就是检查点：每行记录输入的行号，`--resume` 时跳过已经成功的行。
+"""
+
+from __future__ import annotations
+
+import argparse  # 导入argparse模块，用于解析命令行参数
+import csv  # 导入csv模块，用于读取CSV数据集
+import json  # 导入json模块，用于读写JSONL
+import sys  # 导入sys模块，用于输出进度信息
+import time  # 导入time模块，用于计算吞吐量和剩余时间
+from collections.abc import Iterator, Sequence  # 导入抽象基类，用于类型提示
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait  # 导入线程池
+from contextvars import copy_context  # 导入copy_context，用于把配置覆盖传递到工作线程
+from pathlib import Path  # 导入Path类，用于文件路径操作
+from typing import IO, Any  # 导入类型提示
+
+from .config import config  # 导入配置
+from .load import compile_template, load  # 导入提示文件加载函数
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog="uglychain", description="UglyChain command line tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run a prompt file over every row of a JSONL/CSV dataset")
+    run_parser.add_argument("prompt", help="Path to the prompt .md file")
+    run_parser.add_argument("--input", "-i", required=True, help="Input dataset (.jsonl or .csv)")
+    run_parser.add_argument("--output", "-o", required=True, help="Output JSONL file, also used as the checkpoint")
+    run_parser.add_argument("--concurrency", "-c", type=int, default=config.max_concurrency, help="Parallel requests")
+    run_parser.add_argument("--model", "-m", default=None, help="Override the model of the prompt file")
+    run_parser.add_argument("--resume", action="store_true", help="Skip rows already completed in the output file")
+    run_parser.add_argument("--overwrite", action="store_true", help="Overwrite an existing output file")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return run(
+            args.prompt,
+            args.input,
+            args.output,
+            concurrency=args.concurrency,
+            model=args.model,
+            resume=args.resume,
+            overwrite=args.overwrite,
+        )
+    return 1  # pragma: no cover
+
+
+def run(
+    prompt: str,
+    input_path: str,
+    output_path: str,
+    *,
+    concurrency: int = 16,
+    model: str | None = None,
+    resume: bool = False,
+    overwrite: bool = False,
+    progress: IO[str] | None = None,
+) -> int:
+    """
+    对数据集的每一行运行提示文件，返回失败的行数是否为零对应的退出码。
+
+    输出的每一行是 `{"index": 行号, "input": 输入行, "output": 结果}`，
+    失败的行写入 `"error"` 而不是 `"output"`，`--resume` 时会重新运行；
+    无法解析的 JSONL 行和不是对象的行同样记为失败，不会中断整个运行。
+    """
+    progress = progress or sys.stderr
+    output = Path(output_path)
+    if output.exists() and output.stat().st_size > 0 and not (resume or overwrite):
+        print(f"Output file {output} already exists, use --resume or --overwrite", file=progress)
+        return 2
+
+    # 模板中的所有占位符都从数据集的同名列中填充
+    inputs = list(dict.fromkeys(compile_template(Path(prompt)).inputs))
+    if not inputs:
+        # 没有占位符时每一行的请求都相同
+        print(f"Prompt file {prompt} has no placeholders to fill from the dataset", file=progress)
+        return 2
+    overrides: dict[str, Any] = {"need_retry": True}
+    if model:
+        overrides["model"] = model
+    func = load(prompt, **overrides)
+
+    window = max(concurrency, 1)
+    done = _completed_indices(output) if resume else set()
+    total = _count_rows(Path(input_path))
+    tracker = _Progress(total=total, done=len(done), stream=progress)
+    failed = 0
+    futures: dict[Future[Any], tuple[int, Any]] = {}
+
+    # 只在本次运行的上下文中覆盖并发配置，不影响其他线程和调用方
+    with (
+        config.override(max_concurrency=concurrency),
+        ThreadPoolExecutor(max_workers=window) as executor,
+        output.open("a" if resume else "w", encoding="utf-8") as out,
+    ):
+        if resume and out.tell() > 0 and not _ends_with_newline(output):
+            out.write("\n")  # 崩溃时最后一行可能只写了一半，从新的一行开始追加
+
+        def write(i: int, row: Any, result: Any) -> None:
+            nonlocal failed
+            record: dict[str, Any] = {"index": i, "input": row}
+            if isinstance(result, Exception):
+                record["error"] = f"{type(result).__name__}: {result}"
+                failed += 1
+            else:
+                record["output"] = result
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()  # 每行完成后立即落盘，作为断点续跑的检查点
+            tracker.update(1)
+
+        def write_completed() -> None:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i, row = futures.pop(future)
+                exception = future.exception()
+                write(i, row, exception if isinstance(exception, Exception) else future.result())
+
+        for i, row in enumerate(_read_rows(Path(input_path))):
+            if i in done:
+                continue
+            if isinstance(row, json.JSONDecodeError):
+                write(i, row.doc.strip(), row)
+                continue
+            if not isinstance(row, dict):
+                write(i, row, TypeError(f"Row must be a JSON object, got {type(row).__name__}"))
+                continue
+            # 滑动窗口：正在运行的请求达到上限时，等任意一个完成后再提交下一行
+            while len(futures) >= window:
+                write_completed()
+            kwargs = {key: _to_text(row.get(key, "")) for key in inputs}
+            futures[executor.submit(copy_context().run, func, **kwargs)] = (i, row)  # type: ignore
+        while futures:
+            write_completed()
+
+    tracker.finish(failed)
+    return 1 if failed else 0
+
+
+class _Progress:
+    """在 stderr 上输出处理进度、吞吐量和预计剩余时间"""
+
+    def __init__(self, total: int, done: int, stream: IO[str]) -> None:
+        self.total = total
+        self.done = done
+        self.processed = 0  # 本次运行处理的行数，用于计算吞吐量
+        self.stream = stream
+        self.start = time.monotonic()
+
+    def update(self, n: int) -> None:
+        self.done += n
+        self.processed += n
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        rate = self.processed / elapsed
+        left = max(self.total - self.done, 0)
+        eta = _format_duration(left / rate) if rate > 0 else "--:--:--"
+        percent = self.done / self.total * 100 if self.total else 100.0
+        print(f"{self.done}/{self.total} rows ({percent:.1f}%) | {rate:.1f} rows/s | ETA {eta}", file=self.stream)
+
+    def finish(self, failed: int) -> None:
+        elapsed = time.monotonic() - self.start
+        print(
+            f"Finished {self.processed} rows in {_format_duration(elapsed)}, {failed} failed",
+            file=self.stream,
+        )
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _to_text(value: Any) -> str:
+    """模板只能填充字符串，其他类型的值序列化为 JSON"""
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _read_rows(path: Path) -> Iterator[Any]:
+    """流式读取 JSONL 或 CSV 数据集，每次返回一行；无法解析的 JSONL 行返回解析异常"""
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield e
+
+
+def _count_rows(path: Path) -> int:
+    """统计数据集的行数，用于计算进度；JSONL 只数非空行，不解析内容"""
+    if path.suffix.lower() == ".csv":
+        return sum(1 for _ in _read_rows(path))
+    with path.open(encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+def _completed_indices(path: Path) -> set[int]:
+    """从已有的输出文件中读取已经成功的行号，忽略崩溃时写了一半的最后一行"""
+    done: set[int] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "output" in record:
+                done.add(record["index"])
+    return done
+
+
+if __name__ == "__main__":
+    sys.exit(main())
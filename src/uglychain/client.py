@@ -6,12 +6,50 @@ from __future__ import annotations
 
 import os  # 导入os模块，用于访问环境变量
 import threading  # 导入threading模块，用于实现线程安全
-from collections.abc import Iterator  # 导入Iterator类型，用于类型提示
-from typing import Any  # 导入Any类型，用于类型提示
-
-import aisuite  # 导入aisuite库
+import time  # 导入time模块，用于后台请求的等待时间
+import weakref  # 导入weakref模块，用于记录已配置的客户端
+from collections.abc import Callable, Iterator  # 导入Callable和Iterator类型，用于类型提示
+from contextlib import ExitStack  # 导入ExitStack，流式响应耗尽前持有调度和并发名额
+from contextvars import copy_context  # 导入copy_context，后台线程沿用调用方的上下文
+from typing import TYPE_CHECKING, Any  # 导入TYPE_CHECKING和Any，用于类型提示
 
+from .config import config  # 导入配置，用于读取模型价格
 from .schema import Messages  # 从当前包导入Messages类型
+from .utils.deadline import (  # 导入截止时间工具，用于传递请求超时
+    DeadlineExceededError,
+    check_deadline,
+    current_cancel_event,
+    current_deadline,
+    remaining,
+)
+from .utils.limiter import current_limiter  # 导入限流器，用于自适应并发控制
+from .utils.scheduler import get_scheduler  # 导入请求调度器，用于按优先级排队
+from .utils.usage import UsageTracker, check_budget, current_usage_scopes, report_usage  # 导入用量统计工具
+
+if TYPE_CHECKING:
+    import aisuite  # aisuite 会导入 openai、mcp 等大量依赖，只在第一次创建客户端时导入
+
+# aisuite 把参数原样传给 SDK 且 SDK 支持按请求设置 `timeout` 的提供商（OpenAI 兼容的 SDK 和 Anthropic），
+# 截止时间会作为真正的请求超时传给它们，超时由网络层取消请求；
+# 其他提供商（如 ollama、together、xai 只使用实例级的超时）在后台线程中请求，超时后调用方按时返回，
+# 但并发和调度名额一直占用到请求真正结束，不会低估正在进行的请求数
+TIMEOUT_SUPPORTED_PROVIDERS = {
+    "anthropic",
+    "cerebras",
+    "crusoe",
+    "deepseek",
+    "edenai",
+    "featherless",
+    "groq",
+    "inception",
+    "nebius",
+    "openai",
+    "openrouter",
+    "requesty",
+    "sambanova",
+    "tongyi",
+}
+CANCEL_POLL_INTERVAL = 0.05  # 等待被取消的请求时检查取消信号的间隔（秒）
 
 
 class Client:
@@ -39,6 +77,8 @@ class Client:
         if cls._client_instance is None:
             with cls._lock:  # 获取锁，确保线程安全
                 if cls._client_instance is None:  # 双重检查锁定
+                    import aisuite  # 延迟导入，只调用其他功能时不需要加载
+
                     cls._client_instance = aisuite.Client()  # 创建aisuite客户端实例
         return cls._client_instance
 
@@ -50,7 +90,8 @@ class Client:
         该函数用于清除全局客户端实例变量，
         确保客户端状态在后续配置或使用前被重置。
         """
-        cls._client_instance = None
+        with cls._lock:
+            cls._client_instance = None
 
     @classmethod
     def generate(
@@ -76,30 +117,165 @@ class Client:
         """
         # 通过路由器获取实际的客户端模型名称
         client_model = _router(model, cls.get())
+        # 截止时间已过则不再发起请求；否则把剩余时间作为请求超时，超时由网络层取消请求
+        check_deadline()
+        # 任意一个会话的预算已用完则不再发起请求
+        check_budget()
+        timeout = remaining()
+        wall_clock_timeout: float | None = None
+        if timeout is not None and "timeout" not in api_params:
+            if client_model.split(":", 1)[0] in TIMEOUT_SUPPORTED_PROVIDERS:
+                api_params = {**api_params, "timeout": timeout}
+            else:
+                wall_clock_timeout = timeout
+        scheduler = get_scheduler()
+        limiter = current_limiter()
         try:
-            # 调用aisuite客户端的chat completions API
-            response = cls.get().chat.completions.create(
-                model=client_model,
-                messages=messages,
-                **api_params,
-            )
+            # 调用aisuite客户端的chat completions API；先获取模型的并发名额，再按优先级排队获取调度名额：
+            # 等待某个模型限流的请求不占用调度名额，不会阻塞其他模型的交互式请求
+            with ExitStack() as slots:
+                if limiter is not None:
+                    slots.enter_context(limiter.slot())
+                if scheduler is not None:
+                    slots.enter_context(scheduler.slot())
+                response = _call_with_timeout(
+                    lambda: cls.get().chat.completions.create(model=client_model, messages=messages, **api_params),
+                    wall_clock_timeout,
+                    slots,
+                    current_cancel_event(),
+                )
+                # 流式响应在生成过程中仍占用提供商的容量，名额交给迭代器，在流耗尽或关闭时归还
+                held = slots.pop_all() if api_params.get("stream", False) and isinstance(response, Iterator) else None
         except Exception as e:
             # 捕获并重新抛出生成响应时的错误
             raise RuntimeError(f"生成响应失败: {e}") from e
 
         # 处理流式响应
-        if api_params.get("stream", False) and isinstance(response, Iterator):
+        if held is not None:
             # 从流式响应中提取choices
-            return (item.choices[0] for item in response if isinstance(item.choices, list) and len(item.choices) > 0)
+            return _hold_stream(response, current_deadline(), model, current_usage_scopes(), held)
         # 处理非流式响应，检查是否有choices
         elif not hasattr(response, "choices") or not response.choices:
             raise ValueError("No choices returned from the model")
         else:
-            # 断言choices是列表并返回
+            # 记录用量，断言choices是列表并返回
+            report_usage(model, getattr(response, "usage", None), _get_prices(model))
             assert isinstance(response.choices, list)
             return response.choices
 
 
+def _call_with_timeout(
+    func: Callable[[], Any],
+    timeout: float | None,
+    slots: ExitStack | None = None,
+    cancel: threading.Event | None = None,
+) -> Any:
+    """
+    执行 `func()`，`timeout` 不为 None 或传入取消信号 `cancel` 时在后台线程中执行，
+    最多等待 `timeout` 秒或直到取消信号被设置。
+
+    用于无法按请求设置超时的提供商，以及 `run_first` 中落选的请求：超时或取消后抛出 DeadlineExceededError，
+    调用方的线程立即返回，`slots` 中的名额转交给后台线程，在请求真正结束后才归还。
+    """
+    if timeout is None and cancel is None:
+        return func()
+    outcome: dict[str, Any] = {}
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def target() -> None:
+        try:
+            outcome["result"] = func()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            with lock:
+                done.set()
+                abandoned = outcome.get("abandoned")
+            if abandoned is not None:
+                # 超时的请求按超时归还名额，被取消的请求按请求本身的结果归还
+                held, error = abandoned
+                error = error or outcome.get("error")
+                held.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+    threading.Thread(target=copy_context().run, args=(target,), daemon=True, name="uglychain-request").start()
+    end = None if timeout is None else time.monotonic() + max(timeout, 0)
+    while not done.is_set():
+        left = None if end is None else end - time.monotonic()
+        cancelled = cancel is not None and cancel.is_set()
+        if cancelled or (left is not None and left <= 0):
+            with lock:
+                if not done.is_set():
+                    held = slots.pop_all() if slots is not None else ExitStack()
+                    if cancelled:
+                        outcome["abandoned"] = (held, None)
+                        raise DeadlineExceededError("Request cancelled")
+                    error = DeadlineExceededError(f"Request exceeded the deadline ({timeout:.2f}s)")
+                    outcome["abandoned"] = (held, error)
+                    raise error
+            break
+        # 有取消信号时定期检查，否则一直等到超时
+        interval = CANCEL_POLL_INTERVAL if cancel is not None else None
+        done.wait(interval if left is None else min(left, interval or left))
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _iter_stream(
+    response: Iterator[Any],
+    stream_deadline: float | None,
+    model: str = "",
+    usage_scopes: tuple[tuple[UsageTracker, str], ...] = (),
+    slots: ExitStack | None = None,
+) -> Iterator[Any]:
+    """
+    迭代流式响应的choices。
+
+    流式响应会在后台线程中消费，因此需要显式传入截止时间和用量统计器；
+    超过截止时间或提前停止迭代时关闭底层连接，不再为丢弃的token付费。
+    `slots` 是请求占用的调度和并发名额，在流耗尽、出错或关闭后归还。
+    """
+    with slots or ExitStack():
+        try:
+            for item in response:
+                if stream_deadline is not None:
+                    check_deadline(stream_deadline)
+                usage = getattr(item, "usage", None)
+                if usage is not None and usage_scopes:
+                    # 提供商只在最后一个数据块中返回用量（OpenAI 需要 `stream_options={"include_usage": True}`）
+                    report_usage(model, usage, _get_prices(model), usage_scopes)
+                if isinstance(item.choices, list) and len(item.choices) > 0:
+                    yield item.choices[0]
+        finally:
+            close = getattr(response, "close", None)
+            if callable(close):
+                close()
+
+
+def _hold_stream(
+    response: Iterator[Any],
+    stream_deadline: float | None,
+    model: str,
+    usage_scopes: tuple[tuple[UsageTracker, str], ...],
+    slots: ExitStack,
+) -> Iterator[Any]:
+    """返回持有名额的流式迭代器；迭代器没有开始迭代就被丢弃时，也在回收时归还名额"""
+    stream = _iter_stream(response, stream_deadline, model, usage_scopes, slots)
+    weakref.finalize(stream, slots.close)
+    return stream
+
+
+def _get_prices(model: str) -> dict[str, float] | None:
+    """从配置中获取模型每百万 token 的价格，用于估算费用"""
+    return config.model_prices.get(model)
+
+
+# 已经配置过 openrouter 的客户端；配置会替换提供商实例，只在第一次使用时进行，避免并发请求之间互相覆盖
+_openrouter_configured: weakref.WeakSet[aisuite.Client] = weakref.WeakSet()
+_router_lock = threading.Lock()
+
+
 def _router(model: str, client: aisuite.Client) -> str:
     """
     根据模型名称路由到不同的提供商配置。
@@ -115,10 +291,17 @@ def _router(model: str, client: aisuite.Client) -> str:
     provider_key, model_name = model.split(":", 1)
     if provider_key == "openrouter":
         # 如果是openrouter，配置aisuite客户端
-        config = {
-            "openai": {"api_key": os.getenv("OPENROUTER_API_KEY") or "", "base_url": "https://openrouter.ai/api/v1"}
-        }
-        client.configure(config)  # 应用配置
+        if client not in _openrouter_configured:
+            with _router_lock:
+                if client not in _openrouter_configured:
+                    provider_configs = {
+                        "openai": {
+                            "api_key": os.getenv("OPENROUTER_API_KEY") or "",
+                            "base_url": "https://openrouter.ai/api/v1",
+                        }
+                    }
+                    client.configure(provider_configs)  # 应用配置
+                    _openrouter_configured.add(client)
         return f"openai:{model_name}"  # 返回带有openai前缀的模型名称
     else:
         return model  # 返回原始模型名称
@@ -1,23 +1,34 @@
 """
 配置模块，用于管理UglyChain的全局配置设置。
 支持从配置文件读取配置，并提供了默认配置值。
+配置文件修改后可以重新加载或后台监视，`config.override()` 可以在当前上下文中临时覆盖配置项。
 """
 
 from __future__ import annotations
 
 import configparser  # 导入configparser模块，用于解析INI格式的配置文件
 import json  # 导入json模块，用于解析JSON格式的配置值
+import logging  # 导入logging模块，用于记录配置重新加载
 import os  # 导入os模块，用于访问环境变量和文件系统
+import threading  # 导入threading模块，用于后台监视配置文件
+from collections.abc import Iterator  # 导入Iterator类型，用于类型提示
+from contextlib import contextmanager  # 导入contextmanager，用于定义覆盖配置的上下文
+from contextvars import ContextVar  # 导入ContextVar，用于保存当前上下文的覆盖配置
 from pathlib import Path  # 导入Path类，用于处理文件路径
 from typing import Any  # 导入Any类型，用于类型提示
 
-from pydantic import BaseModel, Field  # 导入Pydantic的BaseModel和Field，用于数据验证和配置管理
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter  # 导入Pydantic的组件，用于数据验证和配置管理
+
+logger = logging.getLogger(__name__)
 
 # 读取本地配置文件以覆盖默认值
 CONFIG_FILENAME = "config.ini"  # 配置文件名
 CONFIG_APP_DIR = "uglychain"  # 应用配置目录名
 CONFIG_SECTION = "DEFAULT"  # 配置文件中的默认节名
 
+# 当前上下文中覆盖的配置项，只对当前线程或协程（以及复制了上下文的工作线程）生效
+_overrides: ContextVar[dict[str, Any] | None] = ContextVar("uglychain_config_overrides", default=None)
+
 
 class Config(BaseModel):
     """
@@ -31,12 +42,31 @@ class Config(BaseModel):
     response_markdown_type: str = Field(default="yaml", description="默认的markdown类型。")
     llm_max_retry: int = Field(default=3, description="语言模型的最大重试次数。")
     llm_timeout: int = Field(default=30, description="语言模型的最大运行时间（秒）。")
-    llm_wait_time: int = Field(default=0, description="语言模型的每次重试等待时间（秒）。")
+    llm_wait_time: int = Field(default=0, description="语言模型重试的基础等待时间（秒），按指数退避增长。")
+    llm_max_wait_time: int = Field(default=60, description="语言模型重试等待时间的上限（秒）。")
     use_parallel_processing: bool = Field(default=False, description="是否对语言模型使用并行处理。")
+    max_concurrency: int = Field(default=16, description="并行处理时的最大并发数。")
+    adaptive_concurrency: bool = Field(
+        default=False, description="如果为真，则并行处理时根据提供商的响应（429、超时、延迟）自动调整并发数。"
+    )
+    job_store_path: str = Field(
+        default=".uglychain/jobs.sqlite3",
+        description="批处理任务进度的存储路径，.jsonl 后缀使用 JSONL 文件，否则使用 SQLite。",
+    )
+    model_prices: dict[str, Any] = Field(
+        default_factory=dict,
+        description='模型每百万 token 的价格，用于估算费用，例如 {"openai:gpt-4o": {"prompt": 2.5, "completion": 10}}。',
+    )
     session_log: bool = Field(default=True, description="如果为真，则启用会话日志记录。")
     verbose: bool = Field(default=False, description="如果为真，则启用详细日志记录。")
     need_confirm: bool = Field(default=False, description="如果为真，则工具使用需要确认。")
 
+    _file_values: dict[str, Any] = PrivateAttr(default_factory=dict)  # 上一次从配置文件读取的值
+    _file_stamps: dict[Path, tuple[int, int]] = PrivateAttr(default_factory=dict)  # 配置文件的 (mtime_ns, size)
+    _reload_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stop_event: threading.Event | None = PrivateAttr(default=None)
+    _watch_thread: threading.Thread | None = PrivateAttr(default=None)
+
     def __init__(self, **kwargs: Any) -> None:
         """
         初始化配置实例，首先调用父类的初始化方法，然后读取本地配置文件来覆盖默认值。
@@ -45,8 +75,110 @@ class Config(BaseModel):
             **kwargs (Any): 传递给父类构造函数的任意关键字参数。
         """
         super().__init__(**kwargs)  # 调用 Pydantic 的默认初始化
+        self.reload()  # 读取本地配置文件以覆盖默认值
 
-        # 读取本地配置文件以覆盖默认值
+    def __getattribute__(self, name: str) -> Any:
+        # 当前上下文覆盖了该配置项时返回覆盖的值，没有覆盖时只多一次 ContextVar 查询
+        overrides = _overrides.get()
+        if overrides and name in overrides:
+            return overrides[name]
+        return super().__getattribute__(name)
+
+    @contextmanager
+    def override(self, **values: Any) -> Iterator[Config]:
+        """
+        在当前上下文中覆盖配置项，退出时恢复；其他线程、协程和租户看到的配置不受影响。
+
+        覆盖可以嵌套，内层未指定的项沿用外层的覆盖。`run_batch` 等工具会把当前上下文复制到工作线程，
+        自行创建的线程需要用 `contextvars.copy_context().run` 传递覆盖。
+
+        Examples:
+            >>> with config.override(default_model="openai:gpt-4o", max_concurrency=4):
+            ...     summarize(texts)
+        """
+        fields = type(self).model_fields
+        unknown = set(values) - set(fields)
+        if unknown:
+            raise ValueError(f"未知的配置项 {sorted(unknown)}")
+        validated = {
+            name: TypeAdapter(fields[name].annotation or Any).validate_python(value) for name, value in values.items()
+        }
+        token = _overrides.set({**(_overrides.get() or {}), **validated})
+        try:
+            yield self
+        finally:
+            _overrides.reset(token)
+
+    def reload(self) -> set[str]:
+        """
+        重新读取配置文件，返回发生变化的配置项。
+
+        只更新配置文件中新增、修改或删除的项（删除的项恢复默认值），在代码中设置的其他项保持不变。
+        """
+        with self._reload_lock:
+            self._file_stamps = self._stat_files()
+            values = self._read_files()
+            changed: set[str] = set()
+            for name in set(values) | set(self._file_values):
+                if name in values:
+                    if name in self._file_values and self._file_values[name] == values[name]:
+                        continue
+                    setattr(self, name, values[name])
+                else:
+                    setattr(self, name, type(self).model_fields[name].get_default(call_default_factory=True))
+                changed.add(name)
+            self._file_values = values
+        return changed
+
+    def watch(self, interval: float = 1.0) -> None:
+        """启动后台线程，每隔 `interval` 秒检查一次配置文件，文件变化后重新加载"""
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        stop_event = threading.Event()
+
+        def _poll() -> None:
+            while not stop_event.wait(interval):
+                if self._stat_files() == self._file_stamps:
+                    continue
+                try:
+                    changed = self.reload()
+                except Exception as e:
+                    logger.warning(f"Failed to reload config: {e}")
+                    continue
+                if changed:
+                    logger.info(f"Reloaded config: {', '.join(sorted(changed))}")
+
+        self._stop_event = stop_event
+        self._watch_thread = threading.Thread(target=_poll, daemon=True)
+        self._watch_thread.start()
+
+    def stop(self) -> None:
+        """停止后台监视"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+        self._stop_event = None
+        self._watch_thread = None
+
+    def _stat_files(self) -> dict[Path, tuple[int, int]]:
+        stamps: dict[Path, tuple[int, int]] = {}
+        for path in self.path:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _read_files(self) -> dict[str, Any]:
+        """
+        读取配置文件中的配置项，返回解析成功的值。
+
+        Returns:
+            dict[str, Any]: 配置项名称到值的映射，无法解析的项会打印警告并跳过。
+        """
+        values: dict[str, Any] = {}
         parser = configparser.ConfigParser()  # 创建配置解析器实例
 
         paths = self.path  # 获取配置文件路径列表
@@ -75,13 +207,14 @@ class Config(BaseModel):
                                 value = json.loads(value_str)  # 解析JSON字符串为字典
                             else:  # 默认为 str 类型
                                 value = value_str  # 保持字符串格式
-                            setattr(self, field_name, value)  # 设置配置值到实例属性
+                            values[field_name] = value  # 记录配置值
                         except (ValueError, json.JSONDecodeError) as e:
                             # 处理值转换或JSON解析错误
                             print(f"Warning: Could not parse config value for '{field_name}': {value_str}. Error: {e}")
                         except Exception as e:
                             # 处理其他异常
                             print(f"Warning: Error processing config for '{field_name}'. Error: {e}")
+        return values
 
     @property
     def path(self) -> list[Path]:
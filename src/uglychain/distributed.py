@@ -0,0 +1,435 @@
+"""
+distributed模块提供多进程/多节点的批处理分发。
+
+协调者把 `map_keys` 任务按条目拆分写入工作队列，任意数量的 Worker 进程（或其他机器上的进程）
+从队列中领取条目、各自按自己的并发限制执行，并把结果写回队列；协调者按输入顺序返回结果，
+与本地调用 `llm(map_keys=...)` 的结果一致。
+
+默认的 SQLiteWorkQueue 基于本地 SQLite 文件，可作为 Redis 等队列的替代；
+实现 WorkQueue 接口即可接入其他队列。
+"""
+
+from __future__ import annotations
+
+import importlib  # 用于按导入路径查找被分发的函数
+import socket  # 用于生成默认的 worker id
+import sqlite3  # 用于默认的本地队列
+import threading  # 用于 worker 的并发执行
+import time  # 用于轮询和租约
+import uuid  # 用于生成任务 id
+from abc import ABC, abstractmethod  # 用于定义队列接口
+from collections.abc import Callable, Iterator  # 用于类型提示
+from contextlib import contextmanager  # 用于条目运行期间的续约
+from dataclasses import dataclass  # 用于定义队列条目
+from pathlib import Path  # 用于文件路径操作
+from typing import Any  # 用于类型提示
+
+from .llm import _get_map_keys  # 复用 llm 的 map_keys 解析
+from .utils.batch import BatchError  # 与本地批处理相同的错误类型
+from .utils.deadline import DeadlineExceededError, deadline, remaining  # 用于等待结果的超时
+from .utils.job_store import JobStore  # 复用任务存储的序列化
+
+DEFAULT_LEASE = (
+    300.0  # worker 领取条目后的租约时长（秒），worker 运行条目期间会定期续约，停止续约超时的条目会被重新分发
+)
+DEFAULT_MAX_ATTEMPTS = 3  # 因租约过期被重新分发的最大次数
+
+
+class RemoteError(RuntimeError):
+    """worker 执行条目时抛出的异常，只保留异常类型和消息"""
+
+
+@dataclass
+class Task:
+    """队列中的一个条目"""
+
+    job_id: str
+    index: int
+    func: str  # 被分发函数的导入路径 `module:qualname`
+    payload: str  # 序列化后的 (args, kwargs)
+    attempts: int = 0
+    worker: str | None = None  # 持有租约的 worker
+
+
+@dataclass
+class TaskResult:
+    """一个已结束条目的结果"""
+
+    index: int
+    ok: bool
+    value: str  # 成功时为序列化后的结果，失败时为错误信息
+    seq: int  # 结束顺序，用于增量轮询
+
+
+class WorkQueue(ABC):
+    """工作队列接口"""
+
+    @abstractmethod
+    def submit(self, job_id: str, func: str, payloads: list[str]) -> None:
+        """写入一个任务的全部条目，索引与 payloads 的顺序一致"""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease: float = DEFAULT_LEASE) -> Task | None:
+        """领取一个待处理的条目，没有条目时返回 None"""
+
+    @abstractmethod
+    def renew(self, task: Task, lease: float = DEFAULT_LEASE) -> bool:
+        """把条目的租约延长到 `lease` 秒之后，条目已结束或已被其他 worker 领取时返回 False"""
+
+    @abstractmethod
+    def complete(self, task: Task, value: str) -> None:
+        """记录条目成功"""
+
+    @abstractmethod
+    def fail(self, task: Task, error: str) -> None:
+        """记录条目失败"""
+
+    @abstractmethod
+    def finished(self, job_id: str, after_seq: int = 0) -> list[TaskResult]:
+        """返回结束顺序在 `after_seq` 之后的条目结果"""
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        """删除任务的全部条目"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    基于 SQLite 文件的工作队列。
+
+    每个进程打开自己的连接，领取条目时使用 `BEGIN IMMEDIATE` 保证同一条目只分给一个 worker；
+    条目按写入顺序（rowid）领取，先提交的任务先执行。
+    多台机器共享同一个文件时需要文件系统支持 SQLite 的文件锁。
+    """
+
+    def __init__(self, path: str | Path, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                func TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                seq INTEGER,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_until);
+            CREATE INDEX IF NOT EXISTS tasks_seq ON tasks (job_id, seq);
+            """
+        )
+
+    def submit(self, job_id: str, func: str, payloads: list[str]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (job_id, idx, func, payload) VALUES (?, ?, ?, ?)",
+                    [(job_id, i, func, payload) for i, payload in enumerate(payloads)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker_id: str, lease: float = DEFAULT_LEASE) -> Task | None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 租约过期且重试次数用尽的条目标记为失败
+                self._finish_expired(now)
+                row = self._conn.execute(
+                    "SELECT job_id, idx, func, payload, attempts FROM tasks "
+                    "WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY rowid LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job_id, index, func, payload, attempts = row
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ? AND idx = ?",
+                    (worker_id, now + lease, job_id, index),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Task(job_id=job_id, index=index, func=func, payload=payload, attempts=attempts + 1, worker=worker_id)
+
+    def renew(self, task: Task, lease: float = DEFAULT_LEASE) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE job_id = ? AND idx = ? AND status = 'running' AND worker = ?",
+                (time.time() + lease, task.job_id, task.index, task.worker),
+            )
+        return cursor.rowcount > 0
+
+    def _finish_expired(self, now: float) -> None:
+        expired = self._conn.execute(
+            "SELECT job_id, idx FROM tasks WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+            (now, self.max_attempts),
+        ).fetchall()
+        for job_id, index in expired:
+            self._finish(job_id, index, "failed", f"RemoteError: lease expired after {self.max_attempts} attempts")
+
+    def complete(self, task: Task, value: str) -> None:
+        self._finish_task(task, "done", value)
+
+    def fail(self, task: Task, error: str) -> None:
+        self._finish_task(task, "failed", error)
+
+    def _finish_task(self, task: Task, status: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._finish(task.job_id, task.index, status, value)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _finish(self, job_id: str, index: int, status: str, value: str) -> None:
+        self._conn.execute(
+            "UPDATE tasks SET status = ?, result = ?, lease_until = NULL, "
+            "seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks WHERE job_id = ?) "
+            "WHERE job_id = ? AND idx = ? AND status NOT IN ('done', 'failed')",
+            (status, value, job_id, job_id, index),
+        )
+
+    def finished(self, job_id: str, after_seq: int = 0) -> list[TaskResult]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, status, result, seq FROM tasks WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq),
+            ).fetchall()
+        return [TaskResult(index=idx, ok=status == "done", value=result, seq=seq) for idx, status, result, seq in rows]
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE job_id = ?", (job_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def submit(
+    func: Callable[..., Any],
+    *args: Any,
+    queue: WorkQueue,
+    job_id: str | None = None,
+    **kwargs: Any,
+) -> tuple[str, int]:
+    """
+    把 `llm(map_keys=...)` 装饰的函数调用拆分为条目写入队列，返回 (任务ID, 条目数量)。
+
+    被分发的函数必须能通过 `module:qualname` 导入，或在 Worker 的 `functions` 中注册。
+    """
+    prompt = getattr(func, "__func__", func)
+    map_keys = getattr(func, "__map_keys__", None)
+    if not map_keys:
+        raise ValueError("只能分发使用 map_keys 的 llm 函数")
+    m, map_args_index_set, map_kwargs_keys_set = _get_map_keys(prompt, args, kwargs, map_keys)
+    payloads = []
+    for i in range(m):
+        # 每个条目仍以长度为 1 的列表传入映射参数，worker 调用的是同一个装饰后的函数
+        item_args = [[arg[i]] if j in map_args_index_set else arg for j, arg in enumerate(args)]
+        item_kwargs = {key: [value[i]] if key in map_kwargs_keys_set else value for key, value in kwargs.items()}
+        payloads.append(JobStore.encode([item_args, item_kwargs]))
+    job_id = job_id or uuid.uuid4().hex
+    queue.submit(job_id, _func_path(func), payloads)
+    return job_id, m
+
+
+def iter_results(
+    queue: WorkQueue,
+    job_id: str,
+    m: int,
+    *,
+    timeout: float | None = None,
+    poll_interval: float = 0.5,
+    return_exceptions: bool = False,
+) -> Iterator[Any]:
+    """
+    按输入顺序逐个返回任务的结果，前面的条目结束后立即返回，不等待整个任务完成。
+
+    失败的条目在 `return_exceptions=True` 时返回 RemoteError，否则抛出。
+    """
+    buffered: dict[int, TaskResult] = {}
+    after_seq = 0
+    next_index = 0
+    with deadline(timeout):
+        while next_index < m:
+            for result in queue.finished(job_id, after_seq):
+                after_seq = max(after_seq, result.seq)
+                buffered[result.index] = result
+            while next_index in buffered:
+                result = buffered.pop(next_index)
+                next_index += 1
+                if result.ok:
+                    yield JobStore.decode(result.value)
+                elif return_exceptions:
+                    yield RemoteError(result.value)
+                else:
+                    raise RemoteError(f"[{result.index}] {result.value}")
+            if next_index >= m:
+                break
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceededError(f"Job {job_id} did not finish in time ({next_index}/{m} items in order)")
+            time.sleep(poll_interval if left is None else min(poll_interval, left))
+
+
+def map_distributed(
+    func: Callable[..., Any],
+    *args: Any,
+    queue: WorkQueue,
+    job_id: str | None = None,
+    timeout: float | None = None,
+    poll_interval: float = 0.5,
+    return_exceptions: bool = False,
+    **kwargs: Any,
+) -> list[Any]:
+    """
+    分发一个 `llm(map_keys=...)` 调用并等待全部结果，返回与本地调用相同顺序的结果列表。
+
+    与本地批处理一致：`return_exceptions=False` 时有条目失败会在全部条目结束后抛出 BatchError。
+    """
+    job_id, m = submit(func, *args, queue=queue, job_id=job_id, **kwargs)
+    results = list(iter_results(queue, job_id, m, timeout=timeout, poll_interval=poll_interval, return_exceptions=True))
+    errors = {i: result for i, result in enumerate(results) if isinstance(result, RemoteError)}
+    if errors and not return_exceptions:
+        for i in errors:
+            results[i] = None
+        raise BatchError(f"{len(errors)} of {m} items failed", results, errors)  # type: ignore
+    return results
+
+
+class Worker:
+    """
+    从工作队列领取条目并执行的 worker，可以在任意数量的进程或机器上运行。
+
+    Examples:
+        >>> Worker(SQLiteWorkQueue("queue.sqlite3"), concurrency=8).run()
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        *,
+        functions: dict[str, Callable[..., Any]] | None = None,
+        concurrency: int = 1,
+        lease: float = DEFAULT_LEASE,
+        poll_interval: float = 0.5,
+        worker_id: str | None = None,
+    ) -> None:
+        """
+        Args:
+            queue: 工作队列
+            functions: 导入路径到函数的映射，未注册的函数按 `module:qualname` 导入
+            concurrency: 本 worker 同时执行的条目数，即该 worker 自己的并发限制
+            lease: 领取条目后的租约时长（秒），条目运行期间每隔三分之一租约续约一次，
+                worker 崩溃或失去响应超过租约时长后条目才会被重新分发
+            poll_interval: 队列为空时的轮询间隔（秒）
+            worker_id: worker 标识，默认使用主机名和随机后缀
+        """
+        self.queue = queue
+        self.functions = dict(functions or {})
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self._stop_event = threading.Event()
+
+    def register(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """注册一个函数，可用作装饰器"""
+        self.functions[_func_path(func)] = func
+        return func
+
+    def run_once(self) -> bool:
+        """领取并执行一个条目，队列为空时返回 False"""
+        task = self.queue.claim(self.worker_id, self.lease)
+        if task is None:
+            return False
+        try:
+            func = self._resolve(task.func)
+            item_args, item_kwargs = JobStore.decode(task.payload)
+            with self._heartbeat(task):
+                result = func(*item_args, **item_kwargs)
+            if isinstance(result, list) and len(result) == 1:
+                result = result[0]  # 映射参数以长度为 1 的列表传入，结果同样是长度为 1 的列表
+            if isinstance(result, Exception):
+                raise result  # 使用 return_exceptions 的函数把失败放在结果中
+            value = JobStore.encode(result)
+        except Exception as e:
+            self.queue.fail(task, f"{type(e).__name__}: {e}")
+        else:
+            self.queue.complete(task, value)
+        return True
+
+    def run(self, *, stop_when_empty: bool = False) -> None:
+        """
+        持续处理队列中的条目，直到调用 `stop()`；`stop_when_empty=True` 时队列为空即退出。
+        """
+
+        def _loop() -> None:
+            while not self._stop_event.is_set():
+                if not self.run_once():
+                    if stop_when_empty:
+                        return
+                    self._stop_event.wait(self.poll_interval)
+
+        threads = [threading.Thread(target=_loop, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    @contextmanager
+    def _heartbeat(self, task: Task) -> Iterator[None]:
+        """条目运行期间在后台定期续约，运行时间超过租约的条目不会被重复执行"""
+        done = threading.Event()
+
+        def _renew() -> None:
+            while not done.wait(self.lease / 3):
+                if not self.queue.renew(task, self.lease):
+                    return  # 条目已经结束或租约已被其他 worker 接管
+
+        thread = threading.Thread(target=_renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _resolve(self, path: str) -> Callable[..., Any]:
+        func = self.functions.get(path)
+        if func is None:
+            module_name, _, qualname = path.partition(":")
+            target: Any = importlib.import_module(module_name)
+            for attr in qualname.split("."):
+                target = getattr(target, attr)
+            func = self.functions[path] = target
+        return func
+
+
+def _func_path(func: Callable[..., Any]) -> str:
+    return f"{func.__module__}:{func.__qualname__}"
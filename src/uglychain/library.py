@@ -0,0 +1,198 @@
+"""
+library模块提供提示模板库。
+
+PromptLibrary 扫描目录中的提示文件，按与 `load` 相同的方式解析 YAML 前置内容建立索引（不编译模板正文），
+在第一次按名称或 id 访问时才调用 `load` 构建函数，并可以在后台监视提示文件和前置内容中
+`${file:...}` 引用的文件的变化，无需重启即可替换修改过的提示。
+"""
+
+from __future__ import annotations
+
+import logging  # 导入logging模块，用于记录索引错误
+import threading  # 导入threading模块，用于后台监视和保护索引
+from collections.abc import Callable, Iterator  # 导入抽象基类，用于类型提示
+from dataclasses import dataclass, field  # 导入dataclass，用于定义索引条目
+from pathlib import Path  # 导入Path类，用于文件路径操作
+from typing import Any  # 导入Any类型，用于类型提示
+
+from .load import load, parse_frontmatter  # 从当前包导入load函数和前置内容解析函数
+from .utils._load_utils import convert_to_variable_name, referenced_files, resolve_references  # 导入加载工具函数
+
+logger = logging.getLogger(__name__)
+
+INFO_KEYS = ("id", "description", "author", "version", "tags")  # 与 load 写入 Session.info 的键一致
+
+
+@dataclass
+class PromptEntry:
+    """提示库中的一个条目，只包含前置内容中的元数据，函数在第一次访问时构建"""
+
+    path: Path
+    name: str
+    info: dict[str, Any]
+    stamp: tuple[int, int]  # (mtime_ns, size)，用于检测文件变化
+    references: dict[Path, tuple[int, int] | None] = field(default_factory=dict)  # 引用的文件及其状态
+    func: Callable[..., Any] | None = field(default=None, repr=False)
+
+    def references_changed(self) -> bool:
+        return any(_stamp(path) != stamp for path, stamp in self.references.items())
+
+    @property
+    def id(self) -> str | None:
+        return self.info.get("id")
+
+
+class PromptLibrary:
+    """
+    提示模板库，按名称或 id 访问目录中的提示文件。
+
+    Examples:
+        >>> library = PromptLibrary("prompts")
+        >>> library["summarize"]("some text")
+        >>> library.watch()  # 后台监视文件变化，修改后的提示在下一次访问时重新构建
+    """
+
+    def __init__(self, root: str | Path, pattern: str = "**/*.md", **load_kwargs: Any) -> None:
+        """
+        Args:
+            root: 提示文件所在的目录
+            pattern: 匹配提示文件的 glob 模式
+            **load_kwargs: 构建函数时传给 `load` 的额外配置
+        """
+        self.root = Path(root)
+        self.pattern = pattern
+        self.load_kwargs = load_kwargs
+        self._entries: dict[str, PromptEntry] = {}  # 名称 -> 条目
+        self._ids: dict[str, str] = {}  # id -> 名称
+        self._lock = threading.RLock()
+        self._stop_event: threading.Event | None = None
+        self._watch_thread: threading.Thread | None = None
+        self.refresh()
+
+    def refresh(self) -> set[str]:
+        """
+        重新扫描目录，返回新增、修改或删除的提示名称。
+
+        未变化的条目保留已构建的函数；修改过的条目丢弃函数，下一次访问时重新构建。
+        """
+        stamps: dict[Path, tuple[int, int]] = {}
+        for path in sorted(self.root.glob(self.pattern)):
+            if path.is_file():
+                stat = path.stat()
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            old_by_path = {entry.path: entry for entry in self._entries.values()}
+            entries: dict[str, PromptEntry] = {}
+            changed: set[str] = set()
+            for path, stamp in stamps.items():
+                old = old_by_path.get(path)
+                if old is not None and old.stamp == stamp and not old.references_changed():
+                    entry = old
+                else:
+                    try:
+                        entry = self._index(path, stamp)
+                    except Exception as e:
+                        logger.warning(f"Skip prompt file {path}: {e}")
+                        continue
+                    changed.add(entry.name)
+                if entry.name in entries:
+                    logger.warning(f"Duplicate prompt name {entry.name!r} in {path}, keep {entries[entry.name].path}")
+                    continue
+                entries[entry.name] = entry
+            changed.update(name for name in self._entries if name not in entries)
+
+            self._entries = entries
+            self._ids = {entry.id: name for name, entry in entries.items() if entry.id}
+        return changed
+
+    def _index(self, path: Path, stamp: tuple[int, int]) -> PromptEntry:
+        """只解析前置内容建立索引条目，与 `load` 使用同一个解析函数，能被 `load` 加载的文件都会被索引"""
+        configs, _ = parse_frontmatter(path.read_text(encoding="utf-8"))
+        name = convert_to_variable_name(str(resolve_references(configs.get("name", path.name), base_path=path.parent)))
+        info = {key: resolve_references(configs[key], base_path=path.parent) for key in INFO_KEYS if configs.get(key)}
+        references = {ref: _stamp(ref) for ref in referenced_files(configs, base_path=path.parent)}
+        return PromptEntry(path=path, name=name, info=info, stamp=stamp, references=references)
+
+    def entry(self, name_or_id: str) -> PromptEntry:
+        """按名称或 id 查找条目"""
+        with self._lock:
+            name = name_or_id if name_or_id in self._entries else self._ids.get(name_or_id)
+            if name is None:
+                raise KeyError(f"Prompt {name_or_id!r} not found in {self.root}")
+            return self._entries[name]
+
+    def __getitem__(self, name_or_id: str) -> Callable[..., Any]:
+        """按名称或 id 获取提示函数，第一次访问时构建"""
+        entry = self.entry(name_or_id)
+        func = entry.func
+        if func is None:
+            func = load(str(entry.path), **self.load_kwargs)
+            with self._lock:
+                # 构建期间文件可能已被替换，此时只返回函数而不缓存到新条目上
+                if self._entries.get(entry.name) is entry:
+                    entry.func = func
+        return func
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError as e:
+            raise AttributeError(name) from e
+
+    def get(self, name_or_id: str, default: Any = None) -> Any:
+        try:
+            return self[name_or_id]
+        except KeyError:
+            return default
+
+    def __contains__(self, name_or_id: object) -> bool:
+        with self._lock:
+            return name_or_id in self._entries or name_or_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def watch(self, interval: float = 1.0) -> None:
+        """启动后台线程，每隔 `interval` 秒检查一次提示文件和它们引用的文件的变化"""
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        stop_event = threading.Event()
+
+        def _poll() -> None:
+            while not stop_event.wait(interval):
+                try:
+                    changed = self.refresh()
+                except Exception as e:
+                    logger.warning(f"Failed to refresh prompt library {self.root}: {e}")
+                    continue
+                if changed:
+                    logger.info(f"Reloaded prompts: {', '.join(sorted(changed))}")
+
+        self._stop_event = stop_event
+        self._watch_thread = threading.Thread(target=_poll, daemon=True)
+        self._watch_thread.start()
+
+    def stop(self) -> None:
+        """停止后台监视"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+        self._stop_event = None
+        self._watch_thread = None
+
+
+def _stamp(path: Path) -> tuple[int, int] | None:
+    """返回文件的 (mtime_ns, size)，文件不存在时返回 None"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
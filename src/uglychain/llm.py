@@ -6,18 +6,36 @@ llm模块提供了与大型语言模型（LLM）交互的核心功能。
 
 from __future__ import annotations
 
+import copy  # 导入copy模块，用于级联时复制提示内容
 import inspect  # 导入inspect模块，用于检查函数签名
+import threading  # 导入threading模块，用于延迟打开任务存储时加锁
 from collections.abc import Callable, Iterable, Iterator  # 导入各种抽象基类，用于类型提示
-from concurrent.futures import ThreadPoolExecutor, as_completed  # 导入线程池和完成状态，用于并行处理
+from concurrent.futures import Future, wait  # 导入Future和wait，用于收集进程池中的任务
 from functools import wraps  # 导入wraps，用于保留被装饰函数的元数据
-from typing import Any, overload  # 导入Any和overload，用于类型提示
+from typing import Any, Literal, overload  # 导入Any、Literal和overload，用于类型提示
 
 from .client import SUPPORT_MULTIMODAL_MODELS, Client  # 从当前包导入Client和SUPPORT_MULTIMODAL_MODELS
 from .config import config  # 从当前包导入配置
 from .schema import Messages, P, T, ToolResponse  # 从当前包导入Messages、P、T和ToolResponse
-from .session import Session  # 从当前包导入Session
+from .session import CascadeStats, Session  # 从当前包导入Session和级联统计
 from .structured import ResponseModel  # 从当前包导入ResponseModel
-from .utils import Stream, retry  # 从当前包导入Stream和retry工具
+from .utils import (  # 从当前包导入Stream、retry、批处理、任务存储、限流和预算工具
+    BatchError,
+    Budget,
+    JobStore,
+    Stream,
+    get_job_store,
+    get_limiter,
+    request_priority,
+    retry,
+    run_batch,
+    run_first,
+)
+from .utils.deadline import deadline
+from .utils.process_pool import FunctionRef, SharedArgs, SharedRef, get_process_pool, snapshot_choice
+from .utils.retry import is_retryable
+from .utils.scheduler import has_request_context
+from .utils.usage import UsageTracker
 
 
 # 以下是llm装饰器的多个重载定义，用于支持不同的参数组合和返回类型
@@ -244,6 +262,17 @@ def llm(
     response_format: type[T] | None = None,
     session: Session | None = None,
     need_retry: bool = False,
+    return_exceptions: bool = False,
+    job_id: str | None = None,
+    job_store: JobStore | None = None,
+    budget: Budget | None = None,
+    priority: str | None = None,
+    cascade: list[str] | None = None,
+    accept: Callable[[Any], bool] | None = None,
+    models: list[str] | None = None,
+    fan_out: Literal["all", "first"] = "all",
+    model_timeout: float | dict[str, float] | None = None,
+    map_executor: Literal["thread", "process"] = "thread",
     **api_params: Any,
 ) -> (
     Callable[P, str]
@@ -264,7 +293,19 @@ def llm(
         map_keys: 用于批量处理的参数键列表
         response_format: 响应格式类型，用于结构化输出
         session: 会话对象，用于跟踪对话状态
-        need_retry: 是否启用重试机制
+        need_retry: 是否启用重试机制（按批处理中的每一项单独重试）
+        return_exceptions: 批处理时是否将失败条目的异常放入结果列表，否则抛出携带部分结果的 BatchError
+        job_id: 任务ID，设置后每个完成的条目立即持久化，以相同的任务ID重新运行时跳过已完成且输入未变化的条目
+        job_store: 保存任务进度的存储，默认在第一次调用时打开 `config.job_store_path`
+        budget: 用量预算（token 或估算费用），超出后后续调用抛出 BudgetExceededError
+        priority: 请求在调度器中的优先级（"interactive"、"default"、"batch"），默认批处理为 "batch"
+        cascade: 按从便宜到昂贵排列的模型列表，结果解析失败或未通过 `accept` 时升级到下一个模型
+        accept: 可选的置信度检查，接收解析后的结果，返回 False 时升级到下一个模型
+        models: 同时调用的模型列表，返回以模型名称为键的字典
+        fan_out: 多模型调用的方式："all" 等待全部模型，"first" 返回第一个成功的模型
+        model_timeout: 多模型调用时每个模型的超时时间（秒），可以按模型名称分别设置
+        map_executor: 批处理时生成提示和解析结果的方式："thread" 在线程中执行，"process" 在进程池中执行，
+            适合耗时的提示函数和校验器，网络请求仍在线程中并发；此时提示函数和响应类型必须定义在模块级
         **api_params: 传递给LLM API的额外参数
 
     Returns:
@@ -277,9 +318,28 @@ def llm(
         func = func_or_model
     else:
         func = None
-    default_model_from_decorator = model  # 从装饰器获取的默认模型
+    if cascade is not None and not cascade:
+        raise ValueError("cascade 至少需要一个模型")
+    if models is not None and not models:
+        raise ValueError("models 至少需要一个模型")
+    if models and cascade:
+        raise ValueError("models 不能与 cascade 同时使用")
+    if map_executor not in ("thread", "process"):
+        raise ValueError(f"未知的 map_executor {map_executor!r}，可选值为 'thread' 或 'process'")
+    default_model_from_decorator = cascade[0] if cascade else model  # 从装饰器获取的默认模型
     default_session = session or Session()  # 创建或使用传入的会话
+    if budget is not None:
+        default_session.budget = budget
     default_api_params_from_decorator = api_params.copy()  # 复制装饰器级别的API参数
+    store: JobStore | None = job_store  # 任务进度存储，未指定时在第一次调用时才打开
+    store_lock = threading.Lock()
+
+    def get_store() -> JobStore:
+        nonlocal store
+        with store_lock:
+            if store is None:
+                store = get_job_store(config.job_store_path)
+            return store
 
     def parameterized_lm_decorator(
         prompt: Callable[P, str | Messages | None],
@@ -294,12 +354,11 @@ def llm(
             装饰后的函数
         """
 
-        @wraps(prompt)
-        def model_call(
-            *prompt_args: P.args,
-            image: str | list[str] | None = None,  # type: ignore # 图像输入，支持URL或base64
-            api_params: dict[str, Any] | None = None,  # type: ignore # 函数级别的API参数
-            **prompt_kwargs: P.kwargs,
+        def call_in_context(
+            *prompt_args: Any,
+            image: str | list[str] | None = None,  # 图像输入，支持URL或base64
+            api_params: dict[str, Any] | None = None,  # 函数级别的API参数
+            **prompt_kwargs: Any,
         ) -> str | Iterator[str] | ToolResponse | T | list[str] | list[ToolResponse] | list[T]:
             # 格式化函数调用信息用于会话记录
             default_session.func = Session.format_func_call(prompt, *prompt_args, **prompt_kwargs)
@@ -334,47 +393,81 @@ def llm(
                 raise ValueError("n > 1 和列表长度 > 1 不能同时成立")
             if (m > 1 or n > 1) and merged_api_params.get("stream", False):
                 raise ValueError("stream 不能与列表长度 > 1 同时成立")
-
-            def process_single_prompt(i: int) -> Iterable[Any]:
+            if job_id and merged_api_params.get("stream", False):
+                raise ValueError("job_id 不能与 stream 同时使用")
+            if (cascade or models) and merged_api_params.get("stream", False):
+                raise ValueError("cascade 和 models 不能与 stream 同时使用")
+            # 调度优先级：显式指定的优先，其次沿用外层上下文，批处理默认让出给交互式请求；租户默认为会话
+            explicit_context = has_request_context()
+            item_priority = priority or ("batch" if m > 1 and not explicit_context else None)
+            item_tenant = None if explicit_context else default_session.id
+            # 进程池模式：提示函数按引用传给工作进程，所有条目共用的参数放入共享内存；
+            # 提示生成和响应解析直接提交到进程池，工作线程只负责发出请求，不等待解析
+            use_processes = map_executor == "process" and m > 1
+            prompt_ref = FunctionRef.of(prompt) if use_processes else None
+            prompt_futures: list[Future[str | Messages]] = []  # 进程池中生成的各条目的提示内容
+
+            def process_single_prompt(i: int, defer_parse: bool = False) -> Iterable[Any] | Future[list[Any]]:
                 """
                 处理单个提示的内部函数。
 
                 Args:
                     i: 批处理索引
+                    defer_parse: 是否把响应提交到进程池解析并返回 Future，不等待解析结果
 
                 Returns:
-                    处理结果的迭代器
+                    处理结果的迭代器，或解析结果的 Future
                 """
-                # 根据映射键索引获取对应的参数
-                args = [arg[i] if j in map_args_index_set else arg for j, arg in enumerate(prompt_args)]  # type: ignore
-                kwargs = {
-                    key: value[i] if key in map_kwargs_keys_set else value  # type: ignore
-                    for key, value in prompt_kwargs.items()
-                }
-                # 生成提示内容
-                res = gen_prompt(prompt, *args, **kwargs)
+                if prompt_futures:
+                    res = prompt_futures[i].result()
+                else:
+                    # 根据映射键索引获取对应的参数
+                    args = [arg[i] if j in map_args_index_set else arg for j, arg in enumerate(prompt_args)]  # type: ignore
+                    kwargs = {
+                        key: value[i] if key in map_kwargs_keys_set else value  # type: ignore
+                        for key, value in prompt_kwargs.items()
+                    }
+                    # 生成提示内容
+                    res = gen_prompt(prompt, *args, **kwargs)
                 assert (
                     isinstance(res, str) or isinstance(res, list) and all(isinstance(item, dict) for item in res)
                 ), ValueError("被修饰的函数返回值必须是 str 或 `messages`(list[dict[str, str]]) 类型")
-                # 生成消息格式
-                messages = _gen_messages(res, prompt, image)
-                # 处理响应模型参数
-                response_model.process_parameters(model, messages, merged_api_params)
-
-                # 发送API参数和消息到会话
-                default_session.send("api_params", merged_api_params)
-                default_session.send(
-                    "messages", messages, id=default_session.id, session_type=default_session.session_type
-                )
 
-                # 调用客户端生成响应
-                response = Client.generate(model, messages, **merged_api_params)
+                def generate(model_name: str, model_response: ResponseModel, params: dict[str, Any]) -> Any:
+                    # 生成消息格式；级联时每次尝试都重新生成，避免上一个模型的格式提示残留在消息中
+                    messages = _gen_messages(copy.deepcopy(res) if cascade else res, prompt, image)
+                    # 处理响应模型参数
+                    model_response.process_parameters(model_name, messages, params)
+
+                    # 发送API参数和消息到会话
+                    default_session.send("api_params", params)
+                    default_session.send(
+                        "messages", messages, id=default_session.id, session_type=default_session.session_type
+                    )
+
+                    # 调用客户端生成响应，用量记入会话
+                    with default_session.track_usage(prompt.__name__), request_priority(item_priority, item_tenant):
+                        return Client.generate(model_name, messages, **params)
+
+                if cascade:
+                    # 依次尝试级联中的模型，接受第一个通过校验的结果
+                    result = _run_cascade(
+                        cascade, generate, prompt, response_format, merged_api_params, accept, default_session.cascade
+                    )
+                    default_session.send("progress_intermediate")
+                    default_session.send("results", result)
+                    return result
+
+                response = generate(model, response_model, merged_api_params)
 
                 if merged_api_params.get("stream", False):
                     # 处理流式响应
                     stream = Stream(process_stream_resopnse(response))
                     default_session.send("results", stream)
-                    return stream.iterator
+                    return stream
+                elif defer_parse:
+                    choices = [snapshot_choice(choice) for choice in response]
+                    return get_process_pool().submit(_parse_in_worker, response_model, choices)
                 else:
                     # 处理普通响应
                     result = [response_model.parse_from_response(choice) for choice in response]
@@ -382,26 +475,99 @@ def llm(
                     default_session.send("results", result)
                     return result
 
+            def fingerprint(i: int) -> str:
+                # 条目的输入摘要：同一个任务ID下输入变化的条目不会复用旧的结果
+                args = [arg[i] if j in map_args_index_set else arg for j, arg in enumerate(prompt_args)]  # type: ignore
+                kwargs = {
+                    key: value[i] if key in map_kwargs_keys_set else value  # type: ignore
+                    for key, value in prompt_kwargs.items()
+                }
+                return JobStore.fingerprint([args, kwargs, image, model, merged_api_params])
+
+            def wrap_item(item: Callable[[int], Any]) -> Callable[[int], Any]:
+                # 如果需要重试，则对每一项单独重试，避免一个失败的条目导致整个批次重跑
+                item = _retry_item(item) if need_retry else item
+                if job_id:
+                    item = _checkpointed(item, get_store(), job_id, fingerprint)
+                return item
+
+            process_item = wrap_item(process_single_prompt)
+
+            def collect_parsed(items: list[Any]) -> list[Any]:
+                """等待进程池中的解析结果；解析失败且可以重试的条目像线程模式一样在当前进程中重新请求"""
+                failed: list[int] = []
+                for i, item in enumerate(items):
+                    if isinstance(item, Future):
+                        try:
+                            items[i] = item.result()
+                        except Exception as e:
+                            items[i] = e
+                            if is_retryable(e):
+                                failed.append(i)
+                            continue
+                        default_session.send("progress_intermediate")
+                        default_session.send("results", items[i])
+                if need_retry and failed:
+                    reruns = _run_items(lambda k: process_item(failed[k]), len(failed), model, return_exceptions=True)
+                    for i, rerun in zip(failed, reruns, strict=True):
+                        items[i] = rerun
+                errors = {i: item for i, item in enumerate(items) if isinstance(item, Exception)}
+                if errors and not return_exceptions:
+                    results = [None if isinstance(item, Exception) else item for item in items]
+                    raise BatchError(f"{len(errors)} of {m} items failed", results, errors)
+                return items
+
             results: list[str] | list[ToolResponse] | list[T] = []
 
             # 发送进度开始信号
             default_session.send("progress_start", m if m > 1 else n)
 
             if merged_api_params.get("stream", False):
-                # 返回流式响应的生成器
-                return (item for item in process_single_prompt(0) if isinstance(item, str) and item)
+                # 返回流式响应的生成器，调用方提前关闭生成器时会停止底层的流
+                return _iter_stream_text(process_item(0))
 
-            if config.use_parallel_processing:
-                # 使用并行处理
-                with ThreadPoolExecutor() as executor:
-                    futures = [executor.submit(process_single_prompt, i) for i in range(m)]
-
-                    for future in as_completed(futures):
-                        results.extend(future.result())
+            if m == 1:
+                results.extend(process_item(0))
             else:
-                # 串行处理
-                for i in range(m):
-                    results.extend(process_single_prompt(i))
+                shared_args = (
+                    SharedArgs(
+                        (
+                            {j: arg for j, arg in enumerate(prompt_args) if j not in map_args_index_set},
+                            {key: v for key, v in prompt_kwargs.items() if key not in map_kwargs_keys_set},
+                        )
+                    )
+                    if use_processes
+                    else None
+                )
+                try:
+                    if shared_args is not None and prompt_ref is not None:
+                        # 所有条目的提示一次性提交到进程池，只传递共享内存的句柄和当前条目的映射参数
+                        pool = get_process_pool()
+                        prompt_futures.extend(
+                            pool.submit(
+                                _gen_prompt_in_worker,
+                                prompt_ref,
+                                shared_args.ref,
+                                {j: prompt_args[j][i] for j in map_args_index_set},
+                                {key: prompt_kwargs[key][i] for key in map_kwargs_keys_set},
+                            )
+                            for i in range(m)
+                        )
+                        # 工作线程发出请求后把解析提交到进程池，全部请求结束后再统一收集解析结果
+                        deferred = wrap_item(lambda i: process_single_prompt(i, defer_parse=True))
+                        items = collect_parsed(_run_items(deferred, m, model, return_exceptions=True))
+                    else:
+                        # 逐项处理，结果按输入顺序排列，失败的条目单独报告
+                        items = _run_items(process_item, m, model, return_exceptions=return_exceptions)
+                finally:
+                    if shared_args is not None:
+                        wait(prompt_futures)  # 工作进程读取完共享参数后才能释放共享内存
+                        shared_args.close()
+                for item in items:
+                    if isinstance(item, Exception):
+                        results.append(item)  # type: ignore
+                    else:
+                        results.extend(item)
 
             # 发送进度结束信号
             default_session.send("progress_end")
@@ -412,15 +578,32 @@ def llm(
                 results if "n" in merged_api_params and merged_api_params["n"] is not None or map_keys else results[0]
             )
 
+        @wraps(prompt)
+        def model_call(
+            *prompt_args: P.args,
+            image: str | list[str] | None = None,  # type: ignore # 图像输入，支持URL或base64
+            api_params: dict[str, Any] | None = None,  # type: ignore # 函数级别的API参数
+            **prompt_kwargs: P.kwargs,
+        ) -> str | Iterator[str] | ToolResponse | T | list[str] | list[ToolResponse] | list[T] | dict[str, Any]:
+            if models and not (api_params and "model" in api_params):
+                # 多模型调用：每个模型以函数级别的 model 参数调用自身，并发执行
+                def call_model(model_name: str) -> Any:
+                    model_params = {**(api_params or {}), "model": model_name}
+                    with deadline(_model_timeout(model_timeout, model_name)):
+                        return model_call(*prompt_args, image=image, api_params=model_params, **prompt_kwargs)
+
+                return _fan_out(models, call_model, fan_out, return_exceptions)
+
+            # 函数、模型等调用状态保存在调用上下文中，同一个函数可以被多个线程或协程同时调用
+            with default_session.call():
+                return call_in_context(*prompt_args, image=image, api_params=api_params, **prompt_kwargs)
+
         # 添加元数据到装饰后的函数
         model_call.__api_params__ = default_api_params_from_decorator  # type: ignore
         model_call.__func__ = prompt  # type: ignore
+        model_call.__map_keys__ = map_keys  # type: ignore
 
-        if need_retry:
-            # 如果需要重试，则包装重试逻辑
-            return retry(n=config.llm_max_retry, timeout=config.llm_timeout, wait=config.llm_wait_time)(model_call)  # type: ignore
-        else:
-            return model_call  # type: ignore
+        return model_call  # type: ignore
 
     # 检查是否直接应用装饰器而不是传递参数
     if func is not None:
@@ -429,6 +612,155 @@ def llm(
     return parameterized_lm_decorator
 
 
+def _fan_out(models: list[str], call_model: Callable[[str], Any], mode: str, return_exceptions: bool) -> dict[str, Any]:
+    """
+    并发地用多个模型执行同一个提示，总耗时取决于最慢（"all"）或最快（"first"）的模型。
+
+    "all" 返回每个模型的结果，失败的模型按 `return_exceptions` 放入异常或抛出 BatchError；
+    "first" 只返回第一个成功的模型的结果，不等待其余模型，其余模型不再发出新的请求和重试，
+    已经发出的请求在后台结束，不占用共享线程池。两种模式都在共享线程池中执行。
+    """
+    if mode == "first":
+        i, result = run_first(lambda i: call_model(models[i]), len(models))
+        return {models[i]: result}
+    if mode != "all":
+        raise ValueError(f"未知的 fan_out 模式 {mode!r}，可选值为 'all' 或 'first'")
+    results = run_batch(
+        lambda i: call_model(models[i]),
+        len(models),
+        parallel=True,
+        max_workers=len(models),
+        return_exceptions=return_exceptions,
+        shared=True,
+    )
+    return dict(zip(models, results, strict=True))
+
+
+def _model_timeout(model_timeout: float | dict[str, float] | None, model: str) -> float | None:
+    if isinstance(model_timeout, dict):
+        return model_timeout.get(model)
+    return model_timeout
+
+
+def _run_cascade(
+    models: list[str],
+    generate: Callable[[str, ResponseModel, dict[str, Any]], Any],
+    prompt: Callable,
+    response_format: type[T] | None,
+    api_params: dict[str, Any],
+    accept: Callable[[Any], bool] | None,
+    stats: CascadeStats,
+) -> list[Any]:
+    """
+    依次用级联中的模型生成并解析结果，返回第一个通过校验和置信度检查的结果。
+
+    最后一个模型的结果只要能解析就会被接受；所有模型都解析失败时抛出最后一个错误。
+    每次尝试的用量单独统计，用于估算与全部使用最后一个模型相比节省的费用。
+    """
+    final_prices = config.model_prices.get(models[-1])
+    cost = 0.0
+    error: Exception | None = None
+    for i, model in enumerate(models):
+        is_last = i == len(models) - 1
+        response_model = ResponseModel[T](prompt, response_format)  # 每个模型的结构化模式可能不同
+        attempt = UsageTracker()
+        try:
+            with attempt.track(prompt.__name__):
+                response = generate(model, response_model, api_params.copy())
+            result = [response_model.parse_from_response(choice) for choice in response]
+        except ValueError as e:
+            error = e  # 结果未通过 ResponseModel 的校验，升级到下一个模型
+            continue
+        finally:
+            cost += attempt.total.cost
+        if is_last or accept is None or all(accept(item) for item in result):
+            stats.record(model, i, cost, attempt.total.estimate_cost(final_prices))
+            return result
+    stats.record(None, len(models) - 1, cost, 0.0)
+    assert error is not None
+    raise error
+
+
+def _gen_prompt_in_worker(
+    prompt_ref: FunctionRef, shared_ref: SharedRef, mapped_args: dict[int, Any], mapped_kwargs: dict[str, Any]
+) -> str | Messages:
+    """在工作进程中组合共享参数和当前条目的映射参数，生成提示内容"""
+    shared_args, shared_kwargs = shared_ref.load()
+    positional = {**shared_args, **mapped_args}
+    args = [positional[j] for j in sorted(positional)]  # 按参数原来的位置排列
+    return gen_prompt(prompt_ref.resolve(), *args, **shared_kwargs, **mapped_kwargs)
+
+
+def _parse_in_worker(response_model: ResponseModel, choices: list[Any]) -> list[Any]:
+    """在工作进程中解析并校验响应"""
+    return [response_model.parse_from_response(choice) for choice in choices]
+
+
+def _retry_item(func: Callable[[int], Any]) -> Callable[[int], Any]:
+    """按配置的重试策略包装批处理中单个条目的处理函数"""
+    return retry(
+        n=config.llm_max_retry,
+        timeout=config.llm_timeout,
+        wait=config.llm_wait_time,
+        max_wait=config.llm_max_wait_time,
+    )(func)
+
+
+def _run_items(
+    process_item: Callable[[int], Any],
+    m: int,
+    model: str,
+    *,
+    return_exceptions: bool = False,
+    parallel: bool | None = None,
+) -> list[Any]:
+    """
+    执行批处理中的 m 个条目，结果按输入顺序返回。
+
+    并发数不超过当前上下文的 `config.max_concurrency`，启用自适应并发时还受 `model` 共享的限流器动态调整的上限限制；
+    `parallel` 默认取 `config.use_parallel_processing`。
+    """
+    return run_batch(
+        process_item,
+        m,
+        parallel=config.use_parallel_processing if parallel is None else parallel,
+        max_workers=config.max_concurrency,
+        return_exceptions=return_exceptions,
+        limiter=get_limiter(model, initial=min(4, config.max_concurrency)) if config.adaptive_concurrency else None,
+    )
+
+
+def _checkpointed(
+    process_item: Callable[[int], Any], store: JobStore, job_id: str, fingerprint: Callable[[int], str]
+) -> Callable[[int], Any]:
+    """
+    跳过任务中已完成且输入摘要相同的条目，新完成的条目连同输入摘要立即写入存储。
+
+    条目返回 Future（进程池中解析）时，在解析成功后写入。
+    """
+    completed = store.load(job_id)
+
+    def process(i: int) -> Any:
+        key = fingerprint(i)
+        record = completed.get(i)
+        if isinstance(record, dict) and record.get("input") == key:
+            return record["output"]
+        result = process_item(i)
+        if isinstance(result, Future):
+
+            def save(future: Future[list[Any]]) -> None:
+                if future.exception() is None:
+                    store.save(job_id, i, {"input": key, "output": future.result()})
+
+            result.add_done_callback(save)
+            return result
+        result = list(result)
+        store.save(job_id, i, {"input": key, "output": result})
+        return result
+
+    return process
+
+
 def _get_map_keys(
     prompt: Callable, prompt_args: tuple, prompt_kwargs: dict, map_keys: list[str] | None
 ) -> tuple[int, set[int], set[str]]:
@@ -562,6 +894,17 @@ def gen_prompt(prompt: Callable[P, str | Messages | None], *args: Any, **kwargs:
     return "\n".join(segments)
 
 
+def _iter_stream_text(stream: Iterable[Any]) -> Iterator[str]:
+    """逐个返回流中的非空文本；迭代结束或调用方关闭生成器时停止底层的流"""
+    try:
+        for item in stream:
+            if isinstance(item, str) and item:
+                yield item
+    finally:
+        if isinstance(stream, Stream):
+            stream.close()
+
+
 def process_stream_resopnse(response: Iterable) -> Iterator[str]:
     """
     处理流式响应，特别处理推理内容（reasoning content）。
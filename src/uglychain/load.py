@@ -8,8 +8,9 @@ from __future__ import annotations
 
 import inspect  # 导入inspect模块，用于检查和操作函数签名
 import re  # 导入re模块，用于正则表达式匹配
+import threading  # 导入threading模块，用于保护模板缓存
 from collections.abc import Callable, Iterator  # 导入抽象基类，用于类型提示
-from functools import partial  # 导入partial，用于创建偏函数
+from dataclasses import dataclass  # 导入dataclass，用于定义编译后的模板
 from pathlib import Path  # 导入Path类，用于文件路径操作
 from typing import Any  # 导入Any类型，用于类型提示
 
@@ -28,6 +29,98 @@ PROMPT_PATTERN = re.compile(r"-{3,}\n(.*)-{3,}\n(.*)", re.DOTALL)  # 匹配YAML
 PLACEHOLDER_PATTERN = re.compile(r"(?<!{){([^{}\n]+)}(?!})")  # 匹配占位符的正则表达式
 
 
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    编译后的提示模板。
+
+    用户提示模板预先拆分为字面量片段和占位符，填充时只需按顺序拼接，
+    不再对模板执行正则替换。`literals` 比 `placeholders` 多一个元素。
+    """
+
+    configs: dict[str, Any]  # 未解析引用的 YAML 前置内容
+    system_prompt: str
+    literals: tuple[str, ...]
+    placeholders: tuple[str, ...]
+
+    @property
+    def inputs(self) -> list[str]:
+        """模板中的占位符名称，按出现顺序排列"""
+        return list(self.placeholders)
+
+    def render(self, kwargs: dict[str, Any]) -> str:
+        """用 kwargs 填充模板，找不到对应值的占位符保持原样"""
+        parts = [self.literals[0]]
+        for key, literal in zip(self.placeholders, self.literals[1:], strict=True):
+            parts.append(kwargs.get(key, f"{{{key}}}"))
+            parts.append(literal)
+        return "".join(parts)
+
+
+# 进程级模板缓存：解析后的文件路径 -> ((mtime_ns, size), 编译后的模板)
+_template_cache: dict[Path, tuple[tuple[int, int], CompiledTemplate]] = {}
+_template_cache_lock = threading.Lock()
+
+
+def clear_template_cache() -> None:
+    """清空模板缓存"""
+    with _template_cache_lock:
+        _template_cache.clear()
+
+
+def parse_frontmatter(content: str) -> tuple[dict[str, Any], str]:
+    """
+    分离提示文件的 YAML 前置内容和提示模板，只解析前置内容。
+
+    `load` 和提示库的索引都使用这个函数，能被 `load` 加载的文件都能被索引，反之亦然。
+    """
+    result = PROMPT_PATTERN.search(content)  # 搜索YAML前置内容和模板
+    if not result:
+        raise ValueError(
+            "Illegal formatting of prompt file. The file should be in markdown format with two parts:\n"
+            "1. YAML frontmatter between --- markers\n"
+            "2. Prompt template in YAML format"
+        )
+    config_content, prompt_template = result.groups()
+    configs = YAML_INSTANCE.load(config_content)  # 解析YAML配置
+    if not isinstance(configs, dict):
+        raise ValueError("YAML frontmatter must be a dictionary.")
+    return configs, prompt_template
+
+
+def compile_template(path: Path) -> CompiledTemplate:
+    """
+    读取并编译提示文件，结果按文件路径和修改时间缓存。
+
+    文件被修改（mtime 或大小变化）后会重新编译；`${file:...}` 等引用不在缓存中解析，
+    每次 `load` 时重新解析，因此被引用文件的修改同样会生效。
+    """
+    path = path.resolve()
+    stat = path.stat()  # 文件不存在时抛出 FileNotFoundError
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _template_cache_lock:
+        cached = _template_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    # 读取文件内容，分离配置内容和提示模板
+    configs, prompt_template = parse_frontmatter(path.read_text(encoding="utf-8"))
+
+    # 处理提示模板
+    system_prompt, user_prompt_template = _parse_prompt_template(prompt_template)  # 解析提示模板
+    # re.split 的结果中，偶数位置是字面量，奇数位置是占位符名称
+    segments = PLACEHOLDER_PATTERN.split(user_prompt_template)
+    template = CompiledTemplate(
+        configs=configs,
+        system_prompt=system_prompt,
+        literals=tuple(segments[0::2]),
+        placeholders=tuple(segments[1::2]),
+    )
+    with _template_cache_lock:
+        _template_cache[path] = (stamp, template)
+    return template
+
+
 def load(
     path_str: str, **kwargs: Any
 ) -> Callable[..., str | Iterator[str] | ToolResponse | list[str] | list[ToolResponse]]:
@@ -38,6 +131,8 @@ def load(
     1. YAML前置内容：包含模型、名称、描述等配置信息
     2. 提示模板：包含实际的提示模板和占位符
 
+    编译后的模板按文件路径和修改时间缓存，重复加载同一文件不会重新解析。
+
     Args:
         path_str: 提示模板文件的路径
         **kwargs: 用于覆盖YAML前置内容的额外配置
@@ -50,23 +145,10 @@ def load(
         FileNotFoundError: 如果提示文件不存在
     """
     path = Path(path_str)  # 创建Path对象
+    template = compile_template(path)
 
-    # 读取文件内容
-    content = path.read_text(encoding="utf-8")
-    result = PROMPT_PATTERN.search(content)  # 搜索YAML前置内容和模板
-    if not result:
-        raise ValueError(
-            "Illegal formatting of prompt file. The file should be in markdown format with two parts:\n"
-            "1. YAML frontmatter between --- markers\n"
-            "2. Prompt template in YAML format"
-        )
-    config_content, prompt_template = result.groups()  # 分离配置内容和提示模板
-
-    # 处理配置内容
-    configs = YAML_INSTANCE.load(config_content)  # 解析YAML配置
-    if not isinstance(configs, dict):
-        raise ValueError("YAML frontmatter must be a dictionary.")
-    configs = resolve_references(configs, base_path=path.parent)  # 解析配置中的引用
+    # 解析引用会生成新的字典，缓存中的配置不会被修改
+    configs = resolve_references(template.configs, base_path=path.parent)  # 解析配置中的引用
     configs = update_dict_recursively(configs, resolve_references(kwargs, base_path=path.parent))  # type: ignore  # 合并传入的配置
 
     # 从配置文件中解析出name, description, model, map_keys等信息
@@ -80,9 +162,7 @@ def load(
     model = configs.pop("model", "")  # 获取模型名称
     map_keys: list[str] | None = configs.pop("map_keys", None)  # 获取映射键
 
-    # 处理提示模板
-    system_prompt, user_prompt_template = _parse_prompt_template(prompt_template)  # 解析提示模板
-    inputs = PLACEHOLDER_PATTERN.findall(user_prompt_template)  # 查找所有占位符
+    inputs = template.inputs  # 模板中的所有占位符
     parameters = []
     # 为每个占位符创建函数参数
     for input in inputs:
@@ -103,38 +183,18 @@ def load(
         # 将位置参数转换为关键字参数
         for i, arg in enumerate(args):
             kwargs[inputs[i]] = arg
-        # 创建占位符替换函数
-        _replace = partial(_replace_placeholder, kwargs=kwargs)
-
-        # 替换模板中的占位符
-        result = PLACEHOLDER_PATTERN.sub(_replace, user_prompt_template)
-        return result
+        # 按顺序拼接预先拆分的模板片段
+        return template.render(kwargs)
 
     if name:
         func.__name__ = name  # 设置函数名称
-    func.__doc__ = system_prompt  # 设置函数文档字符串为系统提示
+    func.__doc__ = template.system_prompt  # 设置函数文档字符串为系统提示
     func.__signature__ = new_sig  # type: ignore  # 设置函数签名
 
     # 使用llm装饰器包装函数
     return llm(model, response_format=None, map_keys=map_keys, session=session, **configs)(func)
 
 
-def _replace_placeholder(match: re.Match[str], kwargs: dict[str, Any]) -> str:
-    """
-    替换占位符的辅助函数。
-
-    Args:
-        match: 正则表达式匹配对象
-        kwargs: 包含替换值的字典
-
-    Returns:
-        替换后的字符串，如果找不到对应的值则返回原始占位符
-    """
-    key = match.group(1)  # 获取占位符键名
-    value = kwargs.get(key, match.group(0))  # 获取对应的值，如果不存在则返回原始匹配
-    return value
-
-
 def _parse_prompt_template(prompt_template: str) -> tuple[str, str]:
     """
     解析提示模板为系统提示和用户提示。
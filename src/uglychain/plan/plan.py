@@ -11,6 +11,8 @@ from ..react import react
 from ..react.action import Action
 from ..schema import Messages
 from ..tools import Tools, convert_to_tool_list, get_tools_descriptions
+from ..utils.deadline import check_deadline, deadline, split
+from ..utils.usage import Budget, UsageTracker, check_budget
 from .prompt import INITIAL_PLAN, UPDATE_PLAN_SYSTEM, UPDATE_PLAN_USER
 
 PLANNING_INTERVAL = 6
@@ -56,9 +58,12 @@ def update_planning(
 class Plan:
     task: str
     tools: Tools
-    model: str = field(default=config.default_model)
+    model: str = field(default_factory=lambda: config.default_model)
     planning_interval: int = field(default=PLANNING_INTERVAL)
     max_steps: int = field(default=MAX_STEPS)
+    timeout: float | None = field(default=None)
+    budget: Budget | None = field(default=None)
+    usage: UsageTracker = field(init=False, default_factory=UsageTracker)
     is_first_time: bool = field(init=False, default=True)
     _memory_message: Messages = field(init=False, default_factory=list)
 
@@ -102,14 +107,24 @@ class Plan:
         self._memory_message.extend(messages)
         return self._memory_message
 
-    def process(self) -> str:
-        remaining_steps = self.max_steps
-        history: list[Action] = []
-        acts = self.react(self.gen_messages())
-
-        while not acts[-1].done:
-            remaining_steps -= len(acts)
-            history.extend(acts)
-            acts = self.react(self.gen_messages(acts, remaining_steps))
+    def _rounds_left(self, remaining_steps: int) -> int:
+        return max(-(-remaining_steps // self.planning_interval), 1)
 
-        return acts[-1].obs
+    def process(self) -> str:
+        self.usage.budget = self.budget
+        # 整个规划过程共享一个时间预算（按剩余轮数平均分配）和用量预算
+        with deadline(self.timeout), self.usage.track("plan"):
+            remaining_steps = self.max_steps
+            history: list[Action] = []
+            with deadline(split(self._rounds_left(remaining_steps))):
+                acts = self.react(self.gen_messages())
+
+            while not acts[-1].done:
+                check_deadline()
+                check_budget()
+                remaining_steps -= len(acts)
+                history.extend(acts)
+                with deadline(split(self._rounds_left(remaining_steps))):
+                    acts = self.react(self.gen_messages(acts, remaining_steps))
+
+            return acts[-1].obs
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from functools import cached_property
 from typing import Any
@@ -13,6 +14,8 @@ class Action:
     thought: str = ""
     tool: str = ""
     args: dict[str, Any] = field(default_factory=dict)
+    call_id: str = ""  # 原生函数调用模式下提供商返回的工具调用ID
+    step: int = 0  # 所属的 ReAct 步骤，同一步可能有多个并行执行的动作
     obs: str = field(init=False, default="")
     image: str | None = field(init=False, default=None)
 
@@ -56,6 +59,41 @@ class Action:
             )
         raise ValueError("Can't parse the response, No `Action` or `Action Input`")
 
+    @classmethod
+    def from_response_all(cls, text: str) -> list[Action]:
+        """解析一步中的所有动作，模型可以在一次回复中写出多组 `Action`/`Action Input`"""
+        matches = list(_ACTION_PATTERN.finditer(text))
+        if len(matches) <= 1:
+            return [cls.from_response(text)]
+        acts = []
+        start = 0
+        for match in matches:
+            thought = text[start : match.start()].strip()
+            if thought.startswith("Thought:"):
+                thought = thought[len("Thought:") :]
+            acts.append(
+                cls(
+                    thought=thought,
+                    tool=_fix_func_name(match.group(1).strip().split("#")[0]),
+                    args=parse_response_to_dict(match.group(2)),
+                )
+            )
+            start = match.end()
+        return acts
+
+
+# 每组动作从 `Action:` 开始，`Action Input:` 到下一行开头的 `Thought:`、`Action:` 或 `Observation:` 为止
+_ACTION_PATTERN = re.compile(
+    r"^[ \t]*Action:(.*?)^[ \t]*Action Input:(.*?)(?=^[ \t]*(?:Thought|Action|Observation):|\Z)", re.S | re.M
+)
+
+
+def last_step(acts: Sequence[Action]) -> list[Action]:
+    """返回最后一步的所有动作"""
+    if not acts:
+        return []
+    return [act for act in acts if act.step == acts[-1].step]
+
 
 def _fix_func_name(func_name: str) -> str:
     name = func_name.strip()
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterator, Sequence
 from dataclasses import dataclass, field
 from functools import cached_property
 from typing import Any, Generic
@@ -11,6 +11,7 @@ from uglychain.session import Session
 from uglychain.tools import BaseTool, get_tools_descriptions
 
 from .action import Action
+from .transcript import Transcript
 
 
 @dataclass
@@ -24,7 +25,7 @@ class BaseReActProcess(Generic[T], ABC):
 
     @cached_property
     @abstractmethod
-    def react(self) -> Callable[..., Action]:
+    def react(self) -> Callable[..., Action | list[Action]]:
         pass
 
     @cached_property
@@ -32,6 +33,14 @@ class BaseReActProcess(Generic[T], ABC):
     def final(self) -> Callable[..., str | Iterator[str] | T]:
         pass
 
+    @abstractmethod
+    def render_step(self, acts: Sequence[Action]) -> Messages:
+        """把一步已经执行完的动作和观察结果渲染为追加到记录末尾的消息"""
+
+    def transcript(self) -> Transcript:
+        """为一次 ReAct 调用创建新的消息记录"""
+        return Transcript(self.render_step)
+
     @cached_property
     def tools_descriptions(self) -> str:
         return get_tools_descriptions(self.tools)
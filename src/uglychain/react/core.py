@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterator, Sequence
 from functools import wraps
-from typing import Any, overload
+from typing import Any, Literal, overload
 
 from uglychain.config import config
 from uglychain.schema import Messages, P, T
 from uglychain.session import Session
-from uglychain.tools import Tool, Tools, convert_to_tool_list, final_answer
+from uglychain.tools import Tools, convert_to_tool_list, final_answer
+from uglychain.utils.deadline import check_deadline, deadline, split
+from uglychain.utils.usage import Budget, check_budget
 
 from .action import Action
 from .base import BaseReActProcess
+from .executor import ToolExecutor
 from .get_process import get_react_process
 
 
@@ -50,10 +53,19 @@ def react(
     *,
     response_format: type[T] | type[list[Action]] | None = None,
     max_steps: int = -1,
+    timeout: float | None = None,
     session: Session | None = None,
+    budget: Budget | None = None,
+    mode: Literal["text", "native"] = "text",
+    parallel_tools: int = 4,  # 一步中多个工具调用最多同时执行的数量，1 表示逐个执行
+    tool_limits: dict[str, int] | None = None,  # 按工具名限制同时执行的调用数
+    tool_timeout: float | dict[str, float] | None = None,  # 工具调用的超时时间（秒），可以按工具名设置
     **api_params: Any,
 ) -> Callable[[Callable[P, str | Messages | None]], Callable[P, str | T | list[Action]]]:
+    executor = ToolExecutor(parallel_tools, dict(tool_limits or {}), tool_timeout)
     default_session = session or Session("react")
+    if budget is not None:
+        default_session.budget = budget
 
     output_acts: bool = False
     if response_format == list[Action]:
@@ -67,6 +79,7 @@ def react(
         tools=convert_to_tool_list(tools),
         response_format=default_response_format,
         api_params=api_params.copy(),
+        mode=mode,
     )
     process.tools.append(final_answer)
     default_session.model = process.model
@@ -80,30 +93,42 @@ def react(
             **prompt_kwargs: P.kwargs,
         ) -> str | T | list[Action]:
             process.func = prompt
-            default_session.func = Session.format_func_call(prompt, *prompt_args, **prompt_kwargs)
-            default_session.show_base_info()
-
-            react_times = 0
-            acts: list[Action] = []
-            act = Action()
-            while react_times == 0 or not act.done and (max_steps < 0 or react_times < max_steps):
-                react_times += 1
-                default_session.send("rule", f"Step {react_times}")
-                image = act.image  # 如果上次的结果中有图片
-                act = process.react(*prompt_args, image=image, acts=acts, **prompt_kwargs)
-                process_act(default_session, act)  # 工具执行
-                acts.append(act)
-
-            response: str | Iterator[str] | T = act.obs
-            if output_acts:
-                return acts
-            if not act.done and react_times >= max_steps:
-                response = process.final(*prompt_args, acts=acts, call_type="failed", **prompt_kwargs)
-            elif process.response_format is not None:
-                response = process.final(*prompt_args, acts=acts, call_type="trans", **prompt_kwargs)
-            if isinstance(response, Iterator):
-                response = "".join(response)
-            return response
+            # 每次调用的函数和显示状态保存在调用上下文中；整个 ReAct 过程共享一个时间预算和用量预算
+            with (
+                default_session.call(Session.format_func_call(prompt, *prompt_args, **prompt_kwargs)),
+                deadline(timeout),
+                default_session.track_usage(prompt.__name__),
+            ):
+                default_session.show_base_info()
+                react_times = 0
+                transcript = process.transcript()  # 每次调用一份只追加的消息记录
+                act = Action()
+                while react_times == 0 or not act.done and (max_steps < 0 or react_times < max_steps):
+                    check_deadline()
+                    check_budget()  # 预算用完时提前停止，而不是继续跑满 max_steps
+                    steps_left = max_steps - react_times if max_steps > 0 else 1
+                    react_times += 1
+                    default_session.send("rule", f"Step {react_times}")
+                    with deadline(split(steps_left)):  # 剩余时间平均分给剩余的步骤
+                        result = process.react(*prompt_args, transcript=transcript, **prompt_kwargs)
+                    step_acts = result if isinstance(result, list) else [result]  # 一步可能调用多个工具
+                    for step_act in step_acts:
+                        step_act.step = react_times
+                    process_act(default_session, step_acts, executor)  # 工具执行，同一步的多个调用并发执行
+                    transcript.add_step(step_acts)
+                    act = next((a for a in step_acts if a.done), step_acts[-1])
+
+                acts = transcript.acts
+                response: str | Iterator[str] | T = act.obs
+                if output_acts:
+                    return acts
+                if not act.done and react_times >= max_steps:
+                    response = process.final(*prompt_args, acts=acts, call_type="failed", **prompt_kwargs)
+                elif process.response_format is not None:
+                    response = process.final(*prompt_args, acts=acts, call_type="trans", **prompt_kwargs)
+                if isinstance(response, Iterator):
+                    response = "".join(response)
+                return response
 
         model_call.__api_params__ = process.api_params  # type: ignore
         model_call.__func__ = prompt  # type: ignore
@@ -113,18 +138,25 @@ def react(
     return parameterized_lm_decorator
 
 
-def process_act(session: Session, act: Action) -> None:
-    session.send("tool", act.tool, arguments=act.args)
-    if not session.call_tool_confirm(act.tool):
-        act.obs = "User cancelled. Please find other ways to solve this problem."
+def process_act(session: Session, acts: Action | Sequence[Action], executor: ToolExecutor | None = None) -> None:
+    acts = [acts] if isinstance(acts, Action) else list(acts)
+    approved = []
+    for act in acts:  # 逐个确认，确认后的调用一起执行
+        session.send("tool", act.tool, arguments=act.args)
+        if session.call_tool_confirm(act.tool):
+            approved.append(act)
+        else:
+            act.obs = "User cancelled. Please find other ways to solve this problem."
+    if not approved:
         return
-    try:
-        result = Tool.call_tool(act.tool, **act.args)
-        act.obs, act.image = result if isinstance(result, tuple) else (result, None)
-        session.send("action", _short_result(act.obs), style="bold green")
-    except Exception as e:
-        act.obs = f"Error: {e}"
-        session.send("action", act.obs, style="bold red")
+    results = (executor or ToolExecutor()).run([(act.tool, act.args) for act in approved])
+    for act, result in zip(approved, results, strict=True):
+        if isinstance(result, Exception):
+            act.obs = f"Error: {result}"
+            session.send("action", act.obs, style="bold red")
+        else:
+            act.obs, act.image = result if isinstance(result, tuple) else (result, None)
+            session.send("action", _short_result(act.obs), style="bold green")
 
 
 def _short_result(result: str) -> str:
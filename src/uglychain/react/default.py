@@ -10,27 +10,22 @@ from uglychain.llm import gen_prompt, llm
 from uglychain.schema import Messages, P, T
 from uglychain.utils import retry
 
-from .action import Action
+from .action import Action, last_step
 from .base import BaseReActProcess
 from .prompt import REACT_SYSTEM_PROMPT
+from .transcript import Transcript, image_content
 
 
 @dataclass
 class ReActProcess(BaseReActProcess[T]):
     @cached_property
-    def react(self) -> Callable[..., Action]:
+    def react(self) -> Callable[..., Action | list[Action]]:
         tools_names = [f"`{tool.name}`" for tool in self.tools]
 
-        def react_once(*prompt_args: P.args, acts: Sequence[Action], **prompt_kwargs: P.kwargs):  # type: ignore
-            message = gen_prompt(self.func, *prompt_args, **prompt_kwargs)
-            if isinstance(message, list):
-                if acts:
-                    message.append({"role": "assistant", "content": str(acts[-1])})
-                return message
-            elif isinstance(message, str):
-                return message + "\n" + "\n".join(str(a) for a in acts) + "\n" + "Thought:"
-            else:
-                raise ValueError("Invalid output type")
+        def react_once(*prompt_args: P.args, transcript: Transcript, **prompt_kwargs: P.kwargs) -> Messages:  # type: ignore
+            if not transcript.started:  # 提示只在第一步生成，之后的步骤只追加新的消息
+                transcript.start(gen_prompt(self.func, *prompt_args, **prompt_kwargs))
+            return transcript.snapshot()
 
         react_once.__doc__ = REACT_SYSTEM_PROMPT.format(
             tools_names=", ".join(tools_names),
@@ -39,8 +34,13 @@ class ReActProcess(BaseReActProcess[T]):
             language=config.default_language,
         )
 
-        @retry(n=config.llm_max_retry, timeout=config.llm_timeout, wait=config.llm_wait_time)
-        def react_response_action_with_retry(*args: Any, **kwargs: Any) -> Action:
+        @retry(
+            n=config.llm_max_retry,
+            timeout=config.llm_timeout,
+            wait=config.llm_wait_time,
+            max_wait=config.llm_max_wait_time,
+        )
+        def react_response_action_with_retry(*args: Any, **kwargs: Any) -> Action | list[Action]:
             result = llm(
                 model=self.model,
                 session=self.session,
@@ -53,12 +53,28 @@ class ReActProcess(BaseReActProcess[T]):
             )(react_once)(*args, **kwargs)
             if isinstance(result, Iterator):
                 result = "".join(result)
-            act = Action.from_response(result)
-            self.session.send("action", act.thought, style="yellow")
-            return act
+            acts = Action.from_response_all(result)
+            for i, act in enumerate(acts):
+                if i == 0 or act.thought:
+                    self.session.send("action", act.thought, style="yellow")
+            return acts[0] if len(acts) == 1 else acts
 
         return react_response_action_with_retry
 
+    def render_step(self, acts: Sequence[Action]) -> Messages:
+        """一步的动作作为 assistant 消息，观察结果（以及工具返回的图片）作为 user 消息"""
+        observation = "\n".join(f"Observation: {act.obs}" for act in acts)
+        images = [act.image for act in acts if act.image]
+        return [
+            {"role": "assistant", "content": "\n".join(_action_text(act) for act in acts)},
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": observation}, *(image_content(image) for image in images)]
+                if images
+                else observation,
+            },  # type: ignore
+        ]
+
     @cached_property
     def final(self) -> Callable[..., str | Iterator[str] | T]:
         def final_call(
@@ -78,7 +94,7 @@ class ReActProcess(BaseReActProcess[T]):
                 return [
                     {"role": "system", "content": system_prompt},
                     *message,
-                    {"role": "assistant", "content": str(acts[-1])},
+                    {"role": "assistant", "content": "\n".join(str(a) for a in last_step(acts))},
                     {
                         "role": "user",
                         "content": "Based on the information above, please provide a response to the user's request.",
@@ -101,3 +117,9 @@ class ReActProcess(BaseReActProcess[T]):
         )(final_call)
 
         return llm_final_call
+
+
+def _action_text(act: Action) -> str:
+    """不含观察结果的 Thought/Action/Action Input 文本，与模型的输出格式一致"""
+    thought = f"Thought: {act.thought.strip()}\n" if act.thought.strip() else ""
+    return f"{thought}Action: {act.tool}\nAction Input: {act._format_args()}"
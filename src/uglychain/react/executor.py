@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from typing import Any
+
+from uglychain.tools import Tool
+from uglychain.utils.deadline import remaining
+
+
+class ToolTimeoutError(TimeoutError):
+    """工具调用在超时时间内没有完成"""
+
+
+@dataclass
+class ToolExecutor:
+    """
+    执行 ReAct 一步中的工具调用。
+
+    同一步的多个调用互不依赖，在有界线程池中并发执行，全部结束后一起作为观察结果返回给模型。
+    `limits` 限制每个工具同时执行的调用数（跨步骤、跨并发的 react 调用共享），
+    `timeout` 为所有工具或按工具名设置超时，等待并发名额的时间也计入超时；
+    超时的调用以错误作为观察结果，仍在运行的线程在后台结束，不会阻塞整个步骤。
+    """
+
+    max_workers: int = 4
+    limits: dict[str, int] = field(default_factory=dict)
+    timeout: float | dict[str, float] | None = None
+    _semaphores: dict[str, threading.BoundedSemaphore] = field(init=False, default_factory=dict, repr=False)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.max_workers < 1:
+            raise ValueError("max_workers 必须大于 0")
+        if any(limit < 1 for limit in self.limits.values()):
+            raise ValueError("工具的并发上限必须大于 0")
+
+    def timeout_for(self, tool: str) -> float | None:
+        if isinstance(self.timeout, dict):
+            return self.timeout.get(tool)
+        return self.timeout
+
+    def run(self, calls: Sequence[tuple[str, dict[str, Any]]]) -> list[Any]:
+        """执行一组 `(工具名, 参数)` 调用，结果按顺序返回，失败或超时的调用位置放入异常对象"""
+        if len(calls) == 1 and self.timeout_for(calls[0][0]) is None:
+            # 只有一个调用且不需要超时，直接在当前线程执行
+            try:
+                return [self._call(*calls[0])]
+            except Exception as e:
+                return [e]
+
+        results: list[Any] = []
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls)))
+        try:
+            # 每个调用在调用方上下文的副本中运行，使截止时间、用量统计等上下文状态传递到工作线程
+            futures = [executor.submit(copy_context().run, self._call, name, args) for name, args in calls]
+            start = time.monotonic()
+            for (name, _), future in zip(calls, futures, strict=True):
+                timeout = self.timeout_for(name)
+                left = remaining()
+                limit = None if timeout is None else start + timeout - time.monotonic()
+                if left is not None:
+                    limit = left if limit is None else min(limit, left)
+                done, _ = wait([future], timeout=None if limit is None else max(limit, 0))
+                if not done:
+                    future.cancel()
+                    results.append(ToolTimeoutError(f"Tool `{name}` timed out"))
+                else:
+                    error = future.exception()
+                    results.append(future.result() if error is None else error)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _call(self, name: str, args: dict[str, Any]) -> Any:
+        semaphore = self._semaphore(name)
+        with semaphore if semaphore is not None else nullcontext():
+            return Tool.call_tool(name, **args)
+
+    def _semaphore(self, name: str) -> threading.BoundedSemaphore | None:
+        if name not in self.limits:
+            return None
+        with self._lock:
+            if name not in self._semaphores:
+                self._semaphores[name] = threading.BoundedSemaphore(self.limits[name])
+            return self._semaphores[name]
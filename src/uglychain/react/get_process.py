@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Literal
 
 from uglychain.schema import T
 from uglychain.session import Session
@@ -8,9 +8,20 @@ from uglychain.tools import BaseTool
 
 from .base import BaseReActProcess
 from .default import ReActProcess
+from .native import NativeReActProcess
+
+# 文本模式让模型按 Thought/Action/Action Input 格式输出后解析；原生模式使用提供商的函数调用接口
+REACT_PROCESSES: dict[str, type[BaseReActProcess]] = {"text": ReActProcess, "native": NativeReActProcess}
 
 
 def get_react_process(
-    model: str, session: Session, tools: list[BaseTool], response_format: type[T] | None, api_params: dict[str, Any]
+    model: str,
+    session: Session,
+    tools: list[BaseTool],
+    response_format: type[T] | None,
+    api_params: dict[str, Any],
+    mode: Literal["text", "native"] = "text",
 ) -> BaseReActProcess:
-    return ReActProcess(model, session, tools, response_format, api_params)
+    if mode not in REACT_PROCESSES:
+        raise ValueError(f"未知的 ReAct 模式 {mode!r}，可选值为 {list(REACT_PROCESSES)}")
+    return REACT_PROCESSES[mode](model, session, tools, response_format, api_params)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any
+
+from uglychain.config import config
+from uglychain.llm import gen_prompt, llm
+from uglychain.schema import Messages, P, T, ToolCalls
+from uglychain.utils import retry
+
+from .action import Action
+from .default import ReActProcess
+from .prompt import NATIVE_REACT_SYSTEM_PROMPT
+from .transcript import Transcript, image_content
+
+
+@dataclass
+class NativeReActProcess(ReActProcess[T]):
+    """
+    使用提供商原生函数调用（`tools` 参数）的 ReAct 过程。
+
+    工具模式直接传给模型，模型返回的 `tool_calls` 不需要文本解析，也就不会因为格式错误而重试；
+    模型一次返回多个工具调用时，这一步的所有调用都会执行。
+    """
+
+    @cached_property
+    def tool_names(self) -> dict[str, str]:
+        """函数名到工具名的映射；函数名只能包含字母、数字、下划线和连字符，`Class:method` 会转换为 `Class__method`"""
+        return {_function_name(tool.name): tool.name for tool in self.tools}
+
+    @cached_property
+    def tool_schemas(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": _function_name(tool.name),
+                    "description": tool.description,
+                    "parameters": tool.args_schema,
+                },
+            }
+            for tool in self.tools
+        ]
+
+    @cached_property
+    def react(self) -> Callable[..., Action | list[Action]]:
+        def react_once(*prompt_args: P.args, transcript: Transcript, **prompt_kwargs: P.kwargs) -> Messages:  # type: ignore
+            if not transcript.started:
+                transcript.start(gen_prompt(self.func, *prompt_args, **prompt_kwargs))
+            return transcript.snapshot()
+
+        react_once.__doc__ = NATIVE_REACT_SYSTEM_PROMPT.format(
+            extra_instructions=self.func.__doc__ if self.func.__doc__ else "",
+            language=config.default_language,
+        )
+
+        @retry(
+            n=config.llm_max_retry,
+            timeout=config.llm_timeout,
+            wait=config.llm_wait_time,
+            max_wait=config.llm_max_wait_time,
+        )
+        def react_response_actions_with_retry(*args: Any, **kwargs: Any) -> list[Action]:
+            result: Any = llm(
+                model=self.model,
+                session=self.session,
+                map_keys=None,
+                response_format=ToolCalls,
+                n=None,
+                tools=self.tool_schemas,
+                **self.api_params,
+            )(react_once)(*args, **kwargs)
+            return self._to_actions(result)
+
+        return react_response_actions_with_retry
+
+    def render_step(self, acts: Sequence[Action]) -> Messages:
+        # 一步中的所有工具调用放在同一条 assistant 消息中，之后按顺序给出每个调用的结果
+        call_ids = [act.call_id or f"call_{act.step}_{i}" for i, act in enumerate(acts)]
+        messages: Messages = [
+            {
+                "role": "assistant",
+                "content": "".join(act.thought for act in acts),
+                "tool_calls": [_tool_call(act, call_id) for act, call_id in zip(acts, call_ids, strict=True)],
+            }  # type: ignore
+        ]
+        messages.extend(
+            {"role": "tool", "tool_call_id": call_id, "content": act.obs}
+            for act, call_id in zip(acts, call_ids, strict=True)
+        )
+        images = [act.image for act in acts if act.image]
+        if images:
+            # 工具结果消息不能包含图片，把图片作为用户消息附在这一步的最后
+            messages.append({"role": "user", "content": [image_content(image) for image in images]})  # type: ignore
+        return messages
+
+    def _to_actions(self, result: ToolCalls) -> list[Action]:
+        if not result.calls:
+            # 模型没有调用工具而是直接回答，视为最终答案
+            return [Action(tool="final_answer", args={"answer": result.content})]
+        # 模型在调用工具前给出的文本作为这一步的思考，记录在第一个动作上，回放时只出现一次
+        return [
+            Action(
+                thought=result.content if i == 0 else "",
+                tool=self.tool_names.get(call.name, call.name),
+                args=call.parameters,
+                call_id=call.id,
+            )
+            for i, call in enumerate(result.calls)
+        ]
+
+
+def _function_name(tool_name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", tool_name.replace(":", "__"))
+
+
+def _tool_call(act: Action, call_id: str) -> dict[str, Any]:
+    """把一次工具调用转换为 assistant 消息中的 tool_calls 条目"""
+    return {
+        "id": call_id,
+        "type": "function",
+        "function": {"name": _function_name(act.tool), "arguments": json.dumps(act.args, ensure_ascii=False)},
+    }
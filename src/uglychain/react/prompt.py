@@ -24,6 +24,14 @@ Observation: Result of the action.
 
 ... (this Thought/Action/Action Input/Observation can be repeated zero or more times)
 
+When several tool calls do not depend on each other, you can write several 'Action:' and 'Action Input:' pairs in one step. They are executed in parallel and all their observations are returned together:
+Thought: I need the content of both pages.
+Action: tool_name
+Action Input: <url>first url</url>
+Action: tool_name
+Action Input: <url>second url</url>
+Observation: Results of the actions.
+
 Thought: I now know the final answer
 Action: final_answer
 Action Input: <answer>final answer</answer>
@@ -39,6 +47,25 @@ Action Input: <answer>final answer</answer>
 4.  **AVOID redundant tool calls.  Do NOT re-execute a tool call with the *exact* same parameters as a previous call.  Repeating the same tool call provides no new information and wastes resources. If the previous result was insufficient, consider *different* parameters or a *different* tool.**
 
 
+## Extra instructions
+These instructions SUPPLEMENT or OVERRIDE the previous instructions.  Please pay close attention to them.
+
+{extra_instructions}
+
+You MUST respond STRICTLY in {language}.  Do NOT deviate from the specified language under any circumstances.
+"""
+
+# 原生函数调用模式的系统提示，工具通过提供商的 `tools` 参数传递，不需要描述文本格式
+NATIVE_REACT_SYSTEM_PROMPT = """You are an expert assistant who can solve any task using tools. You will be given a task to solve as best you can.
+
+Solve the task step by step by calling the provided tools. Each tool result will be returned to you before your next step.
+You may call several tools at once when the calls do not depend on each other.
+
+## Instructions
+1.  **Always use the correct and *actual* values for the tool's arguments. NEVER use variable names or placeholders.**
+2.  **Call a tool ONLY when necessary. Do NOT repeat a tool call with the exact same arguments.**
+3.  **When you know the final answer, call the `final_answer` tool to return it.**
+
 ## Extra instructions
 These instructions SUPPLEMENT or OVERRIDE the previous instructions.  Please pay close attention to them.
 
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from uglychain.schema import Messages
+
+from .action import Action
+
+
+@dataclass
+class Transcript:
+    """
+    一次 ReAct 调用的消息记录，只追加不重写。
+
+    提示只在第一步生成一次，之后每一步把新的动作和观察结果渲染为消息追加在末尾：
+    每一步的开销不随步数增长，已经发送过的消息前缀逐字节不变，提供商的提示缓存可以命中。
+    """
+
+    render: Callable[[Sequence[Action]], Messages]  # 把一步的动作和观察结果渲染为消息
+    messages: Messages = field(default_factory=list)
+    acts: list[Action] = field(default_factory=list)
+
+    def __repr__(self) -> str:
+        # 作为提示函数的参数时会出现在日志中，不输出完整的消息
+        return f"Transcript(steps={len({act.step for act in self.acts})}, messages={len(self.messages)})"
+
+    @property
+    def started(self) -> bool:
+        return bool(self.messages)
+
+    def start(self, prompt: str | Messages) -> None:
+        if isinstance(prompt, str):
+            self.messages = [{"role": "user", "content": prompt}]
+        elif isinstance(prompt, list):
+            self.messages = list(prompt)
+        else:
+            raise ValueError("Invalid output type")
+
+    def add_step(self, acts: Sequence[Action]) -> None:
+        """追加一步已经执行完的动作"""
+        self.acts.extend(acts)
+        self.messages.extend(self.render(acts))
+
+    def snapshot(self) -> Messages:
+        """返回用于本次请求的消息列表；列表是副本，请求时插入的系统消息不会写回记录"""
+        return list(self.messages)
+
+
+def image_content(image: str) -> dict[str, Any]:
+    url = image if image.startswith(("http://", "https://")) else f"data:image/jpeg;base64,{image}"
+    return {"type": "image_url", "image_url": {"url": url}}
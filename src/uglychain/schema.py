@@ -27,19 +27,21 @@ class ToolResponse(BaseModel):
 
     name: str = Field(..., description="tool name")  # 工具名称
     parameters: dict = Field(..., description="tool arguments")  # 工具参数
+    id: str = Field(default="", description="tool call id")  # 工具调用ID，用于把工具结果关联回这次调用
 
     @classmethod
-    def parse(cls, response: Any) -> ToolResponse:
+    def parse(cls, response: Any, id: str = "") -> ToolResponse:
         """
         从LLM响应解析工具调用。
 
         Args:
             response: LLM返回的工具调用响应
+            id: 工具调用ID（可选）
 
         Returns:
             ToolResponse: 解析后的工具响应对象
         """
-        return cls(name=response.name, parameters=json.loads(response.arguments))
+        return cls(name=response.name, parameters=json.loads(response.arguments), id=id)
 
     def run_function(self, tools: list[Callable[..., str]]) -> str:
         """
@@ -58,3 +60,26 @@ class ToolResponse(BaseModel):
             if tool.__name__ == self.name:
                 return tool(**self.parameters)
         raise ValueError(f"Can't find tool {self.name}")
+
+
+class ToolCalls(BaseModel):
+    """
+    模型一次回复中的全部工具调用和伴随的文本。
+
+    作为 `response_format` 传给 `llm` 时按原样返回回复，不再只取第一个工具调用；
+    没有调用工具时 `calls` 为空，`content` 是模型的回答。
+    """
+
+    content: str = Field(default="", description="assistant text")  # 模型在调用工具前给出的文本
+    calls: list[ToolResponse] = Field(default_factory=list, description="tool calls")  # 所有工具调用，按返回顺序排列
+
+    @classmethod
+    def parse(cls, message: Any) -> ToolCalls:
+        """从LLM响应的消息中解析全部工具调用"""
+        return cls(
+            content=(getattr(message, "content", None) or "").strip(),
+            calls=[
+                ToolResponse.parse(call.function, id=str(getattr(call, "id", None) or ""))
+                for call in getattr(message, "tool_calls", None) or []
+            ],
+        )
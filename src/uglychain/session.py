@@ -10,8 +10,11 @@ from __future__ import annotations
 import inspect  # 用于检查函数签名
 import logging  # 用于日志记录
 import sys  # 用于检测运行环境
+import threading  # 用于保护级联统计
 import uuid  # 用于生成唯一标识符
-from collections.abc import Callable  # 用于类型提示
+from collections.abc import Callable, Iterator  # 用于类型提示
+from contextlib import contextmanager  # 用于定义调用和用量统计的上下文
+from contextvars import ContextVar  # 用于保存每次调用的状态
 from dataclasses import dataclass, field  # 用于数据类定义
 from datetime import datetime  # 用于时间戳生成
 from pathlib import Path  # 用于路径操作
@@ -20,6 +23,7 @@ from typing import Any, ClassVar, Literal  # 用于类型提示
 from .config import config  # 导入配置
 from .console import BaseConsole, SimpleConsole  # 导入控制台类
 from .utils import MessageBus  # 导入消息总线
+from .utils.usage import Budget, UsageTracker  # 导入用量统计和预算
 
 # 函数调用格式化的常量
 MAX_AGRS: int = 5  # 显示的最大参数数量
@@ -55,6 +59,7 @@ class Logger:
     """
 
     _logger: ClassVar[logging.Logger | None] = None  # 类变量，存储日志记录器实例
+    _lock: ClassVar[threading.Lock] = threading.Lock()  # 保护日志记录器的懒加载
 
     @classmethod
     def info(cls, message: str, **kwargs: Any) -> None:
@@ -73,16 +78,75 @@ class Logger:
         if not config.session_log:
             return
 
-        # 懒加载日志记录器
+        cls.get_logger().info(message, **kwargs)
+
+    @classmethod
+    def get_logger(cls) -> logging.Logger:
+        """懒加载日志记录器，多个线程同时记录第一条日志时只创建一个文件处理器"""
         if cls._logger is None:
-            cls._logger = logging.getLogger("SessionLogger")
-            cls._logger.setLevel(logging.INFO)
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            Path("logs").mkdir(parents=True, exist_ok=True)
-            handler = logging.FileHandler(f"logs/session_{timestamp}.log")
-            handler.setFormatter(CustomFormatter())
-            cls._logger.addHandler(handler)
-        cls._logger.info(message, **kwargs)
+            with cls._lock:
+                if cls._logger is None:
+                    logger = logging.getLogger("SessionLogger")
+                    logger.setLevel(logging.INFO)
+                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+                    Path("logs").mkdir(parents=True, exist_ok=True)
+                    handler = logging.FileHandler(f"logs/session_{timestamp}.log")
+                    handler.setFormatter(CustomFormatter())
+                    logger.addHandler(handler)
+                    cls._logger = logger
+        return cls._logger
+
+
+@dataclass
+class CallContext:
+    """
+    一次调用的状态：被调用的函数、使用的模型以及是否已显示基本信息。
+
+    保存在 contextvars 中，同一个会话被多个线程或协程同时调用时互不干扰。
+    """
+
+    func: str = ""  # 格式化后的函数调用
+    model: str = ""  # 本次调用使用的模型
+    base_info_shown: bool = False  # 本次调用是否已显示基本信息
+
+
+# 会话 uuid -> 当前上下文中该会话正在进行的调用，写入时复制，不修改其他上下文可见的字典
+_call_contexts: ContextVar[dict[uuid.UUID, CallContext] | None] = ContextVar("uglychain_call_contexts", default=None)
+
+
+@dataclass
+class CascadeStats:
+    """
+    模型级联的统计：每个模型接受的次数、升级次数，以及与全部使用最后一个模型相比节省的估算费用。
+    """
+
+    calls: int = 0  # 级联调用次数
+    escalations: int = 0  # 升级到下一个模型的次数
+    escalated_calls: int = 0  # 至少升级过一次的调用次数
+    accepted: dict[str, int] = field(default_factory=dict)  # 每个模型的结果被接受的次数
+    cost: float = 0.0  # 所有尝试的实际估算费用
+    baseline_cost: float = 0.0  # 被接受的结果如果由最后一个模型生成的估算费用
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def escalation_rate(self) -> float:
+        """至少升级一次的调用所占的比例"""
+        return self.escalated_calls / self.calls if self.calls else 0.0
+
+    @property
+    def savings(self) -> float:
+        return self.baseline_cost - self.cost
+
+    def record(self, model: str | None, escalations: int, cost: float, baseline_cost: float) -> None:
+        """记录一次级联调用，`model` 为 None 表示所有模型都失败"""
+        with self._lock:
+            self.calls += 1
+            self.escalations += escalations
+            self.escalated_calls += escalations > 0
+            if model is not None:
+                self.accepted[model] = self.accepted.get(model, 0) + 1
+            self.cost += cost
+            self.baseline_cost += baseline_cost
 
 
 @dataclass
@@ -91,12 +155,16 @@ class Session:
     会话类，管理不同类型的会话（llm、think、react）。
 
     提供消息传递、日志记录和控制台管理功能。
+    每次调用的函数、模型等状态保存在 `call()` 创建的调用上下文中，会话本身在装饰后不再被调用修改。
     """
 
     session_type: Literal["llm", "think", "react"] = "llm"  # 会话类型
+    budget: Budget | None = None  # 用量预算，超出后不再发起新的模型调用
     uuid: uuid.UUID = field(init=False, default_factory=uuid.uuid4)  # 会话唯一标识符
     info: dict[str, str] = field(init=False, default_factory=dict)  # 会话信息
     consoles: list[BaseConsole] = field(init=False, default_factory=list)  # 控制台列表
+    usage: UsageTracker = field(init=False, default_factory=UsageTracker)  # 累计的 token 用量
+    cascade: CascadeStats = field(init=False, default_factory=CascadeStats)  # 模型级联的统计
 
     def __post_init__(self) -> None:
         """初始化后添加默认控制台"""
@@ -143,25 +211,65 @@ class Session:
 
     @property
     def model(self) -> str:
-        """获取会话使用的模型名称"""
+        """获取会话使用的模型名称，调用期间为本次调用的模型"""
+        context = self.current_call()
+        if context is not None and context.model:
+            return context.model
         return self.info.get("model", "")
 
     @model.setter
     def model(self, model: str) -> None:
-        """设置会话使用的模型名称"""
-        self.info["model"] = model
+        """设置会话使用的模型名称，调用期间只修改本次调用的模型"""
+        context = self.current_call()
+        if context is not None:
+            context.model = model
+        else:
+            self.info["model"] = model
 
     @property
     def func(self) -> str:
-        """获取会话关联的函数名称"""
+        """获取会话关联的函数名称，调用期间为本次调用的函数"""
+        context = self.current_call()
+        if context is not None and context.func:
+            return context.func
         return self.info.get("func", "")
 
     @func.setter
     def func(self, func: str) -> None:
-        """设置会话关联的函数名称（仅在未设置时）"""
-        if "func" not in self.info:
+        """设置会话关联的函数名称（仅在未设置时），调用期间只修改本次调用的函数"""
+        context = self.current_call()
+        if context is not None:
+            context.func = context.func or func
+        elif "func" not in self.info:
             self.info["func"] = func
 
+    def current_call(self) -> CallContext | None:
+        """返回当前上下文中该会话正在进行的调用"""
+        contexts = _call_contexts.get()
+        return contexts.get(self.uuid) if contexts else None
+
+    @contextmanager
+    def call(self, func: str = "", model: str = "") -> Iterator[CallContext]:
+        """
+        开始一次调用，期间 `func`、`model` 和基本信息的显示状态只属于当前线程或协程。
+
+        嵌套调用同一个会话时（例如 react 内部的 llm 调用）沿用外层的调用上下文。
+
+        Args:
+            func: 格式化后的函数调用
+            model: 本次调用使用的模型
+        """
+        current = self.current_call()
+        if current is not None:
+            yield current
+            return
+        context = CallContext(func=func, model=model)
+        token = _call_contexts.set({**(_call_contexts.get() or {}), self.uuid: context})
+        try:
+            yield context
+        finally:
+            _call_contexts.reset(token)
+
     @property
     def id(self) -> str:
         """获取会话ID，优先使用info中的id，否则使用UUID"""
@@ -171,6 +279,23 @@ class Session:
         else:
             return self.uuid.hex
 
+    @contextmanager
+    def track_usage(self, func: str = "") -> Iterator[None]:
+        """
+        在上下文中把模型调用的用量记入会话，并在每次调用前检查预算。
+
+        Args:
+            func: 用量归属的函数名称
+        """
+        self.usage.budget = self.budget
+        with self.usage.track(func or self.func):
+            yield
+
+    def check_budget(self) -> None:
+        """超出会话预算时抛出 BudgetExceededError"""
+        self.usage.budget = self.budget
+        self.usage.check()
+
     def send(self, module: str, message: Any = None, /, **kwargs: Any) -> None:
         """
         发送消息到指定模块。
@@ -187,10 +312,13 @@ class Session:
         MessageBus.get(self.id, module).send(message, **kwargs)
 
     def show_base_info(self) -> None:
-        """显示会话基本信息，并禁用后续的基本信息显示"""
+        """显示会话基本信息；在调用上下文中每次调用只显示一次，不修改控制台的设置"""
+        context = self.current_call()
+        if context is not None:
+            if context.base_info_shown:
+                return
+            context.base_info_shown = True
         self.send("base_info", self.func, model=self.model)
-        for console in self.consoles:
-            console.show_base_info = False
 
     def call_tool_confirm(self, name: str) -> bool:
         """
@@ -17,17 +17,16 @@ from enum import Enum, unique  # 用于枚举类型
 from functools import cached_property  # 用于属性缓存
 from typing import Any, Generic, get_origin, get_type_hints  # 用于类型处理
 
-from openai.lib import _pydantic  # 用于OpenAI的Pydantic集成
 from pydantic import BaseModel, ValidationError  # 用于数据验证
-from ruamel.yaml import YAML, YAMLError  # 用于YAML处理
+from ruamel.yaml import YAMLError  # 用于YAML处理
 
 from .config import config  # 导入配置
 from .prompt import RESPONSE_JSON_PROMPT, RESPONSE_YAML_PROMPT  # 导入提示模板
-from .schema import Messages, T, ToolResponse  # 导入类型定义
+from .schema import Messages, T, ToolCalls, ToolResponse  # 导入类型定义
+from .utils._load_utils import ThreadLocalYAML  # 导入线程安全的YAML解析器
 
 # 常量定义
-YAML_INSTANCE = YAML()  # 创建YAML实例
-YAML_INSTANCE.preserve_quotes = True  # 保留引号
+YAML_INSTANCE = ThreadLocalYAML()  # 每个线程使用自己的YAML实例，保留引号
 
 
 @unique
@@ -119,8 +118,8 @@ class ResponseModel(Generic[T]):
             merged_api_params: 合并后的API参数
             mode: 可选的模式覆盖
         """
-        # 如果响应类型是字符串，不需要特殊处理
-        if self.response_type is str:
+        # 如果响应类型是字符串或原样返回工具调用，不需要特殊处理
+        if self.response_type is str or self.response_type is ToolCalls:
             return
 
         # 确定处理模式
@@ -146,7 +145,7 @@ class ResponseModel(Generic[T]):
         elif self.mode == Mode.MARKDOWN:
             self._update_markdown_json_schema_from_system_prompt(messages)
 
-    def parse_from_response(self, choice: Any) -> str | T | ToolResponse:
+    def parse_from_response(self, choice: Any) -> str | T | ToolResponse | ToolCalls:
         """
         从LLM响应中解析结构化数据。
 
@@ -154,7 +153,7 @@ class ResponseModel(Generic[T]):
             choice: LLM响应的选择对象
 
         Returns:
-            解析后的结构化数据，可能是字符串、工具响应或模型实例
+            解析后的结构化数据，可能是字符串、工具响应或模型实例；响应类型为 ToolCalls 时返回全部工具调用
 
         Raises:
             ValueError: 如果解析失败
@@ -164,9 +163,14 @@ class ResponseModel(Generic[T]):
         if hasattr(choice.message, "reasoning_content"):
             reasoning_content = choice.message.reasoning_content
 
+        # 需要一次回复中的全部（并行）工具调用时，连同模型的文本一起返回
+        if self.response_type is ToolCalls:
+            return ToolCalls.parse(choice.message)
+
         # 处理工具调用
         if hasattr(choice.message, "tool_calls") and choice.message.tool_calls and self.mode != Mode.TOOLS:
-            return ToolResponse.parse(choice.message.tool_calls[0].function)
+            call = choice.message.tool_calls[0]
+            return ToolResponse.parse(call.function, id=str(getattr(call, "id", None) or ""))
 
         # 处理字符串响应类型
         if self.response_type is str:
@@ -302,6 +306,8 @@ class ResponseModel(Generic[T]):
         """
         if not issubclass(self.response_type, BaseModel):
             return {}
+        from openai.lib import _pydantic  # 延迟导入 OpenAI 的 Pydantic 集成，只在需要结构化模式时加载
+
         return _pydantic.to_strict_json_schema(self.response_type)
 
     @cached_property
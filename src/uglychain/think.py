@@ -7,14 +7,22 @@ think模块提供思维链（Chain-of-Thought）功能。
 
 from __future__ import annotations
 
+import json  # 用于计算推理缓存的键
+import threading  # 用于保护推理缓存
+from collections import OrderedDict  # 用于实现 LRU 推理缓存
 from collections.abc import Callable, Iterator  # 用于类型提示
 from functools import wraps  # 用于保留被装饰函数的元数据
 from typing import Any, overload  # 用于函数重载和类型提示
 
 from .config import config  # 导入配置
-from .llm import llm  # 导入LLM装饰器
+from .llm import _get_map_keys, _retry_item, _run_items, gen_prompt, llm  # 导入LLM装饰器和批处理工具
 from .schema import Messages, P, T  # 导入类型定义
 from .session import Session  # 导入会话管理
+from .utils.deadline import deadline, remaining  # 导入截止时间工具
+from .utils.scheduler import has_request_context, request_priority  # 导入调度优先级
+
+# 设置了时间预算时，推理阶段最多使用剩余时间的比例，其余留给响应阶段
+THINKING_TIME_RATIO = 0.7
 
 
 @overload
@@ -22,6 +30,7 @@ def think(
     model: str = "",
     thinking_model: str = "",
     *,
+    map_keys: None = None,
     response_format: type[T],
     **api_params: Any,
 ) -> Callable[[Callable[P, str | Messages | None]], Callable[P, T]]: ...
@@ -32,78 +41,221 @@ def think(
     model: str = "",
     thinking_model: str = "",
     *,
+    map_keys: None = None,
     response_format: None = None,
     **api_params: Any,
 ) -> Callable[[Callable[P, str | Messages | None]], Callable[P, str]]: ...
 
 
+@overload
+def think(
+    model: str = "",
+    thinking_model: str = "",
+    *,
+    map_keys: list[str],
+    response_format: type[T],
+    **api_params: Any,
+) -> Callable[[Callable[P, str | Messages | None]], Callable[P, list[T]]]: ...
+
+
+@overload
 def think(
     model: str = "",
     thinking_model: str = "",
     *,
+    map_keys: list[str],
+    response_format: None = None,
+    **api_params: Any,
+) -> Callable[[Callable[P, str | Messages | None]], Callable[P, list[str]]]: ...
+
+
+def think(
+    model: str = "",
+    thinking_model: str = "",
+    *,
+    map_keys: list[str] | None = None,
     response_format: type[T] | None = None,
     session: Session | None = None,
+    timeout: float | None = None,
+    stop_after_thinking: bool = True,
+    cache: bool = False,
+    need_retry: bool = False,
+    return_exceptions: bool = False,
+    priority: str | None = None,
     **api_params: Any,
-) -> Callable[[Callable[P, str | Messages | None]], Callable[P, str | T]]:
+) -> Callable[[Callable[P, str | Messages | None]], Callable[P, str | T | list[str] | list[T]]]:
     """
     思维链装饰器，使用思考模型生成推理过程，然后将推理传递给响应模型生成最终答案。
 
     Args:
         model: 用于生成最终响应的模型
         thinking_model: 用于推理的模型（默认使用推理器模型）
+        map_keys: 用于批量处理的参数键列表，每一项并发推理，推理完成后立即生成该项的响应
         response_format: 可选的结构化输出类型
         session: 可选的会话对象，用于跟踪
+        timeout: 可选的整体时间预算（秒），由推理和响应两个阶段共享
+        stop_after_thinking: 读到 `</thinking>` 后立即停止思考模型的流，不再为后续内容付费
+        cache: 是否缓存推理结果，相同的输入会跳过思考模型
+        need_retry: 批处理时是否对每一项（推理和响应）单独重试
+        return_exceptions: 批处理时是否将失败条目的异常放入结果列表，否则抛出携带部分结果的 BatchError
+        priority: 批处理请求在调度器中的优先级，默认为 "batch"
         **api_params: 传递给模型的额外参数
     """
     default_session = session or Session("think")  # 创建或使用会话
     thinking_model = thinking_model or "deepseek:deepseek-reasoner"  # 默认使用deepseek推理器
     response_model = model or config.default_model  # 使用指定模型或默认模型
-    default_api_params_from_decorator = api_params.copy()  # 复制API参数
+    # 移除不适用于思考模型的参数
+    default_api_params_from_decorator = {
+        key: value for key, value in api_params.items() if key not in ("map_keys", "tools", "n")
+    }
 
-    def decorator(func: Callable[P, str | Messages | None]) -> Callable[P, str | T]:
+    def decorator(func: Callable[P, str | Messages | None]) -> Callable[P, str | T | list[str] | list[T]]:
         """装饰器函数，包装原始函数"""
 
-        @wraps(func)
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> str | T:
-            """包装函数，实现思维链逻辑"""
-            # 移除不适用于思考模型的参数
-            for key in ["map_keys", "tools", "n"]:
-                if key in default_api_params_from_decorator:
-                    default_api_params_from_decorator.pop(key)
-
-            # 首先，使用思考模型生成推理过程
-            generate_reasoning = llm(
-                thinking_model,
-                session=default_session,
-                n=None,
-                map_keys=None,
-                stream=True,
-                tools=None,
-                **default_api_params_from_decorator,
-            )(func)
-
-            response: Iterator[str] = generate_reasoning(*args, **kwargs)
-            reasoning = _get_reasoning(response)  # 从响应中提取推理内容
-
-            # 然后，使用响应模型生成最终答案，包含推理过程
-            @llm(
-                model=response_model,
-                response_format=response_format,
-                session=default_session,
-                **default_api_params_from_decorator,
+        def reasoning_prompt(prompt: str | Messages) -> str | Messages:
+            """思考阶段直接使用已经生成的提示，提示函数不会为思考模型再运行一次"""
+            return prompt
+
+        reasoning_prompt.__doc__ = func.__doc__  # 文档字符串作为系统消息
+        reasoning_prompt.__name__ = func.__name__
+
+        # 两个阶段的 llm 装饰器在装饰时构建一次，而不是每次调用都重新构建
+        # 首先，使用思考模型生成推理过程
+        generate_reasoning = llm(
+            thinking_model,
+            session=default_session,
+            n=None,
+            map_keys=None,
+            stream=True,
+            tools=None,
+            **default_api_params_from_decorator,
+        )(reasoning_prompt)
+
+        # 然后，使用响应模型生成最终答案，包含推理过程
+        @llm(
+            model=response_model,
+            response_format=response_format,
+            session=default_session,
+            **default_api_params_from_decorator,
+        )
+        def generate_response(*inner_args: Any, reasoning: str, **inner_kwargs: Any) -> str:
+            """生成最终响应的内部函数"""
+            prompt = func(*inner_args, **inner_kwargs)
+            return f"{prompt}\n\n<reasoning>\n{reasoning}\n</reasoning>"
+
+        def get_reasoning(*args: Any, **kwargs: Any) -> str:
+            """运行思考模型并提取推理内容，启用缓存时相同的输入直接返回缓存"""
+            prompt = gen_prompt(func, *args, **kwargs)
+            key = (
+                _reasoning_cache_key(thinking_model, func.__doc__, prompt, default_api_params_from_decorator)
+                if cache
+                else None
             )
-            def generate_response(*inner_args: Any, reasoning: str, **inner_kwargs: Any) -> str:
-                """生成最终响应的内部函数"""
-                prompt = func(*inner_args, **inner_kwargs)
-                return f"{prompt}\n\n<reasoning>\n{reasoning}\n</reasoning>"
+            if key is not None:
+                cached = reasoning_cache.get(key)
+                if cached is not None:
+                    return cached
+            response: Iterator[str] = generate_reasoning(prompt)
+            try:
+                reasoning = _get_reasoning(response)  # 从响应中提取推理内容
+            finally:
+                if stop_after_thinking:
+                    _close(response)  # 推理已结束，取消剩余的生成
+            if key is not None and reasoning:
+                reasoning_cache.set(key, reasoning)
+            return reasoning
 
+        def think_single(*args: Any, **kwargs: Any) -> str | T:
+            """对单个输入先推理再生成响应"""
+            left = remaining()
+            with deadline(left * THINKING_TIME_RATIO if left is not None else None):
+                reasoning = get_reasoning(*args, **kwargs)
             return generate_response(*args, reasoning=reasoning, **kwargs)
 
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> str | T | list[str] | list[T]:
+            """包装函数，实现思维链逻辑"""
+            with deadline(timeout):  # 推理和响应两个阶段共享一个时间预算
+                if map_keys is None:
+                    return think_single(*args, **kwargs)
+
+                m, map_args_index_set, map_kwargs_keys_set = _get_map_keys(func, args, kwargs, map_keys)
+
+                # 与 llm 相同：批处理默认让出给交互式请求，租户默认为会话
+                explicit_context = has_request_context()
+                item_priority = priority or (None if explicit_context else "batch")
+                item_tenant = None if explicit_context else default_session.id
+
+                def process_single_item(i: int) -> str | T:
+                    """处理批次中的一项，每一项的推理完成后立即生成响应，不等待其他条目"""
+                    item_args = [arg[i] if j in map_args_index_set else arg for j, arg in enumerate(args)]  # type: ignore
+                    item_kwargs = {
+                        key: value[i] if key in map_kwargs_keys_set else value  # type: ignore
+                        for key, value in kwargs.items()
+                    }
+                    with request_priority(item_priority, item_tenant):
+                        return think_single(*item_args, **item_kwargs)
+
+                process_item = _retry_item(process_single_item) if need_retry else process_single_item
+                # 与 llm 相同的逐项执行：有界并发、按思考模型自适应限流、逐项报告失败；推理总是并发进行
+                return _run_items(process_item, m, thinking_model, return_exceptions=return_exceptions, parallel=True)
+
         return wrapper
 
     return decorator
 
 
+class ReasoningCache:
+    """线程安全的 LRU 缓存，保存思考模型的推理结果"""
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# 所有 think 装饰器共享的推理缓存
+reasoning_cache = ReasoningCache()
+
+
+def _reasoning_cache_key(
+    thinking_model: str, system: str | None, prompt: str | Messages, api_params: dict[str, Any]
+) -> str | None:
+    """根据思考模型、系统消息、已生成的提示和模型参数计算缓存键，无法序列化时返回 None（不缓存）"""
+    try:
+        return json.dumps([thinking_model, system, prompt, api_params], sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def _close(response: Iterator[str]) -> None:
+    """关闭流式响应的生成器，llm 会随之停止底层的流"""
+    close = getattr(response, "close", None)
+    if callable(close):
+        close()
+
+
 def _get_reasoning(raw_reasoning: Iterator[str]) -> str:
     """
     从原始推理响应中提取思考内容。
@@ -145,12 +297,15 @@ def _get_reasoning(raw_reasoning: Iterator[str]) -> str:
             reasoning_parts.append(buffer[: buffer.find(end_tag)])
             break
         else:
+            # 保留可能是结束标签前缀的尾部字符，以检测跨块的结束标签
+            keep = len(end_tag) - 1
+            if len(buffer) > keep:
+                reasoning_parts.append(buffer[:-keep])
+                buffer = buffer[-keep:]
+    else:
+        # 如果找到了开始标签但没有结束标签，则保留所有内容
+        if found_start and buffer:
             reasoning_parts.append(buffer)
-            buffer = ""
-
-    # 如果找到了开始标签但没有结束标签，则保留所有内容
-    if found_start and buffer:
-        reasoning_parts.append(buffer)
 
     # 如果没有找到开始标签，则不保留任何内容
     reasoning = "".join(reasoning_parts) if found_start else ""
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from .base_tool import BaseTool
-from .mcp import MCP
+
+if TYPE_CHECKING:
+    from .mcp import MCP
 
 
 class ToolsClass:
@@ -14,7 +16,7 @@ class ToolsClass:
         return getattr(self, name)
 
 
-Tools = list[BaseTool | MCP | ToolsClass]
+Tools = list["BaseTool | MCP | ToolsClass"]
 
 
 def convert_to_tool_list(tools: Tools | None) -> list[BaseTool]:
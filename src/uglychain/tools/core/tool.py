@@ -3,15 +3,17 @@ from __future__ import annotations
 import json
 from collections.abc import Callable
 from dataclasses import dataclass
-from functools import singledispatch
-from typing import Any, ClassVar, cast, overload
+from functools import cached_property, singledispatch
+from typing import TYPE_CHECKING, Any, ClassVar, cast, overload
 
 from ..utils import function_schema
 from .base_tool import BaseTool
-from .mcp import MCP
 from .schema import ToolsClass
 from .tool_manager import ToolsManager
 
+if TYPE_CHECKING:
+    from .mcp import MCP
+
 
 @dataclass
 class Tool:
@@ -33,6 +35,8 @@ class Tool:
 
     @classmethod
     def mcp(cls, obj: type) -> MCP:
+        from .mcp import MCP  # MCP 依赖 mcp 库，只在使用时导入
+
         mcp = MCP(
             obj.__name__,
             command=getattr(obj, "command", ""),
@@ -53,12 +57,34 @@ class Tool:
         name, config_dict = list(config_origin.items())[0]
         assert isinstance(config_dict, dict)
         config = {k: v for k, v in config_dict.items() if k in {"command", "args", "env", "disabled", "autoApprove"}}
+        from .mcp import MCP  # MCP 依赖 mcp 库，只在使用时导入
+
         mcp = MCP(str(name), **config)
         cls._manager.register_mcp(name)
         mcp.register_callback = cls._manager.register_mcp_tool
         return mcp
 
 
+class FunctionTool(BaseTool):
+    """由函数注册的工具，描述和参数模式在第一次使用时才从函数签名生成，注册内置工具时不需要导入 aisuite"""
+
+    def __init__(self, name: str, func: Callable) -> None:
+        self.name = name
+        self.func = func
+
+    @cached_property
+    def schema(self) -> dict[str, Any]:
+        return function_schema(self.func)
+
+    @property
+    def description(self) -> str:  # type: ignore[override]
+        return self.schema["description"]
+
+    @property
+    def args_schema(self) -> dict[str, Any]:  # type: ignore[override]
+        return self.schema["parameters"]
+
+
 @singledispatch
 def tool_wrapper(obj: Any, cls: type[Tool]) -> BaseTool | ToolsClass:
     raise NotImplementedError("Method not implemented for this type")
@@ -70,8 +96,7 @@ def _(func: Callable, cls: type[Tool]) -> BaseTool:
     if name in cls._manager.tools:
         raise ValueError(f"Tool {name} already exists")
     cls._manager.register_tool(name, func)
-    schema = function_schema(func)
-    return BaseTool(name=name, description=schema["description"], args_schema=schema["parameters"])
+    return FunctionTool(name, func)
 
 
 @tool_wrapper.register(type)
@@ -89,6 +114,5 @@ def _(obj: type, cls: type[Tool]) -> ToolsClass:
         if name in cls._manager.tools:
             raise ValueError(f"Tool {name} already exists")
         cls._manager.register_tool(name, method)
-        schema = function_schema(method)
-        new_obj.tools.append(BaseTool(name=name, description=schema["description"], args_schema=schema["parameters"]))
+        new_obj.tools.append(FunctionTool(name, method))
     return new_obj
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import threading
 from collections.abc import Callable
 from dataclasses import dataclass, field
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from uglychain.utils import singleton
 
-from ..utils import McpTool
+if TYPE_CHECKING:
+    from ..utils import McpTool
 
 
 def cleanup() -> None:
@@ -24,6 +26,7 @@ class ToolsManager:
     tools: dict[str, Callable] = field(default_factory=dict)
     mcp_tools: dict[str, McpTool] = field(default_factory=dict)
     mcp_names: set[str] = field(default_factory=set)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
 
     async def cleanup_clients(self) -> None:
         client_names, clients = set(), []
@@ -53,16 +56,19 @@ class ToolsManager:
             return mcp_tool(**arguments)
 
     def register_tool(self, name: str, func: Callable) -> None:
-        if name in self.tools:
-            raise ValueError(f"Tool {name} already exists")
-        self.tools[name] = func
+        with self._lock:
+            if name in self.tools:
+                raise ValueError(f"Tool {name} already exists")
+            self.tools[name] = func
 
     def register_mcp(self, name: str) -> None:
-        if name in self.mcp_names:
-            raise ValueError(f"MCP client {name} already exists")
-        self.mcp_names.add(name)
+        with self._lock:
+            if name in self.mcp_names:
+                raise ValueError(f"MCP client {name} already exists")
+            self.mcp_names.add(name)
 
     def register_mcp_tool(self, name: str, tool: McpTool) -> None:
-        if name in self.mcp_tools:
-            raise ValueError(f"MCP tool {name} already exists")
-        self.mcp_tools[name] = tool
+        with self._lock:
+            if name in self.mcp_tools:
+                raise ValueError(f"MCP tool {name} already exists")
+            self.mcp_tools[name] = tool
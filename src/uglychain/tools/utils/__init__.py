@@ -1,6 +1,19 @@
 from __future__ import annotations
 
-from .mcp_client import McpClient, McpTool
+from typing import TYPE_CHECKING, Any
+
 from .schema_utils import function_schema
 
+if TYPE_CHECKING:
+    from .mcp_client import McpClient, McpTool
+
 __all__ = ["function_schema", "McpClient", "McpTool"]
+
+
+def __getattr__(name: str) -> Any:
+    # MCP 客户端依赖 mcp 库，只在使用时导入
+    if name in ("McpClient", "McpTool"):
+        from . import mcp_client
+
+        return getattr(mcp_client, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
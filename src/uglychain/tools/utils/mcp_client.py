@@ -86,7 +86,8 @@ class McpClient:
     _cleanup_lock: asyncio.Lock = field(init=False, default_factory=asyncio.Lock)
     exit_stack: AsyncExitStack = field(init=False, default_factory=AsyncExitStack)
     _loop: ClassVar[asyncio.AbstractEventLoop] = field(init=False, default=asyncio.get_event_loop())
-    _executor: ClassVar[ThreadPoolExecutor] = field(init=False, default=ThreadPoolExecutor())
+    # 所有 MCP 调用共享一个事件循环，run_until_complete 不能在多个线程中同时运行，因此只用一个工作线程
+    _executor: ClassVar[ThreadPoolExecutor] = field(init=False, default=ThreadPoolExecutor(max_workers=1))
 
     def __post_init__(self) -> None:
         asyncio.set_event_loop(self._loop)
@@ -3,10 +3,10 @@ from __future__ import annotations
 from collections.abc import Callable
 from typing import Any
 
-from aisuite.utils.tools import Tools
-
 
 def function_schema(func: Callable) -> dict[str, Any]:
+    from aisuite.utils.tools import Tools  # aisuite 会导入 openai 和 mcp，只在生成工具描述时导入
+
     tool = Tools()
     tool._add_tool(func)
     spec = tool.tools()[0]
@@ -2,18 +2,44 @@ from __future__ import annotations
 
 from ._load_utils import convert_to_variable_name
 from ._response_parser import parse_response_to_dict
+from .batch import BatchError, run_batch, run_first
+from .deadline import DeadlineExceededError, deadline
 from .fastapi_wrappers import json_post_endpoint
+from .job_store import JobStore, JSONLJobStore, SQLiteJobStore, get_job_store
+from .limiter import AdaptiveLimiter, get_limiter, limiter_metrics
 from .message_bus import MessageBus
-from .retry import retry
+from .retry import RetryPolicy, retry
+from .scheduler import RequestScheduler, request_priority, set_scheduler
 from .singleton import singleton
 from .stream import Stream
+from .usage import Budget, BudgetExceededError, Usage, UsageTracker
 
 __all__ = [
+    "BatchError",
+    "Budget",
+    "BudgetExceededError",
+    "DeadlineExceededError",
+    "deadline",
     "convert_to_variable_name",
     "json_post_endpoint",
+    "AdaptiveLimiter",
+    "get_limiter",
+    "limiter_metrics",
+    "get_job_store",
+    "JobStore",
+    "JSONLJobStore",
+    "SQLiteJobStore",
     "parse_response_to_dict",
     "retry",
+    "RetryPolicy",
+    "RequestScheduler",
+    "request_priority",
+    "set_scheduler",
+    "run_batch",
+    "run_first",
     "singleton",
     "MessageBus",
     "Stream",
+    "Usage",
+    "UsageTracker",
 ]
@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+import copy
 import json
 import os
 import re
+import threading
 from functools import singledispatch
 from os import PathLike
 from pathlib import Path
@@ -12,13 +14,82 @@ from typing import IO, Any, AnyStr
 
 from ruamel.yaml import YAML, YAMLError
 
+
+class ThreadLocalYAML(threading.local):
+    """A YAML loader with one ruamel ``YAML`` per thread.
+
+    ruamel keeps parser state on the ``YAML`` object, so a single instance shared
+    between threads corrupts concurrent loads.
+    """
+
+    def __init__(self) -> None:
+        self.yaml = YAML()
+        self.yaml.preserve_quotes = True
+
+    def load(self, stream: Any) -> Any:
+        return self.yaml.load(stream)
+
+
 # Constants
-YAML_INSTANCE = YAML()
-YAML_INSTANCE.preserve_quotes = True
+YAML_INSTANCE = ThreadLocalYAML()
 
 REFERENCE_PATTERN = re.compile(r"\$\{(\w+):(.*)\}")
 
 
+def _readonly(self: Any, *args: Any, **kwargs: Any) -> Any:
+    raise TypeError(f"{type(self).__name__} is read-only; use copy.deepcopy() to get a mutable copy")
+
+
+class FrozenDict(dict):
+    """A read-only dict shared by every user of a cached file reference.
+
+    It is still a ``dict``, so JSON encoding, pydantic and provider SDKs accept it
+    unchanged. ``copy.deepcopy`` returns a plain, mutable copy.
+    """
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (type(self), (dict(self),))
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> dict:
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+
+class FrozenList(list):
+    """A read-only list shared by every user of a cached file reference."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (type(self), (list(self),))
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> list:
+        return [copy.deepcopy(value, memo) for value in self]
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts and lists into their read-only counterparts."""
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+# Process-wide cache of resolved file references: path -> ((mtime_ns, size), content)
+_reference_cache: dict[Path, tuple[tuple[int, int], Any]] = {}
+_reference_cache_lock = threading.Lock()
+
+
 def resolve_file_path(path: str | Path, base_path: str | Path | None = None) -> Path:
     """Resolve a file path, optionally relative to a base path.
 
@@ -118,13 +189,7 @@ def resolve_reference(reference: str, base_path: str | Path | None = None) -> An
             return os.environ.get(value, reference)
         elif reference_type == "file":
             path = resolve_file_path(value, base_path)
-            with path.open("r") as f:
-                if path.suffix.lower() == ".json":
-                    return json.load(f)
-                elif path.suffix.lower() in [".yml", ".yaml"]:
-                    return load_yaml(f)
-                else:
-                    return f.read()
+            return _load_referenced_file(path)
         else:
             # logger.warning(f"Unknown reference type {reference_type}, return original value {reference}.")
             return reference
@@ -132,6 +197,69 @@ def resolve_reference(reference: str, base_path: str | Path | None = None) -> An
         return reference
 
 
+def referenced_files(origin: Any, base_path: str | Path | None = None) -> list[Path]:
+    """Return the resolved paths of all `${file:...}` references in the object.
+
+    Args:
+        origin: The object to search, usually the YAML frontmatter of a prompt file
+        base_path: Optional base path for resolving file references
+
+    Returns:
+        The referenced file paths, in the order they appear
+    """
+    if isinstance(origin, dict):
+        origin = list(origin.values())
+    if isinstance(origin, list):
+        return [path for item in origin for path in referenced_files(item, base_path=base_path)]
+    if isinstance(origin, str):
+        match = REFERENCE_PATTERN.match(origin)
+        if match and match.group(1) == "file":
+            return [resolve_file_path(match.group(2), base_path).resolve()]
+    return []
+
+
+def _load_referenced_file(path: Path) -> Any:
+    """Load a referenced file through the process-wide reference cache.
+
+    Entries are keyed by the resolved path and invalidated when the file's
+    mtime or size changes, so each unique file is read and parsed once.
+    Every caller gets the same cached value: parsed JSON/YAML containers are
+    frozen when cached, so sharing them needs no copy.
+    """
+    path = path.resolve()
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _reference_cache_lock:
+        cached = _reference_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        content = freeze(_read_referenced_file(path))
+        with _reference_cache_lock:
+            _reference_cache[path] = (stamp, content)
+    else:
+        content = cached[1]
+    return content
+
+
+def _read_referenced_file(path: Path) -> Any:
+    """Read and parse a referenced file according to its suffix."""
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    elif suffix in [".yml", ".yaml"]:
+        with path.open("r", encoding="utf-8") as f:
+            return load_yaml(f)
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            return f.read()
+
+
+def clear_reference_cache() -> None:
+    """Drop all cached file references."""
+    with _reference_cache_lock:
+        _reference_cache.clear()
+
+
 def load_yaml(source: AnyStr | PathLike | IO | None) -> dict[str, Any]:
     """Load a YAML file or stream into a dictionary.
 
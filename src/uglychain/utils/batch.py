@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Generator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from contextvars import copy_context
+from typing import Any
+
+from .deadline import cancel_on
+from .limiter import AdaptiveLimiter, use_limiter
+
+SHARED_MAX_WORKERS = 32  # `run_first` 和 `run_batch(shared=True)` 共享线程池的线程数
+
+
+class BatchError(Exception):
+    """批处理中有部分条目失败时抛出，保留已完成的结果和每个失败条目的异常。"""
+
+    def __init__(self, message: str, results: list[Any], errors: dict[int, Exception]) -> None:
+        super().__init__(message)
+        self.results = results  # 按索引排列的结果，失败的条目为 None
+        self.errors = errors  # 失败条目的索引到异常的映射
+
+    def __str__(self) -> str:
+        error_messages = "\n".join([f"[{i}] {error}" for i, error in sorted(self.errors.items())])
+        return f"{self.args[0]}\nFailed items:\n{error_messages}"
+
+
+def run_batch(
+    func: Callable[[int], Any],
+    m: int,
+    *,
+    parallel: bool = False,
+    max_workers: int | None = None,
+    return_exceptions: bool = False,
+    limiter: AdaptiveLimiter | None = None,
+    shared: bool = False,
+) -> list[Any]:
+    """
+    逐项执行 `func(0) ... func(m - 1)`，结果按索引顺序返回。
+
+    单个条目的失败不会丢弃其他条目的结果：
+    `return_exceptions=True` 时失败条目的位置放入异常对象，
+    否则在全部条目结束后抛出 `BatchError`，其中携带已完成的结果和逐项异常。
+
+    同时执行的条目不超过 `max_workers` 个，即本次调用的并发上限；传入 `limiter` 时实际同时发出的请求数
+    还受限流器根据提供商的响应动态调整的共享上限限制，多个调用方共用限流器而互不修改对方的上限。
+
+    `shared=True` 时在共享线程池中执行，不为每次调用创建线程，同时运行的条目不超过 `max_workers` 个。
+    """
+    results: list[Any] = [None] * m
+    errors: dict[int, Exception] = {}
+
+    if parallel and m > 1:
+        pool = nullcontext(_shared_executor()) if shared else ThreadPoolExecutor(max_workers=max_workers)
+        with pool as executor, use_limiter(limiter):
+            # 每个条目在调用方上下文的副本中运行，使截止时间、限流器等上下文状态传递到工作线程
+            for i, future in _as_completed(executor, func, m, max_workers if shared else None):
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    errors[i] = e
+    else:
+        for i in range(m):
+            try:
+                results[i] = func(i)
+            except Exception as e:
+                errors[i] = e
+
+    if errors:
+        if return_exceptions:
+            for i, error in errors.items():
+                results[i] = error
+        else:
+            raise BatchError(f"{len(errors)} of {m} items failed", results, errors)
+    return results
+
+
+def run_first(func: Callable[[int], Any], m: int, *, max_workers: int | None = None) -> tuple[int, Any]:
+    """
+    并发执行 `func(0) ... func(m - 1)`，返回第一个成功完成的条目的 `(索引, 结果)`。
+
+    条目在共享的线程池中执行，同时运行的条目不超过 `max_workers` 个，失败一个再提交下一个。
+    获得结果后立即返回：尚未开始的条目被取消，正在运行的条目通过取消信号停止后续的请求和重试；
+    已经发出的请求由 `Client.generate` 立即放弃等待，落选的条目不会长时间占用共享线程池。
+    所有条目都失败时抛出 `BatchError`。
+    """
+    errors: dict[int, Exception] = {}
+    cancelled = threading.Event()
+
+    def run(i: int) -> Any:
+        with cancel_on(cancelled):
+            return func(i)
+
+    completed = _as_completed(_shared_executor(), run, m, max_workers)
+    try:
+        for i, future in completed:
+            try:
+                return i, future.result()
+            except Exception as e:
+                errors[i] = e
+    finally:
+        cancelled.set()
+        completed.close()  # 取消尚未开始的条目
+    raise BatchError(f"All {m} items failed", [None] * m, errors)
+
+
+def _as_completed(
+    executor: ThreadPoolExecutor, func: Callable[[int], Any], m: int, max_workers: int | None
+) -> Generator[tuple[int, Future[Any]]]:
+    """
+    在 `executor` 中执行 `func(0) ... func(m - 1)`，按完成顺序返回 `(索引, future)`。
+
+    同时提交的条目不超过 `max_workers` 个，调用方处理完一个结果后才提交下一个；
+    调用方提前停止迭代时取消尚未开始的条目。
+    """
+    pending = iter(range(m))
+    futures: dict[Future[Any], int] = {}
+
+    def submit_next() -> None:
+        i = next(pending, None)
+        if i is not None:
+            futures[executor.submit(copy_context().run, func, i)] = i
+
+    for _ in range(max_workers or m):
+        submit_next()
+    try:
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield futures.pop(future), future
+                submit_next()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    """`run_first` 和 `run_batch(shared=True)` 共用的线程池，避免每次调用都创建线程"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SHARED_MAX_WORKERS, thread_name_prefix="uglychain-shared")
+        return _executor
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 当前上下文的截止时间（time.monotonic() 的绝对值），None 表示没有限制
+_deadline: ContextVar[float | None] = ContextVar("uglychain_deadline", default=None)
+# 当前上下文的取消信号，设置后视为截止时间已到
+_cancel_event: ContextVar[threading.Event | None] = ContextVar("uglychain_cancel_event", default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """当前上下文的截止时间已过"""
+
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """
+    在上下文中设置截止时间，嵌套使用时取更早的截止时间。
+
+    截止时间保存在 contextvars 中，`Client.generate` 会把剩余时间作为请求超时传给提供商，
+    这样超时的请求会在网络层被真正取消，而不是留下一个仍在运行的线程。
+    """
+    if seconds is None:
+        yield
+        return
+    new_deadline = time.monotonic() + max(seconds, 0)
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def cancel_on(event: threading.Event) -> Iterator[None]:
+    """
+    在上下文中关联取消信号：`event` 被设置后，剩余时间视为 0。
+
+    尚未发出的请求、重试和等待并发名额的请求会像超过截止时间一样停止；
+    已经发出的请求由 `Client.generate` 立即返回，请求在后台结束后才归还并发名额。
+    """
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def current_cancel_event() -> threading.Event | None:
+    """返回当前上下文关联的取消信号"""
+    return _cancel_event.get()
+
+
+def current_deadline() -> float | None:
+    """返回当前上下文的绝对截止时间，用于传递给不共享 contextvars 的后台线程"""
+    return _deadline.get()
+
+
+def remaining(at: float | None = None) -> float | None:
+    """返回距离截止时间的剩余秒数，没有截止时间时返回 None；当前上下文已被取消时返回 0"""
+    if at is None:
+        event = _cancel_event.get()
+        if event is not None and event.is_set():
+            return 0.0
+    end = _deadline.get() if at is None else at
+    if end is None:
+        return None
+    return end - time.monotonic()
+
+
+def check_deadline(at: float | None = None) -> None:
+    """如果截止时间已过则抛出 DeadlineExceededError"""
+    left = remaining(at)
+    if left is not None and left <= 0:
+        raise DeadlineExceededError("Deadline exceeded")
+
+
+def split(parts: int) -> float | None:
+    """把剩余时间平均分给接下来的 `parts` 个步骤，返回当前步骤可用的秒数"""
+    left = remaining()
+    if left is None:
+        return None
+    return max(left, 0) / max(parts, 1)
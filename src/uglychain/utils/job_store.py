@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+PYDANTIC_MARKER = "__pydantic__"  # 序列化后的 pydantic 模型中记录类路径的键
+
+
+class JobStore(ABC):
+    """
+    批处理任务的持久化存储，按 `(job_id, index)` 保存每个已完成条目的结果。
+
+    条目完成后立即写入；以相同的 job_id 重新运行时跳过已完成的条目，
+    进程崩溃或重新部署后只需要重跑未完成的部分。
+    """
+
+    @abstractmethod
+    def load(self, job_id: str) -> dict[int, Any]:
+        """返回任务中已完成条目的索引到结果的映射"""
+
+    @abstractmethod
+    def save(self, job_id: str, index: int, value: Any) -> None:
+        """保存一个已完成条目的结果"""
+
+    @abstractmethod
+    def clear(self, job_id: str) -> None:
+        """删除任务的全部记录"""
+
+    @staticmethod
+    def encode(value: Any) -> str:
+        """将结果序列化为 JSON，pydantic 模型记录类路径以便还原"""
+        return json.dumps(value, ensure_ascii=False, default=_encode_default)
+
+    @staticmethod
+    def decode(text: str) -> Any:
+        return json.loads(text, object_hook=_decode_object)
+
+    @staticmethod
+    def fingerprint(value: Any) -> str:
+        """返回输入的摘要，用于判断已保存的结果是否对应相同的输入"""
+        text = json.dumps(value, ensure_ascii=False, sort_keys=True, default=repr)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteJobStore(JobStore):
+    """基于 SQLite 的任务存储，适合大量条目和多线程写入"""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            "job_id TEXT NOT NULL, idx INTEGER NOT NULL, value TEXT NOT NULL, PRIMARY KEY (job_id, idx))"
+        )
+
+    def load(self, job_id: str) -> dict[int, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT idx, value FROM job_items WHERE job_id = ?", (job_id,)).fetchall()
+        return _decode_rows(rows)
+
+    def save(self, job_id: str, index: int, value: Any) -> None:
+        text = self.encode(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_items (job_id, idx, value) VALUES (?, ?, ?)", (job_id, index, text)
+            )
+
+    def clear(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JSONLJobStore(JobStore):
+    """基于追加写入 JSONL 文件的任务存储，便于查看和备份"""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def load(self, job_id: str) -> dict[int, Any]:
+        rows: list[tuple[int, str]] = []
+        with self._lock:
+            if not self.path.exists():
+                return {}
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 崩溃时写了一半的行
+                    if record.get("job_id") != job_id:
+                        continue
+                    if record.get("cleared"):
+                        rows.clear()
+                    else:
+                        rows.append((record["index"], json.dumps(record["value"])))
+        return _decode_rows(rows)
+
+    def save(self, job_id: str, index: int, value: Any) -> None:
+        self._append({"job_id": job_id, "index": index, "value": json.loads(self.encode(value))})
+
+    def clear(self, job_id: str) -> None:
+        # 只追加不改写：写入一条清除标记，之前的记录在加载时被忽略
+        self._append({"job_id": job_id, "cleared": True})
+
+    def _append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock, self.path.open("a+b") as f:
+            if f.tell() > 0:
+                f.seek(-1, 2)
+                if f.read(1) != b"\n":
+                    line = "\n" + line  # 崩溃时最后一行可能只写了一半，从新的一行开始追加
+            f.write(line.encode("utf-8"))
+            f.flush()
+
+
+def get_job_store(path: str | Path) -> JobStore:
+    """按文件后缀创建任务存储：`.jsonl` 使用 JSONLJobStore，其他使用 SQLiteJobStore"""
+    if Path(path).suffix.lower() == ".jsonl":
+        return JSONLJobStore(path)
+    return SQLiteJobStore(path)
+
+
+def _decode_rows(rows: list[tuple[int, str]]) -> dict[int, Any]:
+    """解码存储的结果，无法还原的条目视为未完成，重新运行"""
+    completed: dict[int, Any] = {}
+    for index, text in rows:
+        try:
+            completed[index] = JobStore.decode(text)
+        except (ValueError, TypeError, ImportError, AttributeError):
+            completed.pop(index, None)
+    return completed
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        cls = type(value)
+        return {PYDANTIC_MARKER: f"{cls.__module__}:{cls.__qualname__}", "data": value.model_dump(mode="json")}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_object(obj: dict[str, Any]) -> Any:
+    if PYDANTIC_MARKER not in obj:
+        return obj
+    module_name, _, qualname = obj[PYDANTIC_MARKER].partition(":")
+    target: Any = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)  # 局部定义的类无法导入，抛出 AttributeError
+    return target.model_validate(obj["data"])
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .deadline import DeadlineExceededError, remaining
+from .retry import _iter_causes, get_status_code
+
+logger = logging.getLogger(__name__)
+
+# 当前上下文使用的限流器，Client.generate 在发起请求前从这里获取并发名额
+_current_limiter: ContextVar[AdaptiveLimiter | None] = ContextVar("uglychain_limiter", default=None)
+
+
+# 创建后可以通过 `configure` 修改的参数；`initial` 只是起始上限，之后由请求结果决定
+TUNABLE_SETTINGS = {
+    "min_limit",
+    "max_limit",
+    "increase",
+    "decrease_factor",
+    "latency_tolerance",
+    "latency_alpha",
+    "min_samples",
+}
+
+
+@dataclass
+class LimiterDecision:
+    """一次并发上限调整"""
+
+    time: float
+    action: str  # "increase" 或 "decrease"
+    reason: str  # "healthy"、"throttled"、"timeout" 或 "latency"
+    limit: float
+
+
+@dataclass
+class LimiterMetrics:
+    """限流器当前状态的快照"""
+
+    limit: float
+    in_flight: int
+    successes: int = 0
+    errors: int = 0
+    throttled: int = 0
+    timeouts: int = 0
+    latency_spikes: int = 0
+    increases: int = 0
+    decreases: int = 0
+    latency_ewma: float | None = None
+    latency_baseline: float | None = None
+    decisions: list[LimiterDecision] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD（加性增、乘性减）并发限流器。
+
+    请求成功且延迟正常时，每完成约 `limit` 个请求上限增加 `increase`；
+    遇到 429、超时或延迟超过基线的 `latency_tolerance` 倍时，上限乘以 `decrease_factor`。
+    在上一次下调之前发出的请求再失败不会重复下调，避免一波 429 把并发压到最低。
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        *,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        increase: float = 1,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 3.0,
+        latency_alpha: float = 0.2,
+        min_samples: int = 5,
+    ) -> None:
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor 必须在 0 和 1 之间")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.latency_alpha = latency_alpha
+        self.min_samples = min_samples
+        self._limit = min(max(initial, min_limit), max_limit)
+        self._in_flight = 0
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._metrics = LimiterMetrics(limit=self._limit, in_flight=0)
+        self._decisions: deque[LimiterDecision] = deque(maxlen=100)
+
+    @property
+    def limit(self) -> float:
+        return self._limit
+
+    def configure(self, **settings: Any) -> None:
+        """更新上下限和调整参数，当前上限收紧到新的范围内；已经学习到的上限和延迟基线保留"""
+        unknown = set(settings) - TUNABLE_SETTINGS
+        if unknown:
+            raise ValueError(f"未知的限流器参数 {sorted(unknown)}")
+        decrease_factor = settings.get("decrease_factor", self.decrease_factor)
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor 必须在 0 和 1 之间")
+        with self._cond:
+            for name, value in settings.items():
+                setattr(self, name, value)
+            self._limit = min(max(self._limit, self.min_limit), self.max_limit)
+            self._metrics.limit = self._limit
+            self._cond.notify_all()  # 上限可能变大，唤醒等待名额的请求
+
+    def acquire(self) -> float:
+        """等待一个并发名额，返回请求开始的时间；截止时间已过或请求已被取消时不再占用名额"""
+        with self._cond:
+            while True:
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise DeadlineExceededError("Deadline exceeded while waiting for a concurrency slot")
+                if self._in_flight < max(int(self._limit), 1):
+                    break
+                self._cond.wait(left)
+            self._in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, error: BaseException | None = None) -> None:
+        """归还名额，并根据请求结果调整上限"""
+        latency = time.monotonic() - started
+        with self._cond:
+            self._in_flight -= 1
+            if error is None:
+                self._on_success(started, latency)
+            else:
+                self._on_error(started, error)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """在一个并发名额内执行请求；提前关闭流式响应（GeneratorExit）等不是请求错误，不影响上限"""
+        started = self.acquire()
+        error: Exception | None = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(started, error)
+
+    def _on_success(self, started: float, latency: float) -> None:
+        m = self._metrics
+        m.successes += 1
+        self._samples += 1
+        m.latency_ewma = latency if m.latency_ewma is None else self._ewma(m.latency_ewma, latency)
+        baseline = m.latency_baseline
+        if baseline is not None and self._samples > self.min_samples and latency > baseline * self.latency_tolerance:
+            m.latency_spikes += 1
+            self._decrease(started, "latency")
+            return
+        # 基线只跟随健康请求的延迟，下降快、上升慢
+        if baseline is None or latency < baseline:
+            m.latency_baseline = latency if baseline is None else self._ewma(baseline, latency, alpha=0.5)
+        else:
+            m.latency_baseline = self._ewma(baseline, latency, alpha=self.latency_alpha / 10)
+        old_limit = self._limit
+        self._limit = min(self._limit + self.increase / max(self._limit, 1), self.max_limit)
+        m.limit = self._limit
+        if int(self._limit) > int(old_limit):  # 只记录实际放开了一个并发名额的调整
+            m.increases += 1
+            self._record("increase", "healthy")
+
+    def _on_error(self, started: float, error: BaseException) -> None:
+        m = self._metrics
+        m.errors += 1
+        if get_status_code(error) == 429:
+            m.throttled += 1
+            self._decrease(started, "throttled")
+        elif _is_timeout(error):
+            m.timeouts += 1
+            self._decrease(started, "timeout")
+
+    def _decrease(self, started: float, reason: str) -> None:
+        if started < self._last_decrease:
+            return  # 在上一次下调之前发出的请求，其结果已经反映在那次下调中
+        self._last_decrease = time.monotonic()
+        self._limit = max(self._limit * self.decrease_factor, self.min_limit)
+        self._metrics.decreases += 1
+        self._metrics.limit = self._limit
+        self._record("decrease", reason)
+
+    def _record(self, action: str, reason: str) -> None:
+        decision = LimiterDecision(time=time.time(), action=action, reason=reason, limit=self._limit)
+        self._decisions.append(decision)
+        logger.debug(f"Concurrency limit {action} to {self._limit:.2f} ({reason})")
+
+    def _ewma(self, current: float, value: float, alpha: float | None = None) -> float:
+        alpha = self.latency_alpha if alpha is None else alpha
+        return (1 - alpha) * current + alpha * value
+
+    def metrics(self) -> LimiterMetrics:
+        """返回当前上限、并发数、计数和最近的调整记录"""
+        with self._cond:
+            snapshot = LimiterMetrics(**{**asdict(self._metrics), "decisions": list(self._decisions)})
+            snapshot.in_flight = self._in_flight
+            return snapshot
+
+
+def _is_timeout(error: BaseException) -> bool:
+    return any(isinstance(err, TimeoutError) or "Timeout" in type(err).__name__ for err in _iter_causes(error))
+
+
+@contextmanager
+def use_limiter(limiter: AdaptiveLimiter | None) -> Iterator[None]:
+    """在上下文中启用限流器，期间 Client.generate 的每次请求都占用一个并发名额"""
+    token = _current_limiter.set(limiter)
+    try:
+        yield
+    finally:
+        _current_limiter.reset(token)
+
+
+def current_limiter() -> AdaptiveLimiter | None:
+    return _current_limiter.get()
+
+
+_limiters: dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(key: str, initial: float | None = None, **kwargs: Any) -> AdaptiveLimiter:
+    """
+    按键（通常是模型名称）获取共享的限流器，同一提供商容量下的调用共用一个上限。
+
+    参数只在第一次创建时使用，之后的调用直接返回共享的限流器，不会修改其他调用方正在使用的上限；
+    每个调用方自己的并发上限（如 `config.max_concurrency`）由 `run_batch` 的线程数限制，
+    需要修改共享限流器的参数时显式调用 `configure`。
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveLimiter(**kwargs if initial is None else {"initial": initial, **kwargs})
+        return limiter
+
+
+def limiter_metrics() -> dict[str, dict[str, Any]]:
+    """返回所有共享限流器的指标"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {key: limiter.metrics().to_dict() for key, limiter in limiters.items()}
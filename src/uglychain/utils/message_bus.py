@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import functools
+import threading
 from collections.abc import Callable
 from dataclasses import dataclass, field
 from typing import Any, ClassVar, ParamSpec
@@ -16,6 +17,7 @@ class MessageBus:
     module: str = ""
     signal: ClassVar[NamedSignal] = signal("uglychain")
     _map: ClassVar[dict[str, dict[str, MessageBus]]] = field(default={})
+    _lock: ClassVar[threading.Lock] = threading.Lock()  # 保护 _map 和信号连接，多个线程可能同时创建会话
 
     def send(self, message: Any = None, **kwargs: Any) -> None:
         if message:
@@ -27,13 +29,17 @@ class MessageBus:
         def warper(sender: Any, *args: P.args, **kwargs: P.kwargs) -> None:
             return func(*args, **kwargs)
 
-        self.signal.connect_via(f"{self.name}_{self.module}")(warper)
+        with self._lock:
+            self.signal.connect_via(f"{self.name}_{self.module}")(warper)
         return func
 
     @classmethod
     def get(cls, name: str, module: str = "") -> MessageBus:
-        if name not in cls._map:
-            cls._map[name] = {}
-        if module not in cls._map[name]:
-            cls._map[name][module] = cls(name, module)
-        return cls._map[name][module]
+        bus = cls._map.get(name, {}).get(module)
+        if bus is not None:
+            return bus
+        with cls._lock:
+            modules = cls._map.setdefault(name, {})
+            if module not in modules:
+                modules[module] = cls(name, module)
+            return modules[module]
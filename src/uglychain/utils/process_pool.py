@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import atexit
+import importlib
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from types import SimpleNamespace
+from typing import Any
+
+MAX_ATTACHED_SHARED_ARGS = 8  # 每个工作进程缓存的共享参数数量，超出后丢弃最早的
+
+
+@dataclass(frozen=True)
+class FunctionRef:
+    """
+    按模块和限定名引用一个函数，工作进程中重新导入后取得原函数。
+
+    被 `llm` 等装饰器包装的函数在模块中的名字指向包装后的函数，无法直接 pickle，
+    这里解析到模块属性后沿 `__wrapped__` 取回原函数。
+    """
+
+    module: str
+    qualname: str
+
+    @classmethod
+    def of(cls, func: Callable) -> FunctionRef:
+        if "<locals>" in func.__qualname__ or "<lambda>" in func.__qualname__:
+            raise ValueError(f"{func.__qualname__} 不是模块级函数，无法在工作进程中执行")
+        return cls(func.__module__, func.__qualname__)
+
+    def resolve(self) -> Callable:
+        obj: Any = importlib.import_module(self.module)
+        for name in self.qualname.split("."):
+            obj = getattr(obj, name)
+        while hasattr(obj, "__wrapped__"):
+            obj = obj.__wrapped__
+        return obj
+
+
+@dataclass(frozen=True)
+class SharedRef:
+    """共享内存中一组参数的句柄，按值传给工作进程"""
+
+    name: str
+    size: int
+
+    def load(self) -> Any:
+        """在工作进程中读取共享的参数，每个进程对同一块共享内存只反序列化一次"""
+        with _attached_lock:
+            if self.name in _attached:
+                _attached.move_to_end(self.name)
+                return _attached[self.name]
+        shm = SharedMemory(name=self.name, track=False)
+        try:
+            assert shm.buf is not None
+            value = pickle.loads(shm.buf[: self.size])
+        finally:
+            shm.close()
+        with _attached_lock:
+            _attached[self.name] = value
+            while len(_attached) > MAX_ATTACHED_SHARED_ARGS:
+                _attached.popitem(last=False)
+        return value
+
+
+_attached: OrderedDict[str, Any] = OrderedDict()
+_attached_lock = threading.Lock()
+
+
+class SharedArgs:
+    """
+    把批处理中所有条目共用的参数一次性序列化到共享内存。
+
+    每个条目只传递共享内存的名称，工作进程挂载后读取，不会为每个条目重复 pickle 大参数。
+    使用结束后调用 `close`（或用作上下文管理器）释放共享内存。
+    """
+
+    def __init__(self, value: Any) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._shm = SharedMemory(create=True, size=max(len(data), 1))
+        assert self._shm.buf is not None
+        self._shm.buf[: len(data)] = data
+        self.ref = SharedRef(self._shm.name, len(data))
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> SharedRef:
+        return self.ref
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def snapshot_choice(choice: Any) -> SimpleNamespace:
+    """复制响应选项中解析所需的字段，提供商返回的对象不一定能 pickle"""
+    message = choice.message
+    fields: dict[str, Any] = {"content": getattr(message, "content", None)}
+    if hasattr(message, "reasoning_content"):
+        fields["reasoning_content"] = message.reasoning_content
+    if getattr(message, "tool_calls", None):
+        fields["tool_calls"] = [
+            SimpleNamespace(
+                id=getattr(call, "id", None),
+                function=SimpleNamespace(name=call.function.name, arguments=call.function.arguments),
+            )
+            for call in message.tool_calls
+        ]
+    return SimpleNamespace(message=SimpleNamespace(**fields))
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    返回共享的进程池，工作进程数为 CPU 核数，首次使用时创建。
+
+    调用方通常已经启动了多个线程，在多线程进程中 fork 可能死锁，因此使用 forkserver（不可用时使用 spawn）。
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _pool = ProcessPoolExecutor(
+                    max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context(method)
+                )
+    return _pool
+
+
+@atexit.register
+def shutdown_process_pool() -> None:
+    """关闭共享的进程池，下次使用时重新创建"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def run_in_process(func: Callable[..., Any], *args: Any) -> Any:
+    """在共享的进程池中执行 `func(*args)` 并等待结果，`func` 和参数必须能 pickle"""
+    return get_process_pool().submit(func, *args).result()
@@ -1,13 +1,37 @@
 from __future__ import annotations
 
+import logging
+import random
 import time
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import warnings
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from functools import wraps
 from typing import Any, ParamSpec
 
+from pydantic import PydanticUserError, ValidationError
+
+from .deadline import DeadlineExceededError, deadline, remaining
+from .usage import BudgetExceededError
+
 P = ParamSpec("P")
 
+logger = logging.getLogger(__name__)
+
+# 可以重试的 HTTP 状态码：超时、冲突、限流和服务端错误
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+# 重试无意义的异常类型：编程错误和参数、模式校验失败不会因为重试而改变，预算用完后重试只会继续被拒绝
+FATAL_EXCEPTIONS: tuple[type[Exception], ...] = (
+    TypeError,
+    NotImplementedError,
+    ValidationError,
+    PydanticUserError,  # 包括 PydanticSchemaGenerationError
+    BudgetExceededError,
+)
+
 
 class RetryError(Exception):
     def __init__(self, message: str, errors: list[Exception]) -> None:
@@ -19,40 +43,154 @@ class RetryError(Exception):
         return f"{self.args[0]}\nPrevious errors:\n{error_messages}"
 
 
+def _iter_causes(error: BaseException) -> Iterator[BaseException]:
+    """依次返回异常本身及其 `__cause__`/`__context__` 链，Client 会把原始异常包装在 RuntimeError 中"""
+    seen: set[int] = set()
+    current: BaseException | None = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+def get_status_code(error: BaseException) -> int | None:
+    """从异常链中提取提供商返回的 HTTP 状态码"""
+    for err in _iter_causes(error):
+        status = getattr(err, "status_code", None)
+        if status is None:
+            status = getattr(getattr(err, "response", None), "status_code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def get_retry_after(error: BaseException | None) -> float | None:
+    """解析提供商的 `Retry-After`（或 `retry-after-ms`）响应头，返回需要等待的秒数"""
+    if error is None:
+        return None
+    for err in _iter_causes(error):
+        headers = getattr(getattr(err, "response", None), "headers", None)
+        if not headers:
+            continue
+        try:
+            retry_after_ms = headers.get("retry-after-ms")
+            if retry_after_ms is not None:
+                return max(float(retry_after_ms) / 1000, 0.0)
+            retry_after = headers.get("retry-after")
+            if retry_after is None:
+                continue
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                retry_date = parsedate_to_datetime(retry_after)
+                return max((retry_date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError, AttributeError):
+            continue
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    判断异常是否值得重试。
+
+    有 HTTP 状态码时按状态码分类（429、5xx、超时可重试；400、鉴权、参数校验等直接失败）；
+    超时和连接错误可重试；pydantic 的校验和模式错误直接失败；
+    没有状态码的其他异常（例如模型输出解析失败，会被包装为 ValueError）默认可重试，重新采样可能得到合法的输出。
+    """
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    for err in _iter_causes(error):
+        if isinstance(err, TimeoutError | ConnectionError):
+            return True
+        name = type(err).__name__
+        if "Timeout" in name or "Connection" in name:
+            return True
+    return not isinstance(error, FATAL_EXCEPTIONS)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    重试策略：指数退避 + 完全抖动（full jitter），并遵循提供商的 `Retry-After`。
+
+    第 k 次重试前的等待时间在 `[0, min(max_delay, base_delay * multiplier**k)]` 中均匀取值，
+    避免大量客户端在同一时刻集中重试。
+    """
+
+    max_attempts: int = 3
+    timeout: float | None = None
+    base_delay: float = 0.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+    jitter: bool = True
+    respect_retry_after: bool = True
+
+    def is_retryable(self, error: BaseException) -> bool:
+        return is_retryable(error)
+
+    def compute_delay(self, attempt: int, error: BaseException | None = None) -> float:
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier**attempt)
+        delay = random.uniform(0, ceiling) if self.jitter else ceiling
+        if self.respect_retry_after:
+            retry_after = get_retry_after(error)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
 def retry(
-    n: int, timeout: float, wait: float, executor: ThreadPoolExecutor | None = None
+    n: int = 3,
+    timeout: float | None = None,
+    wait: float = 0,
+    executor: Executor | None = None,
+    *,
+    max_wait: float = 60,
+    policy: RetryPolicy | None = None,
 ) -> Callable[[Callable[P, Any]], Callable[P, Any]]:
-    def decorator_retry(func: Callable[P, Any]) -> Callable[P, Any]:
-        max_retries = n
-        llm_timeout = timeout
+    if executor is not None:
+        warnings.warn(
+            "retry() 的 executor 参数已弃用并被忽略：超时通过截止时间传给提供商的请求，不再需要线程池",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+    retry_policy = policy or RetryPolicy(max_attempts=n, timeout=timeout, base_delay=wait, max_delay=max_wait)
 
+    def decorator_retry(func: Callable[P, Any]) -> Callable[P, Any]:
         @wraps(func)
         def wrapper_retry(*args: P.args, **kwargs: P.kwargs) -> Any:
-            attempts = 0
             errors: list[Exception] = []
-            nonlocal executor
-            if executor is None:
-                executor = ThreadPoolExecutor()
-            while attempts < max_retries:
-                future = executor.submit(func, *args, **kwargs)
+            attempts = 0
+            for attempt in range(retry_policy.max_attempts):
+                outer_left = remaining()
+                if outer_left is not None and outer_left <= 0:
+                    # 外层的截止时间已过，继续重试没有意义
+                    errors.append(DeadlineExceededError("Deadline exceeded before retry"))
+                    break
+                attempts += 1
                 try:
-                    result = future.result(timeout=llm_timeout)
-                    return result
-                except TimeoutError as e:
-                    print(
-                        f"Function execution exceeded {llm_timeout} seconds, retrying... (attempt {attempts + 1}/{max_retries})"
-                    )
-                    errors.append(e)
-                    attempts += 1
+                    # 每次尝试在自己的截止时间内运行，超时会通过 Client 传给提供商的请求；
+                    # 已经返回的结果即使超过了截止时间也直接使用，不丢弃已经付费的响应
+                    with deadline(retry_policy.timeout):
+                        return func(*args, **kwargs)
                 except Exception as e:
-                    print(
-                        f"Function {func.__name__} failed with error: {e}, retrying... (attempt {attempts + 1}/{max_retries})"
-                    )
                     errors.append(e)
-                    attempts += 1
-                if wait > 0:
-                    time.sleep(wait)
-            raise RetryError(f"Function {func.__name__} failed after {n} attempts", errors)
+                    if not retry_policy.is_retryable(e):
+                        logger.warning(f"Function {func.__name__} failed with non-retryable error: {e}")
+                        raise
+                    if attempt + 1 >= retry_policy.max_attempts:
+                        break
+                    delay = retry_policy.compute_delay(attempt, e)
+                    outer_left = remaining()
+                    if outer_left is not None:
+                        delay = min(delay, max(outer_left, 0))
+                    logger.warning(
+                        f"Function {func.__name__} failed with error: {e}, retrying in {delay:.2f}s... "
+                        f"(attempt {attempt + 1}/{retry_policy.max_attempts})"
+                    )
+                    if delay > 0:
+                        time.sleep(delay)
+            raise RetryError(f"Function {func.__name__} failed after {attempts} attempts", errors)
 
         return wrapper_retry
 
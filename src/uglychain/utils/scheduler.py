@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from .deadline import DeadlineExceededError, remaining
+
+# 优先级从高到低：交互式请求优先，批处理使用剩余容量
+PRIORITIES = ("interactive", "default", "batch")
+DEFAULT_PRIORITY = "interactive"
+DEFAULT_TENANT = "default"
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """当前上下文中请求的优先级和租户，Client.generate 据此排队"""
+
+    priority: str = DEFAULT_PRIORITY
+    tenant: str = DEFAULT_TENANT
+
+
+_request_context: ContextVar[RequestContext | None] = ContextVar("uglychain_request_context", default=None)
+
+
+@contextmanager
+def request_priority(priority: str | None = None, tenant: str | None = None) -> Iterator[None]:
+    """
+    在上下文中设置请求的优先级和租户，未指定的项沿用外层上下文的设置。
+
+    Examples:
+        >>> with request_priority("batch", tenant="user-42"):
+        ...     summarize(texts)
+    """
+    current = current_request_context()
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"未知的优先级 {priority!r}，可选值为 {PRIORITIES}")
+    token = _request_context.set(RequestContext(priority or current.priority, tenant or current.tenant))
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+def current_request_context() -> RequestContext:
+    return _request_context.get() or RequestContext()
+
+
+def has_request_context() -> bool:
+    """外层是否显式设置了优先级或租户"""
+    return _request_context.get() is not None
+
+
+@dataclass
+class _Waiter:
+    priority: str
+    tenant: str
+    tag: float  # 加权公平排队的虚拟完成时间，越小越先调度
+    seq: int
+    granted: threading.Event = field(default_factory=threading.Event)
+
+
+class RequestScheduler:
+    """
+    请求调度器，所有经过 Client.generate 的请求在这里排队获取并发名额。
+
+    不同优先级之间严格按优先级调度，高优先级的请求总是先获得空闲名额；
+    同一优先级内按租户做加权公平排队（WFQ），一个租户的大批量任务不会饿死其他租户；
+    虚拟时间取最近一次调度的请求的完成时间（自计时公平排队），没有排队请求的租户的完成时间
+    落后于虚拟时间后即被删除，不会随租户数量无限增长；
+    `class_limits` 限制每个优先级最多占用的名额，可以为交互式请求预留容量。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        *,
+        class_limits: dict[str, int] | None = None,
+        tenant_weights: dict[str, float] | None = None,
+    ) -> None:
+        """
+        Args:
+            max_concurrency: 同时进行的请求总数
+            class_limits: 每个优先级最多同时进行的请求数，未设置的优先级只受总数限制
+            tenant_weights: 租户的权重，权重越大分到的名额越多，默认为 1
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 必须大于 0")
+        unknown = set(class_limits or {}) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"未知的优先级 {sorted(unknown)}，可选值为 {PRIORITIES}")
+        self.max_concurrency = max_concurrency
+        self.class_limits = dict(class_limits or {})
+        self.tenant_weights = dict(tenant_weights or {})
+        self._lock = threading.Lock()
+        self._waiting: dict[str, list[_Waiter]] = {priority: [] for priority in PRIORITIES}
+        self._running: dict[str, int] = dict.fromkeys(PRIORITIES, 0)
+        self._virtual_time: dict[str, float] = dict.fromkeys(PRIORITIES, 0.0)
+        self._finish_tags: dict[tuple[str, str], float] = {}
+        self._completed: dict[str, int] = dict.fromkeys(PRIORITIES, 0)
+        self._seq = 0
+
+    def acquire(self, context: RequestContext | None = None) -> RequestContext:
+        """按当前上下文的优先级和租户排队，获得名额后返回请求所属的上下文"""
+        context = context or current_request_context()
+        with self._lock:
+            key = (context.priority, context.tenant)
+            start = max(self._virtual_time[context.priority], self._finish_tags.get(key, 0.0))
+            tag = start + 1 / self.tenant_weights.get(context.tenant, 1.0)
+            self._finish_tags[key] = tag
+            self._seq += 1
+            waiter = _Waiter(context.priority, context.tenant, tag, self._seq)
+            self._waiting[context.priority].append(waiter)
+            self._dispatch()
+
+        left = remaining()
+        if not waiter.granted.wait(None if left is None else max(left, 0)):
+            with self._lock:
+                if not waiter.granted.is_set():
+                    self._waiting[context.priority].remove(waiter)
+                    raise DeadlineExceededError("Deadline exceeded while waiting in the request scheduler")
+        return context
+
+    def release(self, context: RequestContext) -> None:
+        with self._lock:
+            self._running[context.priority] -= 1
+            self._completed[context.priority] += 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """在一个调度名额内执行请求"""
+        context = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(context)
+
+    def _dispatch(self) -> None:
+        """把空闲名额按优先级和虚拟完成时间分配给等待中的请求，调用方需持有锁"""
+        while sum(self._running.values()) < self.max_concurrency:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._waiting[waiter.priority].remove(waiter)
+            self._running[waiter.priority] += 1
+            self._virtual_time[waiter.priority] = max(self._virtual_time[waiter.priority], waiter.tag)
+            waiter.granted.set()
+            self._evict_idle_tags(waiter.priority)
+
+    def _evict_idle_tags(self, priority: str) -> None:
+        """
+        删除没有排队请求、且完成时间不晚于虚拟时间的租户的完成时间，调用方需持有锁。
+
+        这些租户的下一个请求本来就从虚拟时间开始计算，删除后调度结果不变。
+        """
+        virtual_time = self._virtual_time[priority]
+        queued = {waiter.tenant for waiter in self._waiting[priority]}
+        idle = [
+            key
+            for key, tag in self._finish_tags.items()
+            if key[0] == priority and key[1] not in queued and tag <= virtual_time
+        ]
+        for key in idle:
+            del self._finish_tags[key]
+
+    def _next_waiter(self) -> _Waiter | None:
+        for priority in PRIORITIES:
+            waiting = self._waiting[priority]
+            limit = self.class_limits.get(priority)
+            if not waiting or (limit is not None and self._running[priority] >= limit):
+                continue
+            return min(waiting, key=lambda w: (w.tag, w.seq))
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        """返回每个优先级正在进行、排队中和已完成的请求数"""
+        with self._lock:
+            return {
+                priority: {
+                    "running": self._running[priority],
+                    "waiting": len(self._waiting[priority]),
+                    "completed": self._completed[priority],
+                }
+                for priority in PRIORITIES
+            }
+
+
+_scheduler: RequestScheduler | None = None
+
+
+def set_scheduler(scheduler: RequestScheduler | None) -> None:
+    """安装全局调度器，之后所有 Client.generate 请求都经过它排队；传入 None 取消调度"""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_scheduler() -> RequestScheduler | None:
+    return _scheduler
@@ -8,8 +8,9 @@ class Stream:
     def __init__(self, source_iterator: Iterator[str]):
         self._source = source_iterator
         self._cache: list[str] = []  # 存储所有接收到的数据
-        self._lock = threading.Lock()  # 保护共享资源的锁
+        self._lock = threading.Condition()  # 保护共享资源的锁，有新数据时通知等待的迭代器
         self._stopped = False  # 标记源迭代器是否耗尽
+        self._closed = False  # 标记是否已请求提前停止
 
         # 启动后台线程持续消费源迭代器
         self._thread = threading.Thread(target=self._consume_source)
@@ -18,13 +19,32 @@ class Stream:
 
     def _consume_source(self) -> None:
         """后台线程任务：持续消费源迭代器并填充缓存"""
-        for item in self._source:
+        try:
+            for item in self._source:
+                with self._lock:
+                    self._cache.append(item)
+                    self._lock.notify_all()
+                if self._closed:
+                    break
+        finally:
+            if self._closed:
+                # 关闭源生成器，使底层的流式连接一并关闭，不再继续生成
+                close = getattr(self._source, "close", None)
+                if callable(close):
+                    close()
+            # 源迭代器耗尽后标记停止
             with self._lock:
-                self._cache.append(item)
+                self._stopped = True
+                self._lock.notify_all()
 
-        # 源迭代器耗尽后标记停止
+    def close(self) -> None:
+        """请求提前停止：后台线程在收到下一个数据后停止消费并关闭源迭代器"""
         with self._lock:
-            self._stopped = True
+            self._closed = True
+            self._lock.notify_all()
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iterator
 
     @property
     def iterator(self) -> Iterator[str]:
@@ -32,11 +52,12 @@ class Stream:
         current_index = 0
 
         while True:
-            if current_index < len(self._cache):
+            with self._lock:
+                # 等待新数据或源结束，而不是空转轮询
+                while current_index >= len(self._cache) and not self._stopped and not self._closed:
+                    self._lock.wait()
+                if current_index >= len(self._cache):
+                    break
                 item = self._cache[current_index]
-                current_index += 1
-                yield item
-                continue
-
-            if self._stopped and current_index >= len(self._cache):
-                break
+            current_index += 1
+            yield item
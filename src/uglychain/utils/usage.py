@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+# 当前上下文中正在统计用量的 (统计器, 函数名) 栈，嵌套的会话（例如 react 调用 llm）都会收到用量
+_usage_scopes: ContextVar[tuple[tuple[UsageTracker, str], ...]] = ContextVar("uglychain_usage_scopes", default=())
+
+MAX_USAGE_RECORDS = 1000  # 每个统计器保留的最近调用记录数，避免大批量任务占用过多内存
+
+
+class BudgetExceededError(RuntimeError):
+    """会话的 token 或费用预算已用完"""
+
+
+@dataclass
+class Usage:
+    """一次或多次模型调用的 token 用量和估算费用"""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    reasoning_tokens: int = 0  # 包含在 completion_tokens 中
+    cached_tokens: int = 0  # 包含在 prompt_tokens 中
+    cost: float = 0.0
+    calls: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def __add__(self, other: Usage) -> Usage:
+        return Usage(
+            prompt_tokens=self.prompt_tokens + other.prompt_tokens,
+            completion_tokens=self.completion_tokens + other.completion_tokens,
+            reasoning_tokens=self.reasoning_tokens + other.reasoning_tokens,
+            cached_tokens=self.cached_tokens + other.cached_tokens,
+            cost=self.cost + other.cost,
+            calls=self.calls + other.calls,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+    @classmethod
+    def from_response(cls, usage: Any, prices: dict[str, float] | None = None) -> Usage:
+        """
+        从提供商返回的 `usage` 中读取用量，兼容 OpenAI、DeepSeek 和 Anthropic 的字段名，
+        统一为 `prompt_tokens` 包含缓存 token 的口径。
+
+        `prices` 为每百万 token 的价格：`prompt`、`completion` 和可选的 `cached`。
+        """
+        completion_tokens = _get_int(usage, "completion_tokens", "output_tokens")
+        reasoning_tokens = _get_int(_get(usage, "completion_tokens_details"), "reasoning_tokens")
+        if _get(usage, "prompt_tokens") is not None:
+            # OpenAI、DeepSeek：缓存命中的 token 包含在 prompt_tokens 中
+            prompt_tokens = _get_int(usage, "prompt_tokens")
+            cached_tokens = _get_int(_get(usage, "prompt_tokens_details"), "cached_tokens") or _get_int(
+                usage, "prompt_cache_hit_tokens"
+            )
+        else:
+            # Anthropic：input_tokens 不包含读取和写入缓存的 token，统一为包含缓存的输入 token 数
+            cached_tokens = _get_int(usage, "cache_read_input_tokens")
+            prompt_tokens = (
+                _get_int(usage, "input_tokens") + cached_tokens + _get_int(usage, "cache_creation_input_tokens")
+            )
+        parsed = cls(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            reasoning_tokens=reasoning_tokens,
+            cached_tokens=cached_tokens,
+            calls=1,
+        )
+        parsed.cost = parsed.estimate_cost(prices)
+        return parsed
+
+    def estimate_cost(self, prices: dict[str, float] | None) -> float:
+        """按每百万 token 的价格估算这些 token 的费用，没有价格时返回 0"""
+        if not prices:
+            return 0.0
+        prompt_price = prices.get("prompt", 0.0)
+        cached_price = prices.get("cached", prompt_price)
+        return (
+            max(self.prompt_tokens - self.cached_tokens, 0) * prompt_price
+            + self.cached_tokens * cached_price
+            + self.completion_tokens * prices.get("completion", 0.0)
+        ) / 1_000_000
+
+
+@dataclass
+class UsageRecord:
+    """一次模型调用的用量记录"""
+
+    time: float
+    model: str
+    func: str
+    usage: Usage
+
+
+@dataclass
+class Budget:
+    """用量预算，`max_tokens` 和 `max_cost` 任意一项超出即停止后续调用"""
+
+    max_tokens: int | None = None
+    max_cost: float | None = None
+
+    def exceeded(self, usage: Usage) -> str | None:
+        """返回超出预算的原因，未超出时返回 None"""
+        if self.max_tokens is not None and usage.total_tokens >= self.max_tokens:
+            return f"token budget exhausted ({usage.total_tokens}/{self.max_tokens} tokens)"
+        if self.max_cost is not None and usage.cost >= self.max_cost:
+            return f"cost budget exhausted ({usage.cost:.4f}/{self.max_cost:.4f})"
+        return None
+
+
+@dataclass
+class UsageTracker:
+    """累计一个会话的用量：总量、按模型、按函数，以及最近的每次调用"""
+
+    budget: Budget | None = None
+    total: Usage = field(default_factory=Usage)
+    by_model: dict[str, Usage] = field(default_factory=dict)
+    by_func: dict[str, Usage] = field(default_factory=dict)
+    records: deque[UsageRecord] = field(default_factory=lambda: deque(maxlen=MAX_USAGE_RECORDS))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, model: str, func: str, usage: Usage) -> None:
+        with self._lock:
+            self.total += usage
+            self.by_model[model] = self.by_model.get(model, Usage()) + usage
+            self.by_func[func] = self.by_func.get(func, Usage()) + usage
+            self.records.append(UsageRecord(time=time.time(), model=model, func=func, usage=usage))
+
+    def check(self) -> None:
+        """超出预算时抛出 BudgetExceededError"""
+        if self.budget is None:
+            return
+        with self._lock:
+            reason = self.budget.exceeded(self.total)
+        if reason is not None:
+            raise BudgetExceededError(reason)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.total = Usage()
+            self.by_model.clear()
+            self.by_func.clear()
+            self.records.clear()
+
+    @contextmanager
+    def track(self, func: str) -> Iterator[None]:
+        """在上下文中统计用量，期间 Client.generate 的每次调用都记入该统计器"""
+        token = _usage_scopes.set((*_usage_scopes.get(), (self, func)))
+        try:
+            yield
+        finally:
+            _usage_scopes.reset(token)
+
+
+def current_usage_scopes() -> tuple[tuple[UsageTracker, str], ...]:
+    """返回当前上下文的统计器栈，用于传递给不共享 contextvars 的后台线程（例如流式响应）"""
+    return _usage_scopes.get()
+
+
+def check_budget() -> None:
+    """当前上下文中任意一个统计器超出预算时抛出 BudgetExceededError"""
+    for tracker, _ in _usage_scopes.get():
+        tracker.check()
+
+
+def report_usage(
+    model: str, usage: Any, prices: dict[str, float] | None = None, scopes: tuple[tuple[UsageTracker, str], ...] = ()
+) -> Usage | None:
+    """把一次调用的用量记入当前上下文的所有统计器，同一个统计器只记一次（按最内层的函数名）"""
+    if usage is None:
+        return None
+    parsed = Usage.from_response(usage, prices)
+    innermost: dict[int, tuple[UsageTracker, str]] = {}
+    for tracker, func in scopes or _usage_scopes.get():
+        innermost[id(tracker)] = (tracker, func)
+    for tracker, func in innermost.values():
+        tracker.record(model, func, parsed)
+    return parsed
+
+
+def _get(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _get_int(obj: Any, *names: str) -> int:
+    for name in names:
+        value = _get(obj, name)
+        if isinstance(value, int):
+            return value
+    return 0
@@ -0,0 +1,157 @@
+"""
+vote模块提供自洽性投票（Self-Consistency）功能。
+
+该模块实现了一个装饰器，对同一个提示多次采样，比较归一化后的答案，
+一旦某个答案获得足够多的票数（或其他答案已不可能反超）就停止采样，
+返回获胜的答案和一致性统计，避免总是为全部 `samples` 次完整生成付费。
+"""
+
+from __future__ import annotations
+
+import json  # 用于归一化字典和结构化答案
+import math  # 用于计算获胜所需的票数
+from collections.abc import Callable, Hashable  # 用于类型提示
+from dataclasses import dataclass, field  # 用于定义投票结果
+from functools import wraps  # 用于保留被装饰函数的元数据
+from typing import Any, Generic  # 用于类型提示
+
+from pydantic import BaseModel  # 用于识别结构化答案
+
+from .llm import llm  # 导入LLM装饰器
+from .schema import Messages, P, T  # 导入类型定义
+from .session import Session  # 导入会话管理
+from .utils.batch import run_batch  # 导入批处理工具
+
+
+@dataclass
+class VoteResult(Generic[T]):
+    """投票结果"""
+
+    answer: T  # 获胜的答案（该答案第一次出现时的原始值）
+    votes: int  # 获胜答案的票数
+    samples: int  # 实际成功的采样次数
+    counts: dict[Hashable, int] = field(default_factory=dict)  # 每个归一化答案的票数
+    answers: list[T] = field(default_factory=list)  # 按完成顺序排列的全部答案
+    failures: int = 0  # 失败的采样次数
+    early_stopped: bool = False  # 是否在用完全部采样次数之前停止
+
+    @property
+    def agreement(self) -> float:
+        """获胜答案占成功采样的比例"""
+        return self.votes / self.samples if self.samples else 0.0
+
+
+def vote(
+    model: str = "",
+    *,
+    samples: int = 5,
+    quorum: float = 0.5,
+    parallel: int = 1,
+    key: Callable[[Any], Hashable] | list[str] | None = None,
+    response_format: type[T] | None = None,
+    session: Session | None = None,
+    **api_params: Any,
+) -> Callable[[Callable[P, str | Messages | None]], Callable[P, VoteResult]]:
+    """
+    自洽性投票装饰器。
+
+    Args:
+        model: 模型名称，采样时通常需要设置 `temperature` 等参数保证多样性
+        samples: 最多采样的次数
+        quorum: 获胜所需的票数占 `samples` 的比例，票数需严格超过该比例
+        parallel: 每一轮并行采样的次数，1 表示逐个采样，票数最省
+        key: 比较答案的方式：函数、结构化答案的字段名列表，默认按归一化后的文本或完整的结构比较
+        response_format: 响应格式类型，用于结构化输出
+        session: 可选的会话对象，用于跟踪
+        **api_params: 传递给LLM API的额外参数
+
+    Returns:
+        装饰器函数，被装饰的函数返回 VoteResult
+    """
+    if samples < 1:
+        raise ValueError("samples 必须大于 0")
+    if not 0 <= quorum < 1:
+        raise ValueError("quorum 必须在 0 和 1 之间")
+    if "n" in api_params:
+        raise ValueError("vote 逐个采样，不能同时设置 n")
+    required = min(math.floor(samples * quorum) + 1, samples)  # 获胜所需的票数
+    normalize = _make_key(key)
+
+    def decorator(prompt: Callable[P, str | Messages | None]) -> Callable[P, VoteResult]:
+        sample = llm(model, response_format=response_format, session=session, **api_params)(prompt)
+
+        @wraps(prompt)
+        def model_call(*prompt_args: P.args, **prompt_kwargs: P.kwargs) -> VoteResult:
+            counts: dict[Hashable, int] = {}
+            first: dict[Hashable, Any] = {}  # 每个归一化答案第一次出现时的原始值
+            answers: list[Any] = []
+            errors: list[Exception] = []
+            attempted = 0
+
+            while attempted < samples:
+                wave = min(max(parallel, 1), samples - attempted)
+                attempted += wave
+                for result in run_batch(
+                    lambda _: sample(*prompt_args, **prompt_kwargs),
+                    wave,
+                    parallel=wave > 1,
+                    max_workers=wave,
+                    return_exceptions=True,
+                ):
+                    if isinstance(result, Exception):
+                        errors.append(result)
+                        continue
+                    answer_key = normalize(result)
+                    counts[answer_key] = counts.get(answer_key, 0) + 1
+                    first.setdefault(answer_key, result)
+                    answers.append(result)
+                if _decided(counts, required, samples - attempted):
+                    break
+
+            if not counts:
+                raise errors[-1] if errors else ValueError("模型未返回任何答案")
+            winner = max(counts, key=lambda k: counts[k])  # 票数相同时取先出现的答案
+            return VoteResult(
+                answer=first[winner],
+                votes=counts[winner],
+                samples=len(answers),
+                counts=counts,
+                answers=answers,
+                failures=len(errors),
+                early_stopped=attempted < samples,
+            )
+
+        model_call.__func__ = prompt  # type: ignore
+        return model_call
+
+    return decorator
+
+
+def _decided(counts: dict[Hashable, int], required: int, remaining_samples: int) -> bool:
+    """领先的答案已达到所需票数，或剩余的采样已不可能改变结果"""
+    if not counts:
+        return False
+    ranked = sorted(counts.values(), reverse=True)
+    top = ranked[0]
+    second = ranked[1] if len(ranked) > 1 else 0
+    return top >= required or top - second > remaining_samples
+
+
+def _make_key(key: Callable[[Any], Hashable] | list[str] | None) -> Callable[[Any], Hashable]:
+    if callable(key):
+        return key
+    if key is not None:
+        fields = list(key)
+        return lambda answer: tuple(_normalize(getattr(answer, name, None)) for name in fields)
+    return _normalize
+
+
+def _normalize(answer: Any) -> Hashable:
+    """默认的答案归一化：文本忽略大小写、多余空白和末尾的句号，结构化答案比较完整内容"""
+    if isinstance(answer, str):
+        return " ".join(answer.split()).casefold().rstrip(".。")
+    if isinstance(answer, BaseModel):
+        return answer.model_dump_json()
+    if isinstance(answer, dict | list):
+        return json.dumps(answer, ensure_ascii=False, sort_keys=True, default=str)
+    return answer
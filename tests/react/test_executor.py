@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from uglychain.client import Client
+from uglychain.react.core import react
+from uglychain.react.executor import ToolExecutor, ToolTimeoutError
+from uglychain.utils.deadline import current_deadline, deadline
+
+
+def test_executor_runs_calls_concurrently(mocker):
+    barrier = threading.Barrier(3, timeout=2)
+
+    def call_tool(name, **args):
+        barrier.wait()  # 三个调用必须同时在运行才能通过
+        return f"{name}:{args['url']}"
+
+    mocker.patch("uglychain.tools.Tool.call_tool", side_effect=call_tool)
+    results = ToolExecutor(max_workers=3).run([("fetch", {"url": str(i)}) for i in range(3)])
+    assert results == ["fetch:0", "fetch:1", "fetch:2"]
+
+
+def test_executor_respects_tool_limits(mocker):
+    running = {"fetch": 0, "search": 0}
+    peak = {"fetch": 0, "search": 0}
+    lock = threading.Lock()
+
+    def call_tool(name, **args):
+        with lock:
+            running[name] += 1
+            peak[name] = max(peak[name], running[name])
+        time.sleep(0.02)
+        with lock:
+            running[name] -= 1
+        return name
+
+    mocker.patch("uglychain.tools.Tool.call_tool", side_effect=call_tool)
+    executor = ToolExecutor(max_workers=8, limits={"fetch": 2})
+    executor.run([("fetch", {})] * 6 + [("search", {})] * 2)
+    assert peak["fetch"] == 2
+    assert peak["search"] == 2
+
+
+def test_executor_timeouts_and_errors(mocker):
+    release = threading.Event()
+
+    def call_tool(name, **args):
+        if name == "slow":
+            release.wait(2)
+        if name == "broken":
+            raise RuntimeError("boom")
+        return name
+
+    mocker.patch("uglychain.tools.Tool.call_tool", side_effect=call_tool)
+    executor = ToolExecutor(timeout={"slow": 0.05})
+    start = time.monotonic()
+    results = executor.run([("slow", {}), ("broken", {}), ("fast", {})])
+    release.set()
+    assert time.monotonic() - start < 1
+    assert isinstance(results[0], ToolTimeoutError)
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "fast"
+
+
+def test_executor_propagates_context(mocker):
+    seen = []
+    mocker.patch("uglychain.tools.Tool.call_tool", side_effect=lambda name, **args: seen.append(current_deadline()))
+    with deadline(10):
+        expected = current_deadline()
+        ToolExecutor().run([("a", {}), ("b", {})])
+    assert seen == [expected, expected]
+
+
+def test_executor_validates_limits():
+    with pytest.raises(ValueError):
+        ToolExecutor(max_workers=0)
+    with pytest.raises(ValueError):
+        ToolExecutor(limits={"fetch": 0})
+
+
+def test_react_executes_text_actions_in_one_step(mocker):
+    contents = iter(
+        [
+            "Thought: Fetch both\nAction: fetch\nAction Input: <url>a</url>\nAction: fetch\nAction Input: <url>b</url>",
+            "Thought: Done\nAction: final_answer\nAction Input: <answer>ok</answer>",
+        ]
+    )
+
+    def generate(model, messages, **kwargs):
+        message = type("Message", (object,), {"content": next(contents)})
+        return [type("Choice", (object,), {"message": message})]
+
+    generate_mock = mocker.patch.object(Client, "generate", side_effect=generate)
+    mocker.patch(
+        "uglychain.tools.Tool.call_tool",
+        side_effect=lambda name, **args: "ok" if name == "final_answer" else f"page {args['url']}",
+    )
+
+    @react("openai:gpt-4o", tools=[], parallel_tools=2)
+    def ask(question: str) -> str:
+        return question
+
+    assert ask("Read a and b") == "ok"
+    assert generate_mock.call_count == 2  # 两个抓取在同一步完成，只需要两次模型调用
+    messages = generate_mock.call_args_list[1].args[1]
+    assert messages[-2]["role"] == "assistant"
+    assert messages[-1] == {"role": "user", "content": "Observation: page a\nObservation: page b"}
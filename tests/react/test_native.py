@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from uglychain.react.core import react
+from uglychain.react.get_process import get_react_process
+from uglychain.react.native import NativeReActProcess
+from uglychain.session import Session
+from uglychain.tools import Tool
+
+
+@Tool.tool
+class NativeWeather:
+    @staticmethod
+    def forecast(city: str) -> str:
+        """Get the weather forecast of a city."""
+        return f"sunny in {city}"
+
+
+def tool_call(call_id: str, name: str, **arguments: str) -> SimpleNamespace:
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+def choice(content: str | None = None, tool_calls: list | None = None) -> SimpleNamespace:
+    return SimpleNamespace(message=SimpleNamespace(content=content, tool_calls=tool_calls))
+
+
+def test_native_react_runs_parallel_tool_calls(mocker):
+    responses = iter(
+        [
+            [
+                choice(
+                    content="Let me check both cities.",
+                    tool_calls=[
+                        tool_call("call_a", "NativeWeather__forecast", city="Paris"),
+                        tool_call("call_b", "NativeWeather__forecast", city="Rome"),
+                    ],
+                )
+            ],
+            [choice(tool_calls=[tool_call("call_c", "final_answer", answer="Both sunny")])],
+        ]
+    )
+    generate = mocker.patch("uglychain.client.Client.generate", side_effect=lambda *args, **kwargs: next(responses))
+
+    @react("openai:gpt-4o", tools=[NativeWeather], mode="native")
+    def ask(question: str) -> str:
+        return question
+
+    assert ask("Weather in Paris and Rome?") == "Both sunny"
+
+    tools = generate.call_args_list[0].kwargs["tools"]
+    assert {tool["function"]["name"] for tool in tools} == {"NativeWeather__forecast", "final_answer"}
+    messages = generate.call_args_list[1].args[1]
+    # 同一步的两个调用放在一条 assistant 消息中，之后按顺序给出每个调用的结果
+    assert [m["role"] for m in messages[-3:]] == ["assistant", "tool", "tool"]
+    assert messages[-4]["role"] != "assistant"
+    assert [call["id"] for call in messages[-3]["tool_calls"]] == ["call_a", "call_b"]
+    assert json.loads(messages[-3]["tool_calls"][1]["function"]["arguments"]) == {"city": "Rome"}
+    # 模型调用工具前给出的文本作为这一步的思考，只出现一次
+    assert messages[-3]["content"] == "Let me check both cities."
+    assert messages[-2] == {"role": "tool", "tool_call_id": "call_a", "content": "sunny in Paris"}
+    assert messages[-1] == {"role": "tool", "tool_call_id": "call_b", "content": "sunny in Rome"}
+
+
+def test_native_react_treats_plain_answer_as_final(mocker):
+    mocker.patch("uglychain.client.Client.generate", return_value=[choice(content="Just an answer")])
+
+    @react("openai:gpt-4o", mode="native")
+    def ask(question: str) -> str:
+        return question
+
+    assert ask("hi") == "Just an answer"
+
+
+def test_get_react_process_mode():
+    process = get_react_process("openai:gpt-4o", Session("react"), [], None, {}, mode="native")
+    assert isinstance(process, NativeReActProcess)
+    with pytest.raises(ValueError):
+        get_react_process("openai:gpt-4o", Session("react"), [], None, {}, mode="xml")  # type: ignore[arg-type]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -10,6 +11,8 @@ from uglychain.react.action import Action
 from uglychain.react.core import _short_result, react
 from uglychain.react.default import ReActProcess
 from uglychain.tools import BaseTool, Tool
+from uglychain.utils.deadline import DeadlineExceededError, remaining
+from uglychain.utils.retry import RetryError
 
 
 @pytest.fixture
@@ -482,6 +485,7 @@ def test_react_with_response_format(mock_tool, mock_prompt, mocker, response_mod
 
     # 模拟 Action.from_response 函数
     mocker.patch("uglychain.react.action.Action.from_response", return_value=mock_action)
+    mocker.patch("uglychain.react.action.Action.from_response_all", return_value=[mock_action])
 
     # 模拟 llm 函数返回值
     mocker.patch.object(
@@ -514,3 +518,59 @@ def test_react_with_response_format(mock_tool, mock_prompt, mocker, response_mod
     # 验证结果
     assert isinstance(result, response_model)
     assert result.result == "Formatted result"  # type: ignore
+
+
+def test_react_with_timeout_splits_budget(mock_tool, mock_prompt, mocker):
+    """测试 timeout 参数：每一步只能使用剩余时间的一部分，超时后停止"""
+    budgets: list[float] = []
+
+    def slow_generate(model, messages, **kwargs):
+        budgets.append(remaining())
+        time.sleep(0.06)
+        return [
+            type(
+                "Choice",
+                (object,),
+                {
+                    "message": type(
+                        "Message",
+                        (object,),
+                        {"content": "Thought: aaa\nAction: mock_tool\nAction Input: <param>value</param>"},
+                    )
+                },
+            )
+        ]
+
+    mocker.patch("uglychain.react.core.process_act")
+    mocker.patch.object(Client, "generate", slow_generate)
+    mocker.patch("uglychain.react.default.config.llm_timeout", None)
+
+    decorated_func = react(tools=[mock_tool], max_steps=4, timeout=0.1)(mock_prompt)
+    with pytest.raises((DeadlineExceededError, RetryError)):
+        decorated_func()
+    assert budgets[0] is not None and budgets[0] <= 0.1 / 4 + 0.01
+
+
+def test_react_stops_when_budget_exhausted(mock_tool, mock_prompt, monkeypatch):
+    from uglychain.utils import Budget, BudgetExceededError
+
+    calls = []
+
+    class UsageClient:
+        class chat:  # noqa: N801
+            class completions:  # noqa: N801
+                @staticmethod
+                def create(model, messages, **kwargs):
+                    calls.append(model)
+                    content = "Thought: aaa\nAction: mock_tool\nAction Input: <x>1</x>"
+                    message = type("Message", (object,), {"content": content})
+                    choice = type("Choice", (object,), {"message": message})
+                    return type("Response", (object,), {"choices": [choice], "usage": {"prompt_tokens": 100}})
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", UsageClient)
+    decorated_func = react(tools=[mock_tool], max_steps=10, budget=Budget(max_tokens=250))(mock_prompt)
+    with pytest.raises(BudgetExceededError):
+        decorated_func()
+    assert len(calls) == 3  # 第四步开始前预算已用完，不会跑满 max_steps
+    Client.reset()
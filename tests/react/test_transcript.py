@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+
+from uglychain.client import Client
+from uglychain.react.action import Action
+from uglychain.react.core import react
+from uglychain.react.default import ReActProcess
+from uglychain.session import Session
+
+
+def reply(content: str) -> list:
+    message = type("Message", (object,), {"content": content})
+    return [type("Choice", (object,), {"message": message})]
+
+
+def test_transcript_prefix_is_stable(mocker):
+    contents = iter(
+        [
+            "Thought: first\nAction: echo\nAction Input: <text>1</text>",
+            "Thought: second\nAction: echo\nAction Input: <text>2</text>",
+            "Thought: done\nAction: final_answer\nAction Input: <answer>ok</answer>",
+        ]
+    )
+    generate = mocker.patch.object(Client, "generate", side_effect=lambda *args, **kwargs: reply(next(contents)))
+    mocker.patch(
+        "uglychain.tools.Tool.call_tool",
+        side_effect=lambda name, **args: "ok" if name == "final_answer" else f"echo {args['text']}",
+    )
+    prompt_calls = []
+
+    @react("openai:gpt-4o")
+    def ask(question: str) -> str:
+        prompt_calls.append(question)
+        return question
+
+    assert ask("go") == "ok"
+    assert prompt_calls == ["go"]  # 提示只生成一次
+    requests = [json.dumps(call.args[1]) for call in generate.call_args_list]
+    sizes = [len(call.args[1]) for call in generate.call_args_list]
+    assert sizes == [2, 4, 6]  # 系统消息和用户提示，之后每一步追加两条消息
+    for previous, current in zip(requests, requests[1:], strict=False):
+        assert current.startswith(previous[:-1])  # 之前发送的消息逐字节不变
+    assert generate.call_args_list[2].args[1][-2:] == [
+        {"role": "assistant", "content": "Thought: second\nAction: echo\nAction Input: <text>2</text>"},
+        {"role": "user", "content": "Observation: echo 2"},
+    ]
+
+
+def test_render_step_attaches_images():
+    process = ReActProcess("openai:gpt-4o", Session("react"), [], None, {})
+    act = Action(thought="look", tool="screenshot")
+    act.obs, act.image = "captured", "https://example.com/a.png"
+    transcript = process.transcript()
+    transcript.start("task")
+    transcript.add_step([act])
+    assert transcript.messages[-1]["content"] == [
+        {"type": "text", "text": "Observation: captured"},
+        {"type": "image_url", "image_url": {"url": "https://example.com/a.png"}},
+    ]
+    assert transcript.acts == [act]
+    snapshot = transcript.snapshot()
+    snapshot.insert(0, {"role": "system", "content": "system"})
+    assert len(transcript.messages) == 3
@@ -175,3 +175,33 @@ def test_format_args_multiple_params(session):
     )
     expected_format = "<arg1>value1</arg1><arg2>value2</arg2><arg3>value3</arg3>"
     assert action._format_args() == expected_format
+
+
+def test_from_response_all_parses_multiple_actions(session):
+    response_text = """Thought: Fetch both pages
+Action: fetch
+Action Input: <url>https://a.example</url>
+Action: fetch
+Action Input: <url>https://b.example</url>
+Observation:"""
+    acts = Action.from_response_all(response_text)
+    assert [(a.tool, a.args) for a in acts] == [
+        ("fetch", {"url": "https://a.example"}),
+        ("fetch", {"url": "https://b.example"}),
+    ]
+    assert acts[0].thought.strip() == "Fetch both pages"
+    assert acts[1].thought == ""
+
+
+def test_from_response_all_single_action(session):
+    response_text = "Thought: Test thought\nAction: test_tool\nAction Input: <arg1>value1</arg1>"
+    (action,) = Action.from_response_all(response_text)
+    assert action.tool == "test_tool"
+    assert action.args == {"arg1": "value1"}
+
+
+def test_process_act_runs_step_together(mocker, react_session):
+    mocker.patch("uglychain.tools.Tool.call_tool", side_effect=lambda name, **args: f"{name}:{args['x']}")
+    acts = [Action(tool="a", args={"x": 1}), Action(tool="b", args={"x": 2})]
+    process_act(react_session, acts)
+    assert [a.obs for a in acts] == ["a:1", "b:2"]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from uglychain.cli import main, run
+from uglychain.config import config
+
+
+@pytest.fixture
+def prompt_file(tmp_path):
+    file = tmp_path / "prompt.md"
+    file.write_text("---\nname: echo\nmodel: openai:test\n---\nuser: Answer {question} in {lang}\n")
+    return file
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    file = tmp_path / "data.jsonl"
+    rows = [{"question": f"q{i}", "lang": "en"} for i in range(5)]
+    file.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+    return file
+
+
+def read_output(path):
+    """读取输出文件，跳过崩溃时写了一半的行"""
+    records = []
+    for line in path.read_text().splitlines():
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+def test_run_jsonl(prompt_file, dataset, tmp_path, mock_client):
+    output = tmp_path / "out.jsonl"
+    progress = io.StringIO()
+    code = run(str(prompt_file), str(dataset), str(output), concurrency=2, progress=progress)
+
+    assert code == 0
+    records = read_output(output)
+    assert [record["index"] for record in sorted(records, key=lambda r: r["index"])] == list(range(5))
+    assert all(record["output"] == "Test response" for record in records)
+    assert records[0]["input"] == {"question": "q0", "lang": "en"}
+    assert "5/5 rows (100.0%)" in progress.getvalue()
+    assert "ETA" in progress.getvalue()
+    # 运行结束后恢复全局配置
+    assert config.use_parallel_processing is False
+
+
+def test_run_csv(prompt_file, tmp_path, mock_client):
+    dataset = tmp_path / "data.csv"
+    dataset.write_text("question,lang\nq0,en\nq1,fr\n")
+    output = tmp_path / "out.jsonl"
+    assert run(str(prompt_file), str(dataset), str(output), progress=io.StringIO()) == 0
+    records = sorted(read_output(output), key=lambda record: record["index"])
+    assert [record["input"]["lang"] for record in records] == ["en", "fr"]
+
+
+def test_run_resume_skips_completed_rows(prompt_file, dataset, tmp_path, mocker):
+    output = tmp_path / "out.jsonl"
+    # 模拟崩溃：第 0、1 行成功，第 2 行失败，最后一行只写了一半
+    output.write_text(
+        json.dumps({"index": 0, "input": {}, "output": "a"})
+        + "\n"
+        + json.dumps({"index": 1, "input": {}, "output": "b"})
+        + "\n"
+        + json.dumps({"index": 2, "input": {}, "error": "boom"})
+        + "\n"
+        + '{"index": 3, "inp'
+    )
+    seen: list[str] = []
+
+    def fake_func(question, lang):
+        seen.append(question)
+        return f"answer {question}"
+
+    mocker.patch("uglychain.cli.load", return_value=fake_func)
+    code = run(str(prompt_file), str(dataset), str(output), resume=True, progress=io.StringIO())
+
+    assert code == 0
+    assert sorted(seen) == ["q2", "q3", "q4"]
+    done = {record["index"] for record in read_output(output) if "output" in record}
+    assert done == {0, 1, 2, 3, 4}
+
+
+def test_run_records_failed_rows(prompt_file, dataset, tmp_path, mocker):
+    def fake_func(question, lang):
+        if question == "q1":
+            raise ValueError("bad")
+        return question
+
+    mocker.patch("uglychain.cli.load", return_value=fake_func)
+    output = tmp_path / "out.jsonl"
+    code = run(str(prompt_file), str(dataset), str(output), concurrency=2, progress=io.StringIO())
+
+    assert code == 1
+    records = {record["index"]: record for record in read_output(output)}
+    assert len(records) == 5
+    assert records[1] == {"index": 1, "input": {"question": "q1", "lang": "en"}, "error": "ValueError: bad"}
+
+
+def test_run_refuses_to_overwrite(prompt_file, dataset, tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text("existing\n")
+    assert run(str(prompt_file), str(dataset), str(output), progress=io.StringIO()) == 2
+    assert output.read_text() == "existing\n"
+
+
+def test_run_overrides_config_only_inside_the_run(prompt_file, dataset, tmp_path, mocker):
+    seen: list[int] = []
+
+    def fake_func(question, lang):
+        seen.append(config.max_concurrency)
+        return "ok"
+
+    mocker.patch("uglychain.cli.load", return_value=fake_func)
+    before = config.max_concurrency
+    assert run(str(prompt_file), str(dataset), str(tmp_path / "out.jsonl"), concurrency=3, progress=io.StringIO()) == 0
+    assert seen == [3] * 5
+    assert config.max_concurrency == before
+
+
+def test_run_keeps_a_sliding_window_of_requests(prompt_file, dataset, tmp_path, mocker):
+    release = threading.Event()
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def fake_func(question, lang):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        try:
+            if question == "q0":
+                # 慢的一行不会阻塞后面的行，也不会阻止已完成的行写入输出
+                assert release.wait(timeout=5)
+            return question
+        finally:
+            with lock:
+                in_flight -= 1
+
+    mocker.patch("uglychain.cli.load", return_value=fake_func)
+    output = tmp_path / "out.jsonl"
+    progress = io.StringIO()
+    thread = threading.Thread(
+        target=run, args=(str(prompt_file), str(dataset), str(output)), kwargs={"concurrency": 2, "progress": progress}
+    )
+    thread.start()
+    for _ in range(500):
+        if len(read_output(output) if output.exists() else []) == 4:
+            break
+        time.sleep(0.01)
+    assert sorted(record["index"] for record in read_output(output)) == [1, 2, 3, 4]
+    release.set()
+    thread.join(timeout=5)
+
+    assert [record["index"] for record in read_output(output)][-1] == 0
+    assert peak == 2
+
+
+def test_run_records_malformed_rows(prompt_file, tmp_path, mocker):
+    dataset = tmp_path / "data.jsonl"
+    dataset.write_text('{"question": "q0", "lang": "en"}\n{"question": \n["q2"]\n')
+    mocker.patch("uglychain.cli.load", return_value=lambda question, lang: question)
+    output = tmp_path / "out.jsonl"
+    assert run(str(prompt_file), str(dataset), str(output), progress=io.StringIO()) == 1
+
+    records = {record["index"]: record for record in read_output(output)}
+    assert records[0]["output"] == "q0"
+    assert records[1]["input"] == '{"question":'
+    assert records[1]["error"].startswith("JSONDecodeError")
+    assert records[2] == {"index": 2, "input": ["q2"], "error": "TypeError: Row must be a JSON object, got list"}
+
+
+def test_run_rejects_prompt_without_placeholders(tmp_path, dataset):
+    prompt = tmp_path / "static.md"
+    prompt.write_text("---\nname: static\nmodel: openai:test\n---\nuser: Say hello\n")
+    output = tmp_path / "out.jsonl"
+    progress = io.StringIO()
+    assert run(str(prompt), str(dataset), str(output), progress=progress) == 2
+    assert "no placeholders" in progress.getvalue()
+    assert not output.exists()
+
+
+def test_main_parses_arguments(prompt_file, dataset, tmp_path, mocker):
+    mock_run = mocker.patch("uglychain.cli.run", return_value=0)
+    output = tmp_path / "out.jsonl"
+    code = main(["run", str(prompt_file), "-i", str(dataset), "-o", str(output), "-c", "32", "--resume"])
+
+    assert code == 0
+    mock_run.assert_called_once_with(
+        str(prompt_file),
+        str(dataset),
+        str(output),
+        concurrency=32,
+        model=None,
+        resume=True,
+        overwrite=False,
+    )
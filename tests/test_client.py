@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import gc
 import os
+import threading
+import time
 
 import pytest
 
 from uglychain.client import Client, _router
+from uglychain.utils.deadline import DeadlineExceededError, cancel_on, deadline
+from uglychain.utils.limiter import AdaptiveLimiter, use_limiter
 
 
 @pytest.mark.parametrize("reset", [False, True])
@@ -125,3 +130,147 @@ def test_router_other(mock_client):
     model = "provider:model_name"
     result = _router(model, mock_client)
     assert result == model
+
+
+@pytest.mark.parametrize("model, forwarded", [("openai:gpt-4o", True), ("groq:llama3", True), ("test:model", False)])
+def test_client_generate_passes_deadline_as_timeout(monkeypatch, mock_client, model, forwarded):
+    captured: dict = {}
+
+    class MockClientWithKwargs(mock_client):
+        class chat:  # noqa: N801
+            class completions:  # noqa: N801
+                @staticmethod
+                def create(model, messages, **kwargs):
+                    captured.update(kwargs)
+                    return mock_client.chat.completions.create(model, messages)
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", MockClientWithKwargs)
+
+    with deadline(10):
+        Client.generate(model=model, messages=[{"role": "user", "content": "Hello"}])
+    if forwarded:
+        assert 0 < captured["timeout"] <= 10
+    else:
+        assert "timeout" not in captured
+
+
+def test_client_generate_enforces_deadline_without_timeout_support(monkeypatch, mock_client):
+    release = threading.Event()
+
+    class SlowClient(mock_client):
+        class chat:  # noqa: N801
+            class completions:  # noqa: N801
+                @staticmethod
+                def create(model, messages, **kwargs):
+                    release.wait(2)
+                    return mock_client.chat.completions.create(model, messages)
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", SlowClient)
+    limiter = AdaptiveLimiter(initial=2)
+    start = time.monotonic()
+    with use_limiter(limiter), deadline(0.05), pytest.raises(RuntimeError) as info:
+        Client.generate(model="ollama:llama3", messages=[{"role": "user", "content": "Hello"}])
+    assert isinstance(info.value.__cause__, DeadlineExceededError)
+    assert time.monotonic() - start < 1
+    # 请求仍在后台进行，并发名额直到请求真正结束才归还
+    assert limiter.metrics().in_flight == 1
+    release.set()
+    while limiter.metrics().in_flight:
+        time.sleep(0.01)
+    assert limiter.metrics().timeouts == 1
+
+
+def test_client_generate_returns_when_cancelled(monkeypatch, mock_client):
+    release = threading.Event()
+
+    class SlowClient(mock_client):
+        class chat:  # noqa: N801
+            class completions:  # noqa: N801
+                @staticmethod
+                def create(model, messages, **kwargs):
+                    release.wait(2)
+                    return mock_client.chat.completions.create(model, messages)
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", SlowClient)
+    limiter = AdaptiveLimiter(initial=2)
+    cancelled = threading.Event()
+    threading.Timer(0.05, cancelled.set).start()
+    start = time.monotonic()
+    with use_limiter(limiter), cancel_on(cancelled), pytest.raises(RuntimeError) as info:
+        Client.generate(model="openai:gpt-4o", messages=[{"role": "user", "content": "Hello"}])
+    assert isinstance(info.value.__cause__, DeadlineExceededError)
+    assert time.monotonic() - start < 1
+    # 被取消的请求在后台结束后按请求本身的结果归还名额，不算作超时
+    assert limiter.metrics().in_flight == 1
+    release.set()
+    while limiter.metrics().in_flight:
+        time.sleep(0.01)
+    assert limiter.metrics().timeouts == 0
+    assert limiter.metrics().successes == 1
+
+
+def test_client_generate_after_deadline(mock_client):
+    with deadline(0), pytest.raises(DeadlineExceededError):
+        Client.generate(model="openai:gpt-4o", messages=[{"role": "user", "content": "Hello"}])
+
+
+def test_client_stream_closes_response_on_deadline(monkeypatch, mock_client, mocker):
+    chunk = type("Chunk", (object,), {"choices": ["delta"]})()
+    stream = mocker.MagicMock()
+    stream.__iter__.return_value = iter([chunk, chunk])
+
+    class MockStreamClient(mock_client):
+        class chat:  # noqa: N801
+            class completions:  # noqa: N801
+                @staticmethod
+                def create(model, messages, **kwargs):
+                    return stream
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", MockStreamClient)
+    monkeypatch.setattr("uglychain.client.Iterator", mocker.MagicMock)
+
+    with deadline(0.05):
+        response = Client.generate(model="test:model", messages=[{"role": "user", "content": "Hello"}], stream=True)
+    assert next(response) == "delta"
+    time.sleep(0.1)
+    with pytest.raises(DeadlineExceededError):
+        next(response)
+    stream.close.assert_called_once()
+
+
+def test_client_stream_holds_limiter_slot_until_closed(monkeypatch, mock_client):
+    chunk = type("Chunk", (object,), {"choices": ["delta"]})()
+
+    class MockStreamClient(mock_client):
+        class chat:  # noqa: N801
+            class completions:  # noqa: N801
+                @staticmethod
+                def create(model, messages, **kwargs):
+                    return iter([chunk, chunk])
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", MockStreamClient)
+    limiter = AdaptiveLimiter(initial=3)
+    messages = [{"role": "user", "content": "Hello"}]
+
+    with use_limiter(limiter):
+        exhausted = Client.generate(model="test:model", messages=messages, stream=True)
+        closed = Client.generate(model="test:model", messages=messages, stream=True)
+        dropped = Client.generate(model="test:model", messages=messages, stream=True)
+    # 流式响应在迭代结束前一直占用并发名额
+    assert limiter.metrics().in_flight == 3
+    assert list(exhausted) == ["delta", "delta"]
+    assert limiter.metrics().in_flight == 2
+    assert next(closed) == "delta"
+    closed.close()
+    assert limiter.metrics().in_flight == 1
+    # 没有开始迭代就被丢弃的流也会归还名额
+    del dropped
+    gc.collect()
+    metrics = limiter.metrics()
+    assert metrics.in_flight == 0
+    assert metrics.errors == 0
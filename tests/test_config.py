@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import configparser
+import threading
+import time
 from pathlib import Path
 from unittest.mock import patch
 
@@ -226,3 +228,84 @@ def test_config_with_custom_values(monkeypatch):
     # 其他值应该是默认值
     assert config.default_api_params == {}
     assert config.response_markdown_type == "yaml"
+
+
+def test_config_override_is_scoped(monkeypatch):
+    """测试覆盖配置只在上下文中生效，可以嵌套，并校验类型"""
+    mock_config_path(monkeypatch, [])
+    config = Config()
+
+    with config.override(default_model="scoped_model", max_concurrency="4"):
+        assert config.default_model == "scoped_model"
+        assert config.max_concurrency == 4
+        with config.override(max_concurrency=2):
+            assert config.default_model == "scoped_model"
+            assert config.max_concurrency == 2
+        assert config.max_concurrency == 4
+    assert config.default_model == "openai:gpt-4o-mini"
+    assert config.max_concurrency == 16
+
+    with pytest.raises(ValueError, match="未知的配置项"):
+        with config.override(no_such_option=1):
+            pass
+    with pytest.raises(ValueError):
+        with config.override(max_concurrency="many"):
+            pass
+
+
+def test_config_override_is_isolated_between_threads(monkeypatch):
+    """测试不同线程中的覆盖互不影响，run_batch 的工作线程继承调用方的覆盖"""
+    from uglychain.utils import run_batch
+
+    mock_config_path(monkeypatch, [])
+    config = Config()
+    barrier = threading.Barrier(2, timeout=2)
+    seen: dict[str, list[str]] = {}
+
+    def worker(tenant: str) -> None:
+        with config.override(default_model=tenant):
+            barrier.wait()  # 两个线程都进入覆盖后再读取
+            seen[tenant] = run_batch(lambda _: config.default_model, 2, parallel=True)
+
+    threads = [threading.Thread(target=worker, args=(tenant,)) for tenant in ("tenant_a", "tenant_b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"tenant_a": ["tenant_a", "tenant_a"], "tenant_b": ["tenant_b", "tenant_b"]}
+    assert config.default_model == "openai:gpt-4o-mini"
+
+
+def test_config_reload(tmp_path, monkeypatch):
+    """测试重新加载只更新配置文件中变化的项，删除的项恢复默认值"""
+    config_path = tmp_path / CONFIG_FILENAME
+    config_path.write_text("[DEFAULT]\ndefault_model = first_model\nllm_timeout = 10\n")
+    mock_config_path(monkeypatch, [config_path])
+    config = Config()
+    config.verbose = True  # 代码中设置的项不受重新加载影响
+
+    config_path.write_text("[DEFAULT]\ndefault_model = second_model\n")
+    assert config.reload() == {"default_model", "llm_timeout"}
+    assert config.default_model == "second_model"
+    assert config.llm_timeout == 30
+    assert config.verbose is True
+    assert config.reload() == set()
+
+
+def test_config_watch(tmp_path, monkeypatch):
+    """测试后台监视在配置文件变化后重新加载"""
+    config_path = tmp_path / CONFIG_FILENAME
+    config_path.write_text("[DEFAULT]\ndefault_model = first_model\n")
+    mock_config_path(monkeypatch, [config_path])
+    config = Config()
+
+    config.watch(interval=0.01)
+    try:
+        config_path.write_text("[DEFAULT]\ndefault_model = watched_model_with_longer_name\n")
+        deadline = time.monotonic() + 2
+        while config.default_model != "watched_model_with_longer_name" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        config.stop()
+    assert config.default_model == "watched_model_with_longer_name"
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from uglychain.distributed import RemoteError, SQLiteWorkQueue, Task, Worker, iter_results, map_distributed, submit
+from uglychain.llm import llm
+from uglychain.utils import BatchError
+from uglychain.utils.deadline import DeadlineExceededError
+
+
+@llm(model="test:model", map_keys=["text"])
+def echo(text: list[str], suffix: str) -> str:
+    return f"{text}{suffix}"  # type: ignore
+
+
+def create_mock_choice(content: str):
+    return type("Choice", (object,), {"message": type("Message", (object,), {"content": content})})
+
+
+@pytest.fixture
+def mock_generate(mocker):
+    def generate(model, messages, **kwargs):
+        text = messages[0]["content"][0]["text"]
+        if text.startswith("bad"):
+            raise ValueError("bad input")
+        return [create_mock_choice(text.upper())]
+
+    mocker.patch("uglychain.client.Client.generate", generate)
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return tmp_path / "queue.sqlite3"
+
+
+def start_workers(queue_path, n=2, concurrency=2):
+    workers = [
+        Worker(SQLiteWorkQueue(queue_path), concurrency=concurrency, poll_interval=0.01, worker_id=f"w{i}")
+        for i in range(n)
+    ]
+    threads = [threading.Thread(target=worker.run, daemon=True) for worker in workers]
+    for thread in threads:
+        thread.start()
+    return workers, threads
+
+
+def stop_workers(workers, threads):
+    for worker in workers:
+        worker.stop()
+    for thread in threads:
+        thread.join(1)
+
+
+def test_map_distributed_returns_ordered_results(queue_path, mock_generate):
+    workers, threads = start_workers(queue_path)
+    try:
+        texts = [f"item{i}" for i in range(20)]
+        results = map_distributed(echo, texts, suffix="!", queue=SQLiteWorkQueue(queue_path), poll_interval=0.01)
+    finally:
+        stop_workers(workers, threads)
+    assert results == [f"ITEM{i}!" for i in range(20)]
+
+
+def test_map_distributed_failed_items(queue_path, mock_generate):
+    workers, threads = start_workers(queue_path, n=1)
+    queue = SQLiteWorkQueue(queue_path)
+    try:
+        results = map_distributed(
+            echo, ["a", "bad", "c"], suffix="", queue=queue, poll_interval=0.01, return_exceptions=True
+        )
+        assert results[0] == "A" and results[2] == "C"
+        assert isinstance(results[1], RemoteError)
+        assert "ValueError: bad input" in str(results[1])
+
+        with pytest.raises(BatchError) as exc_info:
+            map_distributed(echo, ["bad", "b"], suffix="", queue=queue, poll_interval=0.01)
+        assert exc_info.value.results == [None, "B"]
+    finally:
+        stop_workers(workers, threads)
+
+
+def test_iter_results_timeout(queue_path):
+    queue = SQLiteWorkQueue(queue_path)
+    job_id, m = submit(echo, ["a"], suffix="", queue=queue)
+    with pytest.raises(DeadlineExceededError):
+        list(iter_results(queue, job_id, m, timeout=0.05, poll_interval=0.01))
+
+
+def test_worker_run_once_and_registry(queue_path, mock_generate):
+    queue = SQLiteWorkQueue(queue_path)
+    job_id, m = submit(echo, ["x", "y"], suffix="?", queue=queue, job_id="job")
+    assert (job_id, m) == ("job", 2)
+
+    worker = Worker(queue)
+    worker.register(echo)
+    worker.run(stop_when_empty=True)
+    assert list(iter_results(queue, "job", 2, poll_interval=0.01)) == ["X?", "Y?"]
+    assert queue.claim("w") is None
+
+
+def test_expired_lease_is_redelivered(queue_path):
+    queue = SQLiteWorkQueue(queue_path, max_attempts=2)
+    submit(echo, ["a"], suffix="", queue=queue, job_id="job")
+    first = queue.claim("crashed", lease=-1)
+    second = queue.claim("other", lease=-1)
+    assert first is not None and second is not None
+    assert (first.index, second.index, second.attempts) == (0, 0, 2)
+    # 重试次数用尽后标记为失败
+    assert queue.claim("third") is None
+    [result] = queue.finished("job")
+    assert not result.ok and "lease expired" in result.value
+
+
+def test_submit_requires_map_keys(queue_path):
+    @llm(model="test:model")
+    def plain(text: str) -> str:
+        return text
+
+    with pytest.raises(ValueError):
+        submit(plain, "a", queue=SQLiteWorkQueue(queue_path))
+
+
+def test_claim_is_fifo_across_jobs(queue_path):
+    queue = SQLiteWorkQueue(queue_path)
+    submit(echo, ["a", "b"], suffix="", queue=queue, job_id="zzz")
+    submit(echo, ["c"], suffix="", queue=queue, job_id="aaa")
+    claimed = [queue.claim("w") for _ in range(3)]
+    assert [(task.job_id, task.index) for task in claimed if task] == [("zzz", 0), ("zzz", 1), ("aaa", 0)]
+
+
+def test_worker_renews_lease_while_item_runs(queue_path):
+    queue = SQLiteWorkQueue(queue_path)
+    submit(echo, ["a"], suffix="", queue=queue, job_id="job")
+    other = SQLiteWorkQueue(queue_path)
+    claims = []
+
+    def slow(text, suffix):
+        # 运行时间是租约的数倍，期间其他 worker 领取不到这个条目
+        for _ in range(5):
+            time.sleep(0.05)
+            claims.append(other.claim("other", lease=0.1))
+        return text
+
+    worker = Worker(queue, lease=0.1)
+    worker.functions[f"{echo.__module__}:{echo.__qualname__}"] = slow
+    assert worker.run_once()
+    assert claims == [None] * 5
+    [result] = queue.finished("job")
+    assert result.ok
+    # 条目结束后不能再续约
+    task = Task(job_id="job", index=0, func="", payload="", worker=worker.worker_id)
+    assert not queue.renew(task)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+import uglychain
+
+HEAVY_MODULES = ("aisuite", "openai", "mcp")
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import uglychain",
+        "from uglychain import llm",
+        "from uglychain import Plan, Tool, react, think, vote",
+    ],
+)
+def test_import_does_not_load_heavy_dependencies(statement):
+    code = f"{statement}\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"
+    modules = json.loads(run_python("-c", code).stdout)
+    assert [name for name in modules if name.split(".")[0] in HEAVY_MODULES] == []
+
+
+def test_bare_import_only_loads_config():
+    # 用导入了哪些模块而不是耗时来衡量导入开销，结果不受机器负载影响
+    code = "import uglychain\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"
+    modules = json.loads(run_python("-c", code).stdout)
+    assert [name for name in modules if name.split(".")[0] == "uglychain"] == ["uglychain", "uglychain.config"]
+
+
+def test_lazy_attributes():
+    from uglychain.llm import llm
+
+    assert uglychain.llm is llm
+    assert {"llm", "react", "Tool", "config"} <= set(dir(uglychain))
+    with pytest.raises(AttributeError):
+        uglychain.missing  # noqa: B018
+
+
+def test_submodule_import_does_not_shadow_lazy_attribute():
+    code = (
+        "import uglychain.llm, uglychain.react\nfrom uglychain import llm, react\nprint(callable(llm), callable(react))"
+    )
+    assert run_python("-c", code).stdout.split() == ["True", "True"]
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from uglychain.library import PromptLibrary
+
+
+def write_prompt(path, name, user="Hello {name}", **info):
+    frontmatter = "".join(f"{key}: {value}\n" for key, value in info.items())
+    path.write_text(f"---\nname: {name}\nmodel: openai:test\n{frontmatter}---\nuser: {user}\n")
+
+
+def touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def prompt_dir(tmp_path):
+    write_prompt(tmp_path / "greet.md", "greet", id="greet-v1", description="Greet someone")
+    (tmp_path / "sub").mkdir()
+    write_prompt(tmp_path / "sub" / "bye.md", "Say Bye", user="Bye {name}")
+    (tmp_path / "broken.md").write_text("no frontmatter here")
+    return tmp_path
+
+
+def test_library_indexes_frontmatter(prompt_dir):
+    library = PromptLibrary(prompt_dir)
+    assert sorted(library) == ["greet", "say_bye"]
+    assert "greet-v1" in library
+    entry = library.entry("greet-v1")
+    assert entry.name == "greet"
+    assert entry.info == {"id": "greet-v1", "description": "Greet someone"}
+    assert entry.func is None
+
+
+def test_library_loads_lazily(prompt_dir, mocker):
+    mock_load = mocker.patch("uglychain.library.load", return_value=lambda *args, **kwargs: "ok")
+    library = PromptLibrary(prompt_dir, temperature=0)
+    mock_load.assert_not_called()
+
+    assert library["greet-v1"]() == "ok"
+    assert library.greet() == "ok"
+    mock_load.assert_called_once_with(str(prompt_dir / "greet.md"), temperature=0)
+
+
+def test_library_missing_prompt(prompt_dir):
+    library = PromptLibrary(prompt_dir)
+    with pytest.raises(KeyError):
+        library["missing"]
+    with pytest.raises(AttributeError):
+        library.missing  # noqa: B018
+    assert library.get("missing") is None
+
+
+def test_library_refresh_detects_changes(prompt_dir, mocker):
+    mocker.patch("uglychain.library.load", side_effect=lambda path, **kwargs: lambda: path)
+    library = PromptLibrary(prompt_dir)
+    greet = library["greet"]
+    assert library["greet"] is greet
+
+    assert library.refresh() == set()
+    write_prompt(prompt_dir / "greet.md", "greet", user="Hi {name}")
+    touch(prompt_dir / "greet.md")
+    (prompt_dir / "sub" / "bye.md").unlink()
+    write_prompt(prompt_dir / "new.md", "new")
+
+    assert library.refresh() == {"greet", "say_bye", "new"}
+    assert library["greet"] is not greet
+    assert "greet-v1" not in library
+    assert sorted(library) == ["greet", "new"]
+
+
+def test_library_watch_hot_reloads(prompt_dir):
+    library = PromptLibrary(prompt_dir)
+    library.watch(interval=0.01)
+    try:
+        write_prompt(prompt_dir / "later.md", "later")
+        for _ in range(100):
+            if "later" in library:
+                break
+            time.sleep(0.01)
+        assert "later" in library
+    finally:
+        library.stop()
+
+
+def test_library_indexes_files_accepted_by_load(tmp_path):
+    # load 用 search 查找前置内容，分隔线之前可以有其他内容
+    (tmp_path / "intro.md").write_text("<!-- comment -->\n---\nname: intro\nmodel: openai:test\n---\nuser: Hi {name}\n")
+    library = PromptLibrary(tmp_path)
+    assert list(library) == ["intro"]
+
+
+def test_library_indexes_without_compiling_the_body(tmp_path, mocker):
+    compile_template = mocker.patch("uglychain.load.compile_template")
+    write_prompt(tmp_path / "greet.md", "greet", user="{% if %}")
+    library = PromptLibrary(tmp_path)
+    assert list(library) == ["greet"]
+    compile_template.assert_not_called()
+
+
+def test_library_refresh_detects_referenced_file_changes(tmp_path, mocker):
+    mocker.patch("uglychain.library.load", side_effect=lambda path, **kwargs: lambda: path)
+    (tmp_path / "system.txt").write_text("Be brief.")
+    (tmp_path / "greet.md").write_text(
+        "---\nname: greet\nmodel: openai:test\nsystem: ${file:system.txt}\n---\nuser: Hello {name}\n"
+    )
+    library = PromptLibrary(tmp_path, pattern="*.md")
+    greet = library["greet"]
+    assert library.refresh() == set()
+
+    (tmp_path / "system.txt").write_text("Be very brief.")
+    touch(tmp_path / "system.txt")
+    assert library.refresh() == {"greet"}
+    assert library["greet"] is not greet
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
+import time
 from typing import Any
 from unittest.mock import ANY, MagicMock
 
@@ -9,12 +13,23 @@ from pydantic import BaseModel
 from uglychain.client import Client
 from uglychain.config import config
 from uglychain.llm import _gen_content, _gen_messages, _get_map_keys, gen_prompt, llm, process_stream_resopnse
+from uglychain.utils import BatchError, SQLiteJobStore, get_limiter
 
 
 class SampleModel(BaseModel):
     content: str
 
 
+@llm("openai:gpt-4o", map_keys=["text"], response_format=SampleModel, map_executor="process")
+def summarize_in_process(text: str, document: str) -> str:
+    return f"{text}|{len(document)}|{os.getpid()}"
+
+
+@llm("openai:gpt-4o", map_keys=["text"], response_format=SampleModel, map_executor="process", need_retry=True)
+def label_in_process(label: str, text: str, suffix: str) -> str:
+    return f"{label}:{text}:{suffix}"
+
+
 def create_mock_choice(content: str) -> type[Any]:
     return type("Choice", (object,), {"message": type("Message", (object,), {"content": content})})
 
@@ -223,6 +238,140 @@ def test_llm_decorator_with_parallel_processing(mocker, arg1):
     assert set(results) == set(arg1)
 
 
+@pytest.mark.parametrize("parallel", [True, False])
+def test_llm_decorator_map_keys_retry_per_item(mocker, parallel):
+    calls: list[str] = []
+
+    def flaky_generate(model, messages, **kwargs):
+        text = messages[0]["content"][0]["text"]
+        calls.append(text)
+        if text == "b" and calls.count("b") == 1:
+            raise RuntimeError("flaky")
+        return [create_mock_choice(text)]
+
+    @llm(model="test:model", map_keys=["arg1"], need_retry=True)
+    def sample_prompt(arg1: list[str]) -> str:
+        return arg1  # type: ignore
+
+    mocker.patch("uglychain.client.Client.generate", flaky_generate)
+    mocker.patch.object(config, "use_parallel_processing", parallel)
+    mocker.patch.object(config, "llm_wait_time", 0)
+
+    assert sample_prompt(["a", "b", "c"]) == ["a", "b", "c"]
+    assert sorted(calls) == ["a", "b", "b", "c"]
+
+
+def test_llm_decorator_map_keys_partial_results(mocker):
+    def failing_generate(model, messages, **kwargs):
+        text = messages[0]["content"][0]["text"]
+        if text == "b":
+            raise RuntimeError("boom")
+        return [create_mock_choice(text)]
+
+    @llm(model="test:model", map_keys=["arg1"])
+    def sample_prompt(arg1: list[str]) -> str:
+        return arg1  # type: ignore
+
+    mocker.patch("uglychain.client.Client.generate", failing_generate)
+
+    with pytest.raises(BatchError) as exc_info:
+        sample_prompt(["a", "b", "c"])
+    assert exc_info.value.results == [["a"], None, ["c"]]
+    assert list(exc_info.value.errors) == [1]
+
+
+def test_llm_decorator_map_keys_return_exceptions(mocker):
+    def failing_generate(model, messages, **kwargs):
+        text = messages[0]["content"][0]["text"]
+        if text == "b":
+            raise RuntimeError("boom")
+        return [create_mock_choice(text)]
+
+    @llm(model="test:model", map_keys=["arg1"], return_exceptions=True)
+    def sample_prompt(arg1: list[str]) -> str:
+        return arg1  # type: ignore
+
+    mocker.patch("uglychain.client.Client.generate", failing_generate)
+
+    results = sample_prompt(["a", "b", "c"])
+    assert results[0] == "a" and results[2] == "c"
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_llm_decorator_map_keys_job_id_resumes(mocker, tmp_path):
+    store = SQLiteJobStore(tmp_path / "jobs.sqlite3")
+    calls: list[str] = []
+    fail = {"b"}
+
+    def flaky_generate(model, messages, **kwargs):
+        text = messages[0]["content"][0]["text"]
+        calls.append(text)
+        if text in fail:
+            raise RuntimeError("crash")
+        return [create_mock_choice(text)]
+
+    @llm(model="test:model", map_keys=["arg1"], job_id="job-1", job_store=store)
+    def sample_prompt(arg1: list[str]) -> str:
+        return arg1  # type: ignore
+
+    mocker.patch("uglychain.client.Client.generate", flaky_generate)
+
+    with pytest.raises(BatchError):
+        sample_prompt(["a", "b", "c"])
+    assert {i: record["output"] for i, record in store.load("job-1").items()} == {0: ["a"], 2: ["c"]}
+
+    # 重新运行同一个任务时只处理未完成的条目
+    fail.clear()
+    calls.clear()
+    assert sample_prompt(["a", "b", "c"]) == ["a", "b", "c"]
+    assert calls == ["b"]
+
+
+def test_llm_decorator_job_id_reruns_items_with_changed_inputs(mocker, tmp_path):
+    store = SQLiteJobStore(tmp_path / "jobs.sqlite3")
+    calls: list[str] = []
+
+    def fake_generate(model, messages, **kwargs):
+        text = messages[0]["content"][0]["text"]
+        calls.append(text)
+        return [create_mock_choice(text)]
+
+    @llm(model="test:model", map_keys=["arg1"], job_id="job-1", job_store=store)
+    def sample_prompt(arg1: list[str]) -> str:
+        return arg1  # type: ignore
+
+    mocker.patch("uglychain.client.Client.generate", fake_generate)
+
+    assert sample_prompt(["a", "b"]) == ["a", "b"]
+    # 同一个任务ID下输入变化的条目重新运行，不返回上一次调用的结果
+    calls.clear()
+    assert sample_prompt(["a", "x"]) == ["a", "x"]
+    assert calls == ["x"]
+
+
+def test_llm_decorator_job_store_opens_on_first_call(mocker, tmp_path):
+    get_job_store = mocker.patch("uglychain.llm.get_job_store", return_value=SQLiteJobStore(tmp_path / "jobs.sqlite3"))
+
+    @llm(model="test:model", map_keys=["arg1"], job_id="job-1")
+    def sample_prompt(arg1: list[str]) -> str:
+        return arg1  # type: ignore
+
+    mocker.patch("uglychain.client.Client.generate", return_value=[create_mock_choice("ok")])
+    get_job_store.assert_not_called()
+    sample_prompt(["a", "b"])
+    sample_prompt(["a", "b"])
+    get_job_store.assert_called_once()
+
+
+def test_llm_decorator_job_id_with_stream_conflict():
+    @llm(model="test:model", job_id="job-1", job_store=MagicMock(), stream=True)
+    def sample_prompt() -> str:
+        return "Hello"
+
+    with pytest.raises(ValueError, match="job_id 不能与 stream 同时使用"):
+        sample_prompt()
+
+
 def test_llm_decorator_with_tools(mocker):
     def mock_tool():
         pass
@@ -438,3 +587,308 @@ def test_gen_messages_with_image(image, expected):
     # Test with single image URL
     result = _gen_messages("User message", sample_prompt, image)
     assert result == expected
+
+
+def _usage_client(monkeypatch, content: str, prompt_tokens: int = 60, completion_tokens: int = 40):
+    calls: list[str] = []
+
+    class UsageClient:
+        class chat:  # noqa: N801
+            class completions:  # noqa: N801
+                @staticmethod
+                def create(model, messages, **kwargs):
+                    calls.append(model)
+                    return type(
+                        "Response",
+                        (object,),
+                        {
+                            "choices": [create_mock_choice(content)],
+                            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+                        },
+                    )
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", UsageClient)
+    return calls
+
+
+def test_llm_records_usage_in_session(monkeypatch, session):
+    _usage_client(monkeypatch, "Test response")
+
+    @llm("openai:gpt-4o", session=session)
+    def summarize(text: str) -> str:
+        return text
+
+    summarize("a")
+    summarize("b")
+    assert session.usage.total.total_tokens == 200
+    assert session.usage.total.calls == 2
+    assert session.usage.by_func["summarize"].prompt_tokens == 120
+    assert session.usage.by_model["openai:gpt-4o"].completion_tokens == 80
+    Client.reset()
+
+
+def test_llm_budget_stops_further_calls(monkeypatch, session):
+    from uglychain.utils import Budget, BudgetExceededError
+
+    calls = _usage_client(monkeypatch, "Test response")
+
+    @llm("openai:gpt-4o", session=session, budget=Budget(max_tokens=150), need_retry=True)
+    def summarize(text: str) -> str:
+        return text
+
+    summarize("a")
+    summarize("b")  # 调用前只用了 100 个 token，仍然允许
+    with pytest.raises(BudgetExceededError):
+        summarize("c")
+    assert len(calls) == 2  # 超出预算后不再请求，也不重试
+    Client.reset()
+
+
+def test_llm_cascade_escalates_on_validation_failure(mocker, session):
+    contents = {"openai:gpt-4o-mini": "not json", "openai:gpt-4o": '{"content": "big"}'}
+    calls: list[str] = []
+
+    def generate(model, messages, **kwargs):
+        calls.append(model)
+        return [create_mock_choice(contents[model])]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+
+    @llm(cascade=["openai:gpt-4o-mini", "openai:gpt-4o"], response_format=SampleModel, session=session)
+    def extract(text: str) -> str:
+        return text
+
+    assert extract("hello") == SampleModel(content="big")
+    assert calls == ["openai:gpt-4o-mini", "openai:gpt-4o"]
+    assert session.cascade.accepted == {"openai:gpt-4o": 1}
+    assert session.cascade.escalation_rate == 1.0
+
+
+def test_llm_cascade_accepts_cheap_model_and_uses_confidence_check(mocker, session):
+    answers = iter(['{"content": "ok"}', '{"content": "?"}', '{"content": "sure"}'])
+    calls: list[str] = []
+
+    def generate(model, messages, **kwargs):
+        calls.append(model)
+        return [create_mock_choice(next(answers))]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+
+    @llm(
+        cascade=["openai:gpt-4o-mini", "openai:gpt-4o"],
+        response_format=SampleModel,
+        accept=lambda result: result.content != "?",
+        session=session,
+    )
+    def extract(text: str) -> str:
+        return text
+
+    assert extract("a").content == "ok"
+    assert extract("b").content == "sure"
+    assert calls == ["openai:gpt-4o-mini", "openai:gpt-4o-mini", "openai:gpt-4o"]
+    stats = session.cascade
+    assert stats.calls == 2
+    assert stats.escalations == 1
+    assert stats.escalation_rate == 0.5
+    assert stats.accepted == {"openai:gpt-4o-mini": 1, "openai:gpt-4o": 1}
+
+
+def test_llm_cascade_raises_when_all_models_fail(mocker, session):
+    mocker.patch("uglychain.client.Client.generate", return_value=[create_mock_choice("not json")])
+
+    @llm(cascade=["openai:gpt-4o-mini", "openai:gpt-4o"], response_format=SampleModel, session=session)
+    def extract(text: str) -> str:
+        return text
+
+    with pytest.raises(ValueError):
+        extract("a")
+    assert session.cascade.calls == 1
+    assert session.cascade.accepted == {}
+    with pytest.raises(ValueError):
+        llm(cascade=[])
+
+
+def test_llm_models_fan_out_all(mocker):
+    barrier = threading.Barrier(2, timeout=2)  # 两个模型必须同时在运行，才能通过屏障
+
+    def generate(model, messages, **kwargs):
+        barrier.wait()
+        if model == "openai:broken":
+            raise RuntimeError("boom")
+        return [create_mock_choice(f"from {model}")]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+
+    @llm(models=["openai:gpt-4o", "openai:broken"], return_exceptions=True)
+    def ask(question: str) -> str:
+        return question
+
+    results = ask("hi")
+    assert results["openai:gpt-4o"] == "from openai:gpt-4o"
+    assert isinstance(results["openai:broken"], RuntimeError)
+
+    barrier.reset()
+
+    @llm(models=["openai:gpt-4o", "openai:broken"])
+    def ask_strict(question: str) -> str:
+        return question
+
+    with pytest.raises(BatchError):
+        ask_strict("hi")
+
+
+def test_llm_models_fan_out_first(mocker):
+    release = threading.Event()
+
+    def generate(model, messages, **kwargs):
+        if model == "openai:slow":
+            release.wait(2)
+        return [create_mock_choice(f"from {model}")]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+
+    @llm(models=["openai:slow", "openai:fast"], fan_out="first")
+    def ask(question: str) -> str:
+        return question
+
+    start = time.monotonic()
+    assert ask("hi") == {"openai:fast": "from openai:fast"}
+    assert time.monotonic() - start < 1
+    release.set()
+
+
+def test_llm_models_per_model_timeout(mocker):
+    from uglychain.utils.deadline import remaining
+
+    seen: dict[str, float | None] = {}
+
+    def generate(model, messages, **kwargs):
+        seen[model] = remaining()
+        return [create_mock_choice("ok")]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+
+    @llm(models=["openai:a", "openai:b"], model_timeout={"openai:a": 5})
+    def ask(question: str) -> str:
+        return question
+
+    assert ask("hi") == {"openai:a": "ok", "openai:b": "ok"}
+    assert seen["openai:a"] is not None and 0 < seen["openai:a"] <= 5
+    assert seen["openai:b"] is None
+    with pytest.raises(ValueError):
+        llm(models=["openai:a"], cascade=["openai:b"])
+
+
+def test_llm_concurrent_calls_keep_their_own_session_state(mocker, session):
+    barrier = threading.Barrier(2, timeout=2)
+    seen: dict[str, tuple[str, str]] = {}
+
+    def generate(model, messages, **kwargs):
+        barrier.wait()  # 两个调用同时处于请求中
+        seen[model] = (session.model, session.func)
+        return [create_mock_choice("ok")]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+
+    @llm(session=session)
+    def ask(question: str) -> str:
+        return question
+
+    threads = [
+        threading.Thread(target=ask, args=(name,), kwargs={"api_params": {"model": f"openai:{name}"}})
+        for name in ("a", "b")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {"openai:a": ("openai:a", "ask(question='a')"), "openai:b": ("openai:b", "ask(question='b')")}
+    assert "model" not in session.info
+
+
+def test_llm_map_executor_process(mocker):
+    def generate(model, messages, **kwargs):
+        prompt = messages[-1]["content"][0]["text"]
+        return [create_mock_choice(json.dumps({"content": prompt}))]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+    config.use_parallel_processing = True
+    try:
+        results = summarize_in_process(text=["a", "b", "c"], document="x" * 100_000)
+    finally:
+        config.use_parallel_processing = False
+
+    assert [r.content.split("|")[:2] for r in results] == [["a", "100000"], ["b", "100000"], ["c", "100000"]]
+    assert all(r.content.split("|")[2] != str(os.getpid()) for r in results)  # 提示在工作进程中生成
+
+
+def test_llm_map_executor_process_keeps_positions_and_retries_parse_errors(mocker):
+    calls: list[str] = []
+
+    def generate(model, messages, **kwargs):
+        prompt = messages[-1]["content"][0]["text"]
+        calls.append(prompt)
+        if prompt == "x:b:!" and calls.count(prompt) == 1:
+            return [create_mock_choice("not json")]  # 第一次返回无法解析的内容
+        return [create_mock_choice(json.dumps({"content": prompt}))]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+    with config.override(use_parallel_processing=True, llm_wait_time=0):
+        # 映射参数位于两个共享的位置参数之间
+        results = label_in_process("x", ["a", "b"], "!")
+
+    assert [r.content for r in results] == ["x:a:!", "x:b:!"]
+    assert sorted(calls) == ["x:a:!", "x:b:!", "x:b:!"]
+
+
+def test_llm_map_executor_process_requires_module_level_prompt(setup_client):
+    @llm("openai:gpt-4o", map_keys=["text"], map_executor="process")
+    def local_prompt(text: str) -> str:
+        return text
+
+    with pytest.raises(ValueError, match="模块级函数"):
+        local_prompt(text=["a", "b"])
+    assert local_prompt(text=["a"]) == ["Test response"]  # 只有一个条目时不使用进程池
+    with pytest.raises(ValueError):
+        llm(map_executor="fiber")  # type: ignore[arg-type]
+
+
+def test_llm_concurrency_overrides_do_not_leak_between_callers(mocker):
+    limiter = get_limiter("test:shared-cap-model", initial=8)
+    lock = threading.Lock()
+    in_flight = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    def slow_generate(model, messages, **kwargs):
+        text = messages[0]["content"][0]["text"]
+        with lock:
+            in_flight[text[0]] += 1
+            peak[text[0]] = max(peak[text[0]], in_flight[text[0]])
+        time.sleep(0.02)
+        with lock:
+            in_flight[text[0]] -= 1
+        return [create_mock_choice(text)]
+
+    @llm(model="test:shared-cap-model", map_keys=["arg1"])
+    def sample_prompt(arg1: list[str]) -> str:
+        return arg1  # type: ignore
+
+    mocker.patch("uglychain.client.Client.generate", slow_generate)
+    results: dict[str, list[str]] = {}
+
+    def run(tenant: str, cap: int) -> None:
+        with config.override(use_parallel_processing=True, adaptive_concurrency=True, max_concurrency=cap):
+            results[tenant] = sample_prompt([f"{tenant}{i}" for i in range(12)])
+
+    threads = [threading.Thread(target=run, args=("a", 2)), threading.Thread(target=run, args=("b", 6))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {tenant: [f"{tenant}{i}" for i in range(12)] for tenant in "ab"}
+    # 每个调用方只受自己上下文的并发上限限制，共享的限流器不被修改
+    assert peak["a"] <= 2
+    assert 2 < peak["b"] <= 6
+    assert limiter.max_limit == 64
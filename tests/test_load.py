@@ -1,12 +1,10 @@
 from __future__ import annotations
 
-from collections import namedtuple
+import os
 
 import pytest
 
-from uglychain.load import _parse_prompt_template, _replace_placeholder, load
-
-Match = namedtuple("Match", ["group"])
+from uglychain.load import CompiledTemplate, _parse_prompt_template, clear_template_cache, compile_template, load
 
 
 @pytest.fixture
@@ -72,21 +70,54 @@ def test_parse_invalid_prompt_template(invalid_content):
         _parse_prompt_template(invalid_content)
 
 
-def test_replace_placeholder():
-    match = Match(group=lambda x: "name")
-    kwargs = {"name": "John"}
-    result = _replace_placeholder(match, kwargs)  # type: ignore
-    assert result == "John"
+def test_render_placeholder():
+    template = CompiledTemplate(configs={}, system_prompt="", literals=("Hello ", "!"), placeholders=("name",))
+    assert template.render({"name": "John"}) == "Hello John!"
 
 
-def test_replace_placeholder_default():
-    match = Match(group=lambda x: "{name}")
-    kwargs = {}
-    result = _replace_placeholder(match, kwargs)  # type: ignore
-    assert result == "{name}"
+def test_render_placeholder_default():
+    template = CompiledTemplate(configs={}, system_prompt="", literals=("Hello ", "!"), placeholders=("name",))
+    assert template.render({}) == "Hello {name}!"
 
 
 def test_load_with_model(prompt_file, mocker):
     mock_llm = mocker.patch("uglychain.load.llm")
     load(str(prompt_file))
     mock_llm.assert_called_once()
+
+
+def test_compile_template_is_cached(prompt_file, mocker):
+    clear_template_cache()
+    first = compile_template(prompt_file)
+    read_text = mocker.spy(type(prompt_file), "read_text")
+    second = compile_template(prompt_file)
+    assert second is first
+    read_text.assert_not_called()
+
+
+def test_compile_template_invalidated_on_change(prompt_file):
+    clear_template_cache()
+    first = compile_template(prompt_file)
+    prompt_file.write_text("---\nmodel: openai:test\n---\nuser: Bye {name}\n")
+    stat = prompt_file.stat()
+    os.utime(prompt_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = compile_template(prompt_file)
+    assert second is not first
+    assert second.placeholders == ("name",)
+    assert second.render({"name": "John"}) == "Bye John"
+
+
+def test_compiled_template_render(prompt_file):
+    template = compile_template(prompt_file)
+    assert template.literals == ("Hello ", ", how can I help you ", "?")
+    assert template.placeholders == ("name", "today")
+    assert template.render({"name": "John"}) == "Hello John, how can I help you {today}?"
+
+
+def test_load_does_not_mutate_cached_configs(prompt_file, mocker):
+    clear_template_cache()
+    mocker.patch("uglychain.load.llm")
+    load(str(prompt_file), temperature=0.5)
+    load(str(prompt_file))
+    assert "temperature" not in compile_template(prompt_file).configs
+    assert compile_template(prompt_file).configs["name"] == "test_prompt"
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import threading
+
 import pytest
 
-from uglychain.session import Session, _format_arg_str
+from uglychain.session import CascadeStats, Session, _format_arg_str
 
 
 @pytest.mark.parametrize(
@@ -55,3 +57,52 @@ def test_format_func_call_with_more_than_5_args():
         return a
 
     assert Session.format_func_call(sample_func, 1, 2, 3, 4, 5, 6) == "sample_func(a=1, b=2, c=3, d=4, e=5, ...)"
+
+
+def test_cascade_stats():
+    stats = CascadeStats()
+    stats.record("small", 0, cost=0.1, baseline_cost=1.0)
+    stats.record("big", 1, cost=1.2, baseline_cost=1.0)
+    stats.record(None, 1, cost=0.5, baseline_cost=0.0)
+    assert stats.calls == 3
+    assert stats.escalations == 2
+    assert stats.escalation_rate == pytest.approx(2 / 3)
+    assert stats.accepted == {"small": 1, "big": 1}
+    assert stats.savings == pytest.approx(2.0 - 1.8)
+
+
+def test_call_context_is_local_to_each_call():
+    session = Session()
+    session.model = "openai:default"
+    seen: dict[str, tuple[str, str]] = {}
+    barrier = threading.Barrier(2, timeout=2)
+
+    def worker(name: str) -> None:
+        with session.call(func=f"{name}()"):
+            session.model = f"openai:{name}"
+            barrier.wait()  # 两个调用同时进行
+            seen[name] = (session.func, session.model)
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {"a": ("a()", "openai:a"), "b": ("b()", "openai:b")}
+    assert session.model == "openai:default"
+    assert session.func == ""
+    assert session.current_call() is None
+
+
+def test_show_base_info_once_per_call(mocker):
+    session = Session()
+    send = mocker.patch.object(session, "send")
+    for _ in range(2):
+        with session.call(func="f()", model="openai:gpt-4o"):
+            session.show_base_info()
+            with session.call(func="inner()") as inner:  # 嵌套调用沿用外层的调用上下文
+                assert inner.func == "f()"
+                session.show_base_info()
+    assert send.call_count == 2
+    send.assert_called_with("base_info", "f()", model="openai:gpt-4o")
+    assert all(console.show_base_info for console in session.consoles)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import json
+from types import SimpleNamespace
+
 import pytest
 from pydantic import BaseModel
 
 from uglychain import config
+from uglychain.schema import ToolCalls, ToolResponse
 from uglychain.structured import Mode, ResponseModel
 
 
@@ -155,3 +159,25 @@ def test_response_formatter_tool_schema():
     assert "parameters" in tool_schema
     assert "properties" in tool_schema["parameters"]
     assert "foo" in tool_schema["parameters"]["properties"]
+
+
+def test_response_formatter_parallel_tool_calls_are_opt_in():
+    calls = [
+        SimpleNamespace(
+            id=f"call_{city}", function=SimpleNamespace(name="forecast", arguments=json.dumps({"city": city}))
+        )
+        for city in ("Paris", "Rome")
+    ]
+    choice = SimpleNamespace(message=SimpleNamespace(content=" Checking both. ", tool_calls=calls))
+
+    # 默认只返回第一个工具调用，`llm(tools=...)` 的调用方不会突然收到列表
+    parsed = ResponseModel(create_mock_func, str).parse_from_response(choice)
+    assert parsed == ToolResponse(name="forecast", parameters={"city": "Paris"}, id="call_Paris")
+
+    all_calls = ResponseModel(create_mock_func, ToolCalls)
+    params: dict = {}
+    all_calls.process_parameters("openai:gpt-4o", [{"role": "user", "content": "hi"}], params)
+    assert params == {}
+    result = all_calls.parse_from_response(choice)
+    assert result.content == "Checking both."
+    assert [call.id for call in result.calls] == ["call_Paris", "call_Rome"]
@@ -151,3 +151,210 @@ def test_think_default_models():
 
     # Restore original default model
     config.default_model = original_default_model
+
+
+def test_think_builds_llm_decorators_once(mock_llm):
+    """The llm decorators are built when decorating, not on every call."""
+
+    @think(model="test-model", thinking_model="test-thinking-model")
+    def test_function(query: str) -> str:
+        return f"Think about: {query}"
+
+    calls_after_decoration = mock_llm.call_count
+    test_function("a")
+    test_function("b")
+    assert mock_llm.call_count == calls_after_decoration == 2
+
+
+def test_think_stops_thinking_stream_after_end_tag():
+    """The reasoning stream is closed as soon as </thinking> is seen."""
+    consumed: list[str] = []
+    closed: list[bool] = []
+
+    def reasoning_stream():
+        try:
+            for chunk in ["<thinking>\n", "step one", "\n</think", "ing>\n", "answer", "more answer"]:
+                consumed.append(chunk)
+                yield chunk
+        finally:
+            closed.append(True)
+
+    def specific_mock(*args, **kwargs):
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if "reasoning" in kwargs:
+                    return f"Final response using reasoning: {kwargs['reasoning']}"
+                return reasoning_stream()
+
+            return wrapper
+
+        return decorator
+
+    with patch("uglychain.think.llm", side_effect=specific_mock):
+
+        @think(model="test-model", thinking_model="test-thinking-model")
+        def test_function(query: str) -> str:
+            return f"Think about: {query}"
+
+        result = test_function("test query")
+
+    assert result == "Final response using reasoning: step one"
+    assert "answer" not in consumed
+    assert closed == [True]
+
+
+def test_think_reasoning_cache():
+    """Repeated inputs reuse the cached reasoning instead of calling the reasoner."""
+    from uglychain.think import reasoning_cache
+
+    reasoning_cache.clear()
+    reasoner_calls: list[str] = []
+
+    def specific_mock(*args, **kwargs):
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if "reasoning" in kwargs:
+                    return f"Final response using reasoning: {kwargs['reasoning']}"
+                reasoner_calls.append(args[0])
+                return iter(["<thinking>\n", f"reasoning {len(reasoner_calls)}", "\n</thinking>\n"])
+
+            return wrapper
+
+        return decorator
+
+    with patch("uglychain.think.llm", side_effect=specific_mock):
+
+        @think(model="test-model", thinking_model="test-thinking-model", cache=True)
+        def test_function(query: str) -> str:
+            return f"Think about: {query}"
+
+        first = test_function("same")
+        second = test_function("same")
+        third = test_function("other")
+
+    assert first == second == "Final response using reasoning: reasoning 1"
+    assert third == "Final response using reasoning: reasoning 2"
+    assert reasoner_calls == ["Think about: same", "Think about: other"]  # 思考模型收到已生成的提示
+    assert len(reasoning_cache) == 2
+    reasoning_cache.clear()
+
+
+def test_think_reasoning_cache_key_uses_rendered_prompt_and_params():
+    """The prompt function runs once per stage, and sampling settings are part of the cache key."""
+    from uglychain.think import reasoning_cache
+
+    reasoning_cache.clear()
+    prompt_calls: list[str] = []
+    reasoner_calls: list[str] = []
+
+    def specific_mock(*args, **kwargs):
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                prompt = func(*args, **kwargs)
+                if "reasoning" in kwargs:
+                    return kwargs["reasoning"]
+                reasoner_calls.append(prompt)
+                return iter(["<thinking>\n", f"reasoning {len(reasoner_calls)}", "\n</thinking>\n"])
+
+            return wrapper
+
+        return decorator
+
+    with patch("uglychain.think.llm", side_effect=specific_mock):
+
+        def question(query: str) -> str:
+            prompt_calls.append(query)
+            return f"Think about: {query}"
+
+        cold = think(model="test-model", cache=True, temperature=0.0)(question)
+        warm = think(model="test-model", cache=True, temperature=1.0)(question)
+        assert cold("same") == "reasoning 1"
+        assert prompt_calls == ["same", "same"]  # 思考阶段和响应阶段各一次
+        assert cold("same") == "reasoning 1"
+        assert warm("same") == "reasoning 2"
+    assert len(reasoner_calls) == 2
+    reasoning_cache.clear()
+
+
+def test_think_with_map_keys(mock_llm):
+    """Each mapped item gets its own reasoning and response, in input order."""
+
+    @think(model="test-model", thinking_model="test-thinking-model", map_keys=["query"])
+    def test_function(query: str, suffix: str) -> str:
+        return f"Think about: {query}{suffix}"
+
+    results = test_function(["a", "b", "c"], suffix="!")
+
+    assert len(results) == 3
+    for query, result in zip(["a", "b", "c"], results, strict=True):
+        assert f"Mock reasoning about: Think about: {query}!" in result
+
+
+def test_think_with_map_keys_return_exceptions():
+    """A failing item does not discard the results of the others."""
+
+    def specific_mock(*args, **kwargs):
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if "reasoning" in kwargs:
+                    return f"Final response using reasoning: {kwargs['reasoning']}"
+                if args[0] == "Think about: bad":
+                    raise RuntimeError("reasoner failed")
+                return iter(["<thinking>\n", f"about {args[0].removeprefix('Think about: ')}", "\n</thinking>\n"])
+
+            return wrapper
+
+        return decorator
+
+    with patch("uglychain.think.llm", side_effect=specific_mock):
+
+        @think(model="test-model", map_keys=["query"], return_exceptions=True)
+        def test_function(query: str) -> str:
+            return f"Think about: {query}"
+
+        results = test_function(["ok", "bad"])
+
+    assert results[0] == "Final response using reasoning: about ok"
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_think_map_keys_uses_llm_item_path():
+    """Mapped items run concurrently by default, at batch priority, with per-item retry."""
+    import threading
+
+    from uglychain.utils.scheduler import current_request_context
+
+    barrier = threading.Barrier(2, timeout=2)
+    priorities: list[str] = []
+    attempts: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def specific_mock(*args, **kwargs):
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if "reasoning" in kwargs:
+                    return f"answer {kwargs['reasoning']}"
+                with lock:
+                    attempts[args[0]] = attempts.get(args[0], 0) + 1
+                    first = attempts[args[0]] == 1
+                    priorities.append(current_request_context().priority)
+                if first:
+                    barrier.wait()  # 两个条目必须同时在推理
+                    if args[0] == "Think about: b":
+                        raise TimeoutError("reasoner timed out")
+                return iter(["<thinking>\n", args[0], "\n</thinking>\n"])
+
+            return wrapper
+
+        return decorator
+
+    with patch("uglychain.think.llm", side_effect=specific_mock), config.override(llm_wait_time=0):
+
+        @think(model="test-model", map_keys=["query"], need_retry=True)
+        def test_function(query: str) -> str:
+            return f"Think about: {query}"
+
+        assert test_function(["a", "b"]) == ["answer Think about: a", "answer Think about: b"]
+
+    assert attempts == {"Think about: a": 1, "Think about: b": 2}
+    assert set(priorities) == {"batch"}
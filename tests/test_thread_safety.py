@@ -0,0 +1,133 @@
+"""在多线程下反复调用核心组件；在自由线程（no-GIL）构建中这些竞争会真正并行发生"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pydantic import BaseModel
+
+from uglychain.client import Client, _router
+from uglychain.config import config
+from uglychain.llm import llm
+from uglychain.session import Logger, Session
+from uglychain.structured import ResponseModel
+from uglychain.tools.core.tool_manager import ToolsManager
+from uglychain.utils import MessageBus, Stream
+
+THREADS = 16
+
+
+def _hammer(func, n: int = THREADS * 8) -> list:
+    barrier = threading.Barrier(THREADS)
+
+    def run(i: int):
+        if i < THREADS:
+            barrier.wait()  # 让前一批调用同时开始，尽量放大竞争
+        return func(i)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(run, range(n)))
+
+
+def test_client_singleton_is_created_once(monkeypatch):
+    created = []
+
+    class SlowClient:
+        def __init__(self):
+            time.sleep(0.01)
+            created.append(self)
+
+    Client.reset()
+    monkeypatch.setattr("aisuite.Client", SlowClient)
+    clients = _hammer(lambda _: Client.get())
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
+    Client.reset()
+
+
+def test_openrouter_is_configured_once(mocker):
+    client = mocker.MagicMock()
+    models = _hammer(lambda i: _router(f"openrouter:model-{i}", client))
+    assert models[3] == "openai:model-3"
+    client.configure.assert_called_once()
+
+
+def test_message_bus_get_returns_one_instance_per_key():
+    buses = _hammer(lambda i: MessageBus.get("thread-safety", f"module-{i % 4}"))
+    for i, bus in enumerate(buses):
+        assert bus is MessageBus.get("thread-safety", f"module-{i % 4}")
+
+
+def test_tools_manager_register_is_atomic():
+    manager = ToolsManager()
+
+    def register(i: int) -> bool:
+        try:
+            manager.register_tool(f"thread_safety_tool_{i % 4}", lambda: i)
+            return True
+        except ValueError:
+            return False
+
+    try:
+        assert sum(_hammer(register)) == 4
+    finally:
+        for i in range(4):
+            manager.tools.pop(f"thread_safety_tool_{i}", None)
+
+
+def test_logger_is_initialized_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Logger, "_logger", None)
+    loggers = _hammer(lambda _: Logger.get_logger())
+    logger = loggers[0]
+    try:
+        assert all(item is logger for item in loggers)
+        assert len([h for h in logger.handlers if h.baseFilename.startswith(str(tmp_path))]) == 1
+    finally:
+        for handler in list(logger.handlers):
+            if handler.baseFilename.startswith(str(tmp_path)):
+                logger.removeHandler(handler)
+                handler.close()
+
+
+def test_stream_many_concurrent_readers():
+    stream = Stream(iter([str(i) for i in range(1000)]))
+    results = _hammer(lambda _: "".join(stream), n=THREADS * 2)
+    assert all(result == "".join(str(i) for i in range(1000)) for result in results)
+
+
+def test_concurrent_llm_calls_and_map_keys(mocker, monkeypatch):
+    def generate(model, messages, **kwargs):
+        text = messages[-1]["content"][0]["text"]
+        return [type("Choice", (object,), {"message": type("Message", (object,), {"content": text})})]
+
+    mocker.patch("uglychain.client.Client.generate", side_effect=generate)
+    monkeypatch.setattr(config, "use_parallel_processing", True)
+    session = Session()
+
+    @llm("openai:gpt-4o", map_keys=["text"], session=session)
+    def echo(text: list[str], prefix: str) -> str:
+        return f"{prefix}{text}"
+
+    results = _hammer(lambda i: echo([str(j) for j in range(20)], prefix=f"{i}:"), n=THREADS * 2)
+    for i, result in enumerate(results):
+        assert result == [f"{i}:{j}" for j in range(20)]
+    assert session.current_call() is None
+
+
+class Item(BaseModel):
+    name: str
+    values: list[int]
+
+
+@pytest.mark.parametrize("response_type", ["json", "yaml"])
+def test_concurrent_structured_parsing(monkeypatch, response_type):
+    monkeypatch.setattr(config, "response_markdown_type", response_type)
+    response_model = ResponseModel(lambda: None, Item)
+    content = '{"name": "x", "values": [1, 2, 3]}' if response_type == "json" else "name: x\nvalues: [1, 2, 3]"
+    choice = type("Choice", (object,), {"message": type("Message", (object,), {"content": content})})
+    items = _hammer(lambda _: response_model.parse_from_response(choice))
+    assert all(item == Item(name="x", values=[1, 2, 3]) for item in items)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import itertools
+import threading
+
+import pytest
+from pydantic import BaseModel
+
+from uglychain.client import Client
+from uglychain.vote import VoteResult, _normalize, vote
+
+
+def _choice(content: str):
+    return type("Choice", (object,), {"message": type("Message", (object,), {"content": content})})
+
+
+@pytest.fixture
+def answers(mocker):
+    """按顺序返回预设的答案，并记录调用次数"""
+    state = {"answers": iter([]), "calls": 0}
+    lock = threading.Lock()
+
+    def generate(model, messages, **kwargs):
+        with lock:
+            state["calls"] += 1
+            return [_choice(next(state["answers"]))]
+
+    mocker.patch.object(Client, "generate", side_effect=generate)
+
+    def set_answers(*values: str):
+        state["answers"] = itertools.chain(values, itertools.repeat("unused"))
+        return state
+
+    return set_answers
+
+
+def test_vote_stops_when_quorum_reached(answers):
+    state = answers("42", " 42. ", "7", "42", "7")
+
+    @vote("openai:gpt-4o", samples=5, temperature=0.8)
+    def solve(question: str) -> str:
+        return question
+
+    result = solve("6 * 7?")
+    assert isinstance(result, VoteResult)
+    assert result.answer == "42"
+    assert result.votes == 3
+    assert result.samples == 4
+    assert result.agreement == 0.75
+    assert result.early_stopped
+    assert state["calls"] == 4
+
+
+def test_vote_stops_when_winner_cannot_change(answers):
+    state = answers("a", "a", "b")
+
+    @vote("openai:gpt-4o", samples=3, quorum=0.9)
+    def solve() -> str:
+        return "q"
+
+    result = solve()
+    assert result.answer == "a"
+    assert state["calls"] == 2  # 剩下的 1 次采样无法让其他答案反超
+
+
+def test_vote_plurality_without_quorum(answers):
+    answers("a", "b", "c", "b")
+
+    @vote("openai:gpt-4o", samples=4, parallel=2)
+    def solve() -> str:
+        return "q"
+
+    result = solve()
+    assert result.answer == "b"
+    assert result.counts == {"a": 1, "b": 2, "c": 1}
+    assert not result.early_stopped
+
+
+class Answer(BaseModel):
+    value: int
+    reasoning: str
+
+
+def test_vote_structured_by_fields(answers):
+    answers(
+        '{"value": 1, "reasoning": "x"}',
+        '{"value": 2, "reasoning": "y"}',
+        '{"value": 1, "reasoning": "z"}',
+    )
+
+    @vote("openai:gpt-4o", samples=3, key=["value"], response_format=Answer)
+    def solve() -> str:
+        return "q"
+
+    result = solve()
+    assert result.answer == Answer(value=1, reasoning="x")
+    assert result.votes == 2
+
+
+def test_vote_rejects_n():
+    with pytest.raises(ValueError):
+        vote("openai:gpt-4o", n=3)
+
+
+def test_normalize():
+    assert _normalize("  The  Answer. ") == "the answer"
+    assert _normalize({"b": 1, "a": 2}) == _normalize({"a": 2, "b": 1})
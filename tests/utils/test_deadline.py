@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from uglychain.utils import run_batch, run_first
+from uglychain.utils.deadline import DeadlineExceededError, cancel_on, check_deadline, deadline, remaining, split
+
+
+def test_no_deadline():
+    assert remaining() is None
+    assert split(3) is None
+    check_deadline()
+
+
+def test_nested_deadline_takes_earliest():
+    with deadline(10):
+        with deadline(1):
+            left = remaining()
+            assert left is not None and 0 < left <= 1
+        with deadline(100):
+            left = remaining()
+            assert left is not None and 1 < left <= 10
+    assert remaining() is None
+
+
+def test_deadline_none_keeps_outer():
+    with deadline(5), deadline(None):
+        left = remaining()
+        assert left is not None and 0 < left <= 5
+
+
+def test_check_deadline_raises():
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceededError):
+            check_deadline()
+
+
+def test_split():
+    with deadline(9):
+        budget = split(3)
+        assert budget is not None and 2.9 < budget <= 3
+
+
+def test_deadline_propagates_to_batch_workers():
+    with deadline(5):
+        results = run_batch(lambda i: remaining(), 4, parallel=True)
+    assert all(left is not None and 0 < left <= 5 for left in results)
+
+
+def test_cancel_on():
+    event = threading.Event()
+    with cancel_on(event):
+        assert remaining() is None
+        event.set()
+        assert remaining() == 0
+        with pytest.raises(DeadlineExceededError):
+            check_deadline()
+    assert remaining() is None
+
+
+def test_run_first_cancels_losers():
+    started, release = threading.Event(), threading.Event()
+    seen: dict[int, float | None] = {}
+
+    def func(i):
+        if i == 0:
+            started.wait(2)
+            return "winner"
+        started.set()
+        release.wait(2)
+        seen[i] = remaining()
+
+    assert run_first(func, 2) == (0, "winner")
+    release.set()
+    while 1 not in seen:
+        time.sleep(0.01)
+    # 落后的条目在下一个检查点看到取消信号，不再发出请求或重试
+    assert seen[1] == 0
+
+
+def test_run_first_stops_scheduling_after_a_result():
+    called: list[int] = []
+
+    def func(i):
+        called.append(i)
+        if i == 0:
+            raise ValueError("failed")
+        return i
+
+    assert run_first(func, 4, max_workers=1) == (1, 1)
+    assert called == [0, 1]
+
+
+def test_run_batch_shared_bounds_in_flight_items():
+    lock = threading.Lock()
+    in_flight = peak = 0
+    names: set[str] = set()
+
+    def func(i):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            names.add(threading.current_thread().name)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return i
+
+    assert run_batch(func, 6, parallel=True, max_workers=2, shared=True) == list(range(6))
+    assert peak <= 2
+    assert all(name.startswith("uglychain-shared") for name in names)
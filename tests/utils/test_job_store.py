@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+from pydantic import BaseModel
+
+from uglychain.schema import ToolResponse
+from uglychain.utils.job_store import JSONLJobStore, SQLiteJobStore, get_job_store
+
+
+class Answer(BaseModel):
+    text: str
+    score: float
+
+
+@pytest.fixture(params=["sqlite3", "jsonl"])
+def store(request, tmp_path):
+    return get_job_store(tmp_path / f"jobs.{request.param}")
+
+
+def test_get_job_store_by_suffix(tmp_path):
+    assert isinstance(get_job_store(tmp_path / "jobs.jsonl"), JSONLJobStore)
+    assert isinstance(get_job_store(tmp_path / "jobs.sqlite3"), SQLiteJobStore)
+
+
+def test_save_and_load(store):
+    store.save("job", 0, ["hello"])
+    store.save("job", 2, ["world"])
+    store.save("other", 0, ["ignored"])
+    assert store.load("job") == {0: ["hello"], 2: ["world"]}
+    assert store.load("missing") == {}
+
+
+def test_pydantic_values_round_trip(store):
+    store.save("job", 0, [Answer(text="a", score=0.5), ToolResponse(name="t", parameters={"x": 1})])
+    value = store.load("job")[0]
+    assert value == [Answer(text="a", score=0.5), ToolResponse(name="t", parameters={"x": 1})]
+
+
+def test_undecodable_values_are_rerun(store):
+    class Local(BaseModel):
+        text: str
+
+    store.save("job", 0, [Local(text="a")])
+    store.save("job", 1, ["ok"])
+    assert store.load("job") == {1: ["ok"]}
+
+
+def test_clear(store):
+    store.save("job", 0, ["a"])
+    store.clear("job")
+    assert store.load("job") == {}
+    store.save("job", 1, ["b"])
+    assert store.load("job") == {1: ["b"]}
+
+
+def test_jsonl_store_persists_across_instances(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    JSONLJobStore(path).save("job", 0, ["a"])
+    with path.open("a") as f:
+        f.write('{"job_id": "job", "ind')  # 崩溃时写了一半的行
+    store = JSONLJobStore(path)
+    assert store.load("job") == {0: ["a"]}
+    store.save("job", 1, ["b"])
+    assert store.load("job") == {0: ["a"], 1: ["b"]}
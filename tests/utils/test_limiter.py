@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from uglychain.utils.batch import run_batch
+from uglychain.utils.deadline import DeadlineExceededError, deadline
+from uglychain.utils.limiter import AdaptiveLimiter, current_limiter, get_limiter, limiter_metrics, use_limiter
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_additive_increase_on_success():
+    limiter = AdaptiveLimiter(initial=2, max_limit=4)
+    for _ in range(10):
+        with limiter.slot():
+            pass
+    assert 3 <= limiter.limit <= 4
+    metrics = limiter.metrics()
+    assert metrics.successes == 10
+    assert metrics.increases >= 1
+    assert metrics.decisions[0].action == "increase"
+
+
+def test_multiplicative_decrease_on_429():
+    limiter = AdaptiveLimiter(initial=8, max_limit=16)
+    with pytest.raises(RateLimitError):
+        with limiter.slot():
+            raise RateLimitError()
+    assert limiter.limit == 4
+    metrics = limiter.metrics()
+    assert metrics.throttled == 1
+    assert metrics.decisions[-1].reason == "throttled"
+
+
+def test_wave_of_429s_decreases_once():
+    limiter = AdaptiveLimiter(initial=8, max_limit=16)
+    starts = [limiter.acquire() for _ in range(4)]
+    for started in starts:
+        limiter.release(started, RateLimitError())
+    assert limiter.limit == 4
+    assert limiter.metrics().decreases == 1
+
+
+def test_timeout_and_other_errors():
+    limiter = AdaptiveLimiter(initial=8, max_limit=16)
+    limiter.release(limiter.acquire(), ValueError("bad request"))
+    assert limiter.limit == 8
+    error = RuntimeError("生成响应失败")
+    error.__cause__ = TimeoutError()
+    limiter.release(limiter.acquire(), error)
+    assert limiter.limit == 4
+    assert limiter.metrics().timeouts == 1
+
+
+def test_latency_spike_decreases():
+    limiter = AdaptiveLimiter(initial=8, max_limit=8, min_samples=2, latency_tolerance=3)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(time.monotonic() - 0.01)
+    limiter.acquire()
+    limiter.release(time.monotonic() - 1.0)
+    assert limiter.limit == 4
+    assert limiter.metrics().latency_spikes == 1
+
+
+def test_limit_bounds_concurrency():
+    limiter = AdaptiveLimiter(initial=2, max_limit=2)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work(i):
+        nonlocal active, peak
+        with limiter.slot():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+        return i
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak <= 2
+
+
+def test_acquire_respects_deadline():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    limiter.acquire()
+    with deadline(0.05), pytest.raises(DeadlineExceededError):
+        limiter.acquire()
+
+
+def test_run_batch_exposes_limiter_to_workers():
+    limiter = AdaptiveLimiter(initial=2, max_limit=3)
+    seen = run_batch(lambda i: current_limiter(), 4, parallel=True, limiter=limiter)
+    assert all(item is limiter for item in seen)
+    assert current_limiter() is None
+    with use_limiter(limiter):
+        assert current_limiter() is limiter
+
+
+def test_shared_limiters_and_metrics():
+    limiter = get_limiter("test:shared-model", initial=3, max_limit=5)
+    assert get_limiter("test:shared-model") is limiter
+    metrics = limiter_metrics()["test:shared-model"]
+    assert metrics["limit"] == 3
+    assert metrics["in_flight"] == 0
+
+
+def test_get_limiter_does_not_reconfigure_the_shared_limiter():
+    limiter = get_limiter("test:reconfigured-model", initial=4, max_limit=8)
+    # 参数只在创建时使用，其他调用方的并发上限不会修改共享的限流器
+    assert get_limiter("test:reconfigured-model", initial=1, max_limit=2) is limiter
+    assert limiter.max_limit == 8
+    assert limiter.limit == 4
+    limiter.configure(max_limit=2)
+    assert limiter.limit == 2
+    with pytest.raises(ValueError):
+        limiter.configure(unknown=1)
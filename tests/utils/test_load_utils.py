@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import copy
 import json
+import os
 
 import pytest
 from ruamel.yaml import YAMLError
 
+from uglychain.utils import _load_utils
 from uglychain.utils._load_utils import (
+    clear_reference_cache,
     convert_to_variable_name,
     load_yaml,
     resolve_reference,
@@ -86,6 +90,40 @@ def test_resolve_reference_file(tmp_path):
     assert result == text_content
 
 
+def test_resolve_reference_file_is_cached(tmp_path, mocker):
+    clear_reference_cache()
+    json_file = tmp_path / "schema.json"
+    json_file.write_text(json.dumps({"key": ["a"]}))
+    json_load = mocker.spy(_load_utils.json, "load")
+
+    first = resolve_reference(f"${{file:{json_file}}}")
+    second = resolve_reference("${file:schema.json}", base_path=tmp_path)
+
+    assert second is first  # 缓存的值直接共享，不复制
+    assert second == {"key": ["a"]}
+    assert json_load.call_count == 1
+    with pytest.raises(TypeError):
+        first["key"].append("mutated")
+    with pytest.raises(TypeError):
+        first["other"] = 1
+    mutable = copy.deepcopy(first)
+    mutable["key"].append("b")
+    assert type(mutable) is dict
+    assert json.dumps(first) == '{"key": ["a"]}'
+
+
+def test_resolve_reference_file_invalidated_on_change(tmp_path):
+    clear_reference_cache()
+    text_file = tmp_path / "shots.txt"
+    text_file.write_text("old")
+    assert resolve_reference(f"${{file:{text_file}}}") == "old"
+
+    text_file.write_text("new content")
+    stat = text_file.stat()
+    os.utime(text_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert resolve_reference(f"${{file:{text_file}}}") == "new content"
+
+
 def test_resolve_reference_file_not_found():
     with pytest.raises(FileNotFoundError):
         resolve_reference("${file:non_exist_file.json}")
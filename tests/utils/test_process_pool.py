@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from uglychain.llm import llm
+from uglychain.utils.process_pool import FunctionRef, SharedArgs, run_in_process, snapshot_choice
+
+
+@llm
+def wrapped_prompt(text: str) -> str:
+    return f"prompt: {text}"
+
+
+def load_shared(ref):
+    value = ref.load()
+    return len(value["document"]), value is ref.load()
+
+
+def test_function_ref_resolves_wrapped_function():
+    ref = FunctionRef.of(wrapped_prompt.__func__)
+    func = pickle.loads(pickle.dumps(ref)).resolve()
+    assert func("hi") == "prompt: hi"
+
+    with pytest.raises(ValueError):
+        FunctionRef.of(lambda: None)
+
+
+def test_shared_args_are_loaded_once_per_worker():
+    with SharedArgs({"document": "x" * 1_000_000}) as ref:
+        assert len(pickle.dumps(ref)) < 200  # 每个条目只传递句柄
+        assert run_in_process(load_shared, ref) == (1_000_000, True)
+        assert ref.load()["document"] == "x" * 1_000_000
+
+
+def test_snapshot_choice_is_picklable():
+    choice = SimpleNamespace(
+        message=SimpleNamespace(
+            content="hi",
+            reasoning_content="thinking",
+            tool_calls=[SimpleNamespace(id="call_1", function=SimpleNamespace(name="f", arguments="{}"))],
+            unpicklable=lambda: None,
+        )
+    )
+    snapshot = pickle.loads(pickle.dumps(snapshot_choice(choice)))
+    assert snapshot.message.content == "hi"
+    assert snapshot.message.reasoning_content == "thinking"
+    assert snapshot.message.tool_calls[0].function.name == "f"
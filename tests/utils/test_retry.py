@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
+from pydantic import BaseModel, ValidationError
 
-from uglychain.utils.retry import RetryError, retry
+from uglychain.utils.deadline import check_deadline
+from uglychain.utils.retry import RetryError, RetryPolicy, get_retry_after, get_status_code, is_retryable, retry
 
 
 @pytest.mark.parametrize(
@@ -20,6 +23,7 @@ def test_retry(n, timeout, wait, exception, match):
     def sample_function():
         if timeout == 0.1:
             time.sleep(0.2)
+            check_deadline()  # 模拟在截止时间到达时被取消的请求
         else:
             raise ValueError("Test error")
 
@@ -43,3 +47,118 @@ def test_retry_success(n, timeout, wait, expected):
 
     result = decorated_function()
     assert result == expected
+
+
+def test_retry_keeps_result_finished_after_deadline():
+    def slow_function():
+        time.sleep(0.05)
+        return "Done"
+
+    assert retry(n=1, timeout=0.01)(slow_function)() == "Done"
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code: int, headers: dict[str, str] | None = None) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (object,), {"status_code": status_code, "headers": headers or {}})()
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (HTTPError(429), True),
+        (HTTPError(503), True),
+        (HTTPError(400), False),
+        (HTTPError(401), False),
+        (TimeoutError("timeout"), True),
+        (ValueError("Failed to parse"), True),
+        (TypeError("bad call"), False),
+    ],
+)
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+class Item(BaseModel):
+    count: int
+
+
+def test_validation_errors_are_fatal():
+    with pytest.raises(ValidationError) as info:
+        Item(count="many")  # type: ignore[arg-type]
+    assert is_retryable(info.value) is False
+    # 模型输出解析失败被包装为 ValueError，重新采样可能成功
+    try:
+        raise ValueError("Failed to parse") from info.value
+    except ValueError as wrapped:
+        assert is_retryable(wrapped) is True
+
+
+def test_retry_executor_is_deprecated():
+    with pytest.warns(DeprecationWarning):
+        wrapped = retry(1, None, 0, ThreadPoolExecutor(max_workers=1))(lambda: "ok")
+    assert wrapped() == "ok"
+
+
+def test_is_retryable_follows_cause_chain():
+    try:
+        try:
+            raise HTTPError(401)
+        except HTTPError as e:
+            raise RuntimeError("生成响应失败") from e
+    except RuntimeError as wrapped:
+        assert is_retryable(wrapped) is False
+        assert get_status_code(wrapped) == 401
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after": "3"}, 3.0),
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({}, None),
+    ],
+)
+def test_get_retry_after(headers, expected):
+    assert get_retry_after(HTTPError(429, headers)) == expected
+
+
+def test_retry_policy_backoff_with_full_jitter(mocker):
+    policy = RetryPolicy(base_delay=1, max_delay=5, multiplier=2)
+    uniform = mocker.patch("uglychain.utils.retry.random.uniform", side_effect=lambda a, b: b)
+    assert [policy.compute_delay(attempt) for attempt in range(4)] == [1, 2, 4, 5]
+    uniform.assert_called_with(0, 5)
+
+
+def test_retry_policy_honors_retry_after():
+    policy = RetryPolicy(base_delay=0, max_delay=10)
+    assert policy.compute_delay(0, HTTPError(429, {"retry-after": "4"})) == 4
+    assert policy.compute_delay(0, HTTPError(429, {"retry-after": "100"})) == 10
+
+
+def test_retry_fatal_error_is_not_retried():
+    calls = []
+
+    def sample_function():
+        calls.append(1)
+        raise HTTPError(400)
+
+    with pytest.raises(HTTPError):
+        retry(n=3, timeout=None, wait=0)(sample_function)()
+    assert len(calls) == 1
+
+
+def test_retry_recovers_from_retryable_error(mocker):
+    sleep = mocker.patch("uglychain.utils.retry.time.sleep")
+    calls = []
+
+    def sample_function():
+        calls.append(1)
+        if len(calls) < 3:
+            raise HTTPError(429, {"retry-after": "2"})
+        return "Success"
+
+    assert retry(policy=RetryPolicy(max_attempts=3, max_delay=10))(sample_function)() == "Success"
+    assert len(calls) == 3
+    assert [call.args[0] for call in sleep.call_args_list] == [2, 2]
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from uglychain.utils.deadline import DeadlineExceededError, deadline
+from uglychain.utils.scheduler import (
+    RequestContext,
+    RequestScheduler,
+    current_request_context,
+    get_scheduler,
+    request_priority,
+    set_scheduler,
+)
+
+
+def _queue(scheduler: RequestScheduler, requests: list[tuple[str, str]]) -> list[str]:
+    """占住唯一的名额后依次排队，再释放名额，返回各请求获得名额的顺序"""
+    order: list[str] = []
+    held = scheduler.acquire(RequestContext())
+    threads = []
+
+    def worker(priority: str, tenant: str) -> None:
+        context = scheduler.acquire(RequestContext(priority, tenant))
+        order.append(f"{priority}:{tenant}")
+        scheduler.release(context)
+
+    for i, (priority, tenant) in enumerate(requests, start=1):
+        thread = threading.Thread(target=worker, args=(priority, tenant))
+        thread.start()
+        threads.append(thread)
+        while sum(s["waiting"] for s in scheduler.stats().values()) < i:
+            time.sleep(0.001)
+    scheduler.release(held)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_interactive_requests_jump_the_queue():
+    scheduler = RequestScheduler(max_concurrency=1)
+    order = _queue(scheduler, [("batch", "a"), ("batch", "a"), ("interactive", "b")])
+    assert order == ["interactive:b", "batch:a", "batch:a"]
+    assert scheduler.stats()["batch"]["completed"] == 2
+
+
+def test_fair_queuing_between_tenants():
+    scheduler = RequestScheduler(max_concurrency=1)
+    order = _queue(scheduler, [("batch", "a"), ("batch", "a"), ("batch", "a"), ("batch", "b")])
+    assert order == ["batch:a", "batch:b", "batch:a", "batch:a"]
+
+
+def test_tenant_weights():
+    scheduler = RequestScheduler(max_concurrency=1, tenant_weights={"b": 2})
+    order = _queue(scheduler, [("batch", "a")] * 2 + [("batch", "b")] * 4)
+    assert order == ["batch:b", "batch:a", "batch:b", "batch:b", "batch:a", "batch:b"]
+
+
+def test_class_limits_reserve_capacity():
+    scheduler = RequestScheduler(max_concurrency=2, class_limits={"batch": 1})
+    first = scheduler.acquire(RequestContext("batch"))
+    with deadline(0.05), pytest.raises(DeadlineExceededError):
+        scheduler.acquire(RequestContext("batch"))
+    second = scheduler.acquire(RequestContext("interactive"))
+    assert scheduler.stats()["interactive"]["running"] == 1
+    scheduler.release(first)
+    scheduler.release(second)
+    assert scheduler.stats()["batch"] == {"running": 0, "waiting": 0, "completed": 1}
+
+
+def test_request_priority_context():
+    assert current_request_context() == RequestContext()
+    with request_priority("batch", tenant="t1"):
+        with request_priority(tenant="t2"):
+            assert current_request_context() == RequestContext("batch", "t2")
+    with pytest.raises(ValueError):
+        with request_priority("urgent"):
+            pass
+    with pytest.raises(ValueError):
+        RequestScheduler(class_limits={"urgent": 1})
+
+
+def test_llm_batch_requests_use_batch_class(mocker):
+    from uglychain.client import Client
+    from uglychain.config import config
+    from uglychain.llm import llm
+
+    choice = type("Choice", (object,), {"message": type("Message", (object,), {"content": "ok"})})
+    create = mocker.MagicMock(return_value=type("Response", (object,), {"choices": [choice]}))
+    mocker.patch.object(
+        Client, "get", return_value=mocker.MagicMock(chat=mocker.MagicMock(completions=mocker.MagicMock(create=create)))
+    )
+    mocker.patch.object(config, "use_parallel_processing", True)
+
+    @llm("openai:gpt-4o", map_keys=["text"])
+    def summarize(text: str) -> str:
+        return text
+
+    @llm("openai:gpt-4o")
+    def chat(text: str) -> str:
+        return text
+
+    scheduler = RequestScheduler(max_concurrency=2)
+    set_scheduler(scheduler)
+    try:
+        summarize(text=["a", "b", "c"])
+        chat("hi")
+    finally:
+        set_scheduler(None)
+    assert get_scheduler() is None
+    stats = scheduler.stats()
+    assert stats["batch"]["completed"] == 3
+    assert stats["interactive"]["completed"] == 1
+
+
+def test_saturated_limiter_does_not_block_other_models(mocker):
+    from uglychain.client import Client
+    from uglychain.utils.limiter import AdaptiveLimiter, use_limiter
+
+    release = threading.Event()
+    choice = type("Choice", (object,), {"message": type("Message", (object,), {"content": "ok"})})
+
+    def create(model, messages, **kwargs):
+        if model == "openai:slow":
+            release.wait(5)
+        return type("Response", (object,), {"choices": [choice]})
+
+    mocker.patch.object(
+        Client, "get", return_value=mocker.MagicMock(chat=mocker.MagicMock(completions=mocker.MagicMock(create=create)))
+    )
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    messages = [{"role": "user", "content": "hi"}]
+
+    def batch_call() -> None:
+        with use_limiter(limiter), request_priority("batch"):
+            Client.generate("openai:slow", messages)
+
+    scheduler = RequestScheduler(max_concurrency=2)
+    set_scheduler(scheduler)
+    threads = [threading.Thread(target=batch_call) for _ in range(2)]
+    try:
+        for thread in threads:
+            thread.start()
+        while limiter.metrics().in_flight < 1:
+            time.sleep(0.01)
+        time.sleep(0.05)  # 第二个批处理请求在等待限流器的名额
+        # 等待限流名额的请求不占用调度名额，其他模型的交互式请求不被阻塞
+        with deadline(1), request_priority("interactive"):
+            assert Client.generate("openai:fast", messages)[0] is choice
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+        set_scheduler(None)
+    assert scheduler.stats()["batch"]["completed"] == 2
+
+
+def test_finish_tags_of_idle_tenants_are_evicted():
+    scheduler = RequestScheduler(max_concurrency=1)
+    for i in range(100):
+        context = scheduler.acquire(RequestContext("batch", f"tenant-{i}"))
+        scheduler.release(context)
+    assert len(scheduler._finish_tags) <= 1
+
+    # 仍有排队请求的租户保留完成时间，继续参与公平排队
+    order = _queue(scheduler, [("batch", "a"), ("batch", "a"), ("batch", "b")])
+    assert order == ["batch:a", "batch:b", "batch:a"]
+    assert len(scheduler._finish_tags) <= 1
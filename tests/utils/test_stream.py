@@ -171,3 +171,33 @@ class TestStream:
         # Note: The duplicate break condition at lines 45-46 is unreachable code
         # because the first identical condition at lines 42-43 will always break
         # out of the loop first. This is a code smell that should be fixed.
+
+    def test_close_stops_consuming_source(self):
+        """Test that close() stops the background thread and closes the source generator."""
+        closed = threading.Event()
+        produced: list[int] = []
+
+        def endless_source():
+            try:
+                i = 0
+                while True:
+                    produced.append(i)
+                    yield str(i)
+                    i += 1
+                    time.sleep(0.01)
+            finally:
+                closed.set()
+
+        stream = Stream(endless_source())
+        iterator = stream.iterator
+        assert next(iterator) == "0"
+        stream.close()
+
+        assert closed.wait(1)
+        stream._thread.join(1)
+        assert stream._stopped is True
+        count = len(produced)
+        time.sleep(0.05)
+        assert len(produced) == count
+        # 已缓存的数据仍可读取，之后迭代结束
+        assert list(iterator) == stream._cache[1:]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pytest
+
+from uglychain.utils.retry import is_retryable
+from uglychain.utils.usage import (
+    Budget,
+    BudgetExceededError,
+    Usage,
+    UsageTracker,
+    check_budget,
+    current_usage_scopes,
+    report_usage,
+)
+
+
+def test_usage_from_openai_response():
+    usage = {
+        "prompt_tokens": 1000,
+        "completion_tokens": 500,
+        "prompt_tokens_details": {"cached_tokens": 400},
+        "completion_tokens_details": {"reasoning_tokens": 200},
+    }
+    parsed = Usage.from_response(usage, {"prompt": 2.0, "completion": 10.0, "cached": 1.0})
+    assert parsed.prompt_tokens == 1000
+    assert parsed.completion_tokens == 500
+    assert parsed.cached_tokens == 400
+    assert parsed.reasoning_tokens == 200
+    assert parsed.total_tokens == 1500
+    assert parsed.cost == pytest.approx((600 * 2.0 + 400 * 1.0 + 500 * 10.0) / 1_000_000)
+
+
+def test_usage_from_anthropic_and_deepseek_response():
+    # Anthropic 的 input_tokens 不包含缓存读取和写入的 token
+    anthropic = type(
+        "Usage",
+        (),
+        {"input_tokens": 10, "output_tokens": 5, "cache_read_input_tokens": 30, "cache_creation_input_tokens": 4},
+    )()
+    parsed = Usage.from_response(anthropic, {"prompt": 3.0, "cached": 0.3, "completion": 15.0})
+    assert (parsed.prompt_tokens, parsed.completion_tokens, parsed.cached_tokens) == (44, 5, 30)
+    assert parsed.cost == pytest.approx((14 * 3.0 + 30 * 0.3 + 5 * 15.0) / 1_000_000)
+    deepseek = {"prompt_tokens": 8, "completion_tokens": 2, "prompt_cache_hit_tokens": 6}
+    assert Usage.from_response(deepseek).cached_tokens == 6
+
+
+def test_usage_cost_is_never_negative():
+    usage = Usage(prompt_tokens=10, cached_tokens=30)
+    assert usage.estimate_cost({"prompt": 3.0, "cached": 0.3}) == pytest.approx(30 * 0.3 / 1_000_000)
+
+
+def test_tracker_accumulates_per_model_and_func():
+    tracker = UsageTracker()
+    with tracker.track("summarize"):
+        report_usage("openai:gpt-4o", {"prompt_tokens": 10, "completion_tokens": 5})
+        report_usage("openai:gpt-4o-mini", {"prompt_tokens": 1, "completion_tokens": 1})
+    report_usage("openai:gpt-4o", {"prompt_tokens": 100})  # 不在统计上下文中，不记录
+    assert tracker.total.total_tokens == 17
+    assert tracker.total.calls == 2
+    assert tracker.by_model["openai:gpt-4o"].prompt_tokens == 10
+    assert tracker.by_func["summarize"].calls == 2
+    assert [record.model for record in tracker.records] == ["openai:gpt-4o", "openai:gpt-4o-mini"]
+    assert current_usage_scopes() == ()
+
+
+def test_nested_scopes_record_once_per_tracker():
+    outer = UsageTracker()
+    inner = UsageTracker()
+    with outer.track("agent"), inner.track("step"), outer.track("agent_llm"):
+        report_usage("m", {"prompt_tokens": 10})
+    assert outer.total.prompt_tokens == 10
+    assert outer.by_func == {"agent_llm": outer.total}
+    assert inner.total.prompt_tokens == 10
+
+
+def test_budget_exceeded():
+    tracker = UsageTracker(budget=Budget(max_tokens=20))
+    with tracker.track("f"):
+        check_budget()
+        report_usage("m", {"prompt_tokens": 15, "completion_tokens": 5})
+        with pytest.raises(BudgetExceededError, match="token budget"):
+            check_budget()
+    check_budget()  # 离开上下文后不再受该预算限制
+
+    cost_tracker = UsageTracker(budget=Budget(max_cost=0.01))
+    with cost_tracker.track("f"):
+        report_usage("m", {"prompt_tokens": 10_000}, {"prompt": 1.0})
+        with pytest.raises(BudgetExceededError, match="cost budget"):
+            check_budget()
+
+
+def test_budget_exceeded_is_not_retryable():
+    assert not is_retryable(BudgetExceededError("token budget exhausted"))